@@ -0,0 +1,199 @@
+
+import json
+import threading
+import zlib
+from collections.abc import AsyncIterator, Callable
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+FLUSH_BYTES = 16 * 1024
+
+
+def _optional(name: str):
+    try:
+        return __import__(name)
+    except ImportError:
+        return None
+
+
+_orjson = _optional("orjson")
+_zstandard = _optional("zstandard")
+_brotli = _optional("brotli")
+
+AVAILABLE = {
+    "br": _brotli is not None,
+    "zstd": _zstandard is not None,
+    "gzip": True,
+}
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if _orjson is not None:
+            return _orjson.dumps(content)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def negotiate_encoding(
+    accept_encoding: str | None,
+    preferred: tuple[str, ...] = ("zstd", "gzip"),
+) -> str | None:
+    """Pick the first of ``preferred`` allowed by an ``Accept-Encoding`` header (``None`` for identity)."""
+    offered = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                continue
+        offered[name.strip().lower()] = q
+    for name in preferred:
+        if offered.get(name, 0) > 0 and AVAILABLE[name]:
+            return name
+    return None
+
+
+def compress_bytes(body: bytes, encoding: str | None) -> bytes:
+    """One-shot compression of a complete body."""
+    if encoding == "br":
+        return _brotli.compress(body, quality=4)
+    if encoding == "zstd":
+        return _zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == "gzip":
+        return zlib.compress(body, 6, wbits=31)
+    return body
+
+
+class EncodedCache:
+    """Encoded (and compressed) form of a value, rebuilt only when its version changes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version = None
+        self._bodies: dict[str | None, bytes] = {}
+
+    def get(self, version, build: Callable[[], bytes], encoding: str | None = None) -> bytes:
+        with self._lock:
+            if version != self._version:
+                self._bodies = {None: build()}
+                self._version = version
+            body = self._bodies.get(encoding)
+            if body is None:
+                body = self._bodies[encoding] = compress_bytes(self._bodies[None], encoding)
+            return body
+
+
+class CompressionMiddleware:
+    """Compress complete responses of at least ``minimum_size`` bytes with brotli or gzip.
+
+    Streamed responses (several body messages) and bodies that already carry a
+    ``Content-Encoding`` are passed through unchanged.
+    """
+
+    def __init__(self, app, minimum_size: int = 500) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), ("br", "gzip"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                message["type"] == "http.response.body"
+                and not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and "content-encoding" not in headers
+            ):
+                body = compress_bytes(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = {"type": "http.response.body", "body": body}
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+async def encode_rows(rows: AsyncIterator[BaseModel], fmt: str = "ndjson") -> AsyncIterator[bytes]:
+    """Serialize models as NDJSON lines or one JSON array, in chunks of ~``FLUSH_BYTES``."""
+    buf = bytearray(b"[" if fmt == "json" else b"")
+    sep = b"," if fmt == "json" else b"\n"
+    first = True
+    async for row in rows:
+        if fmt == "json":
+            if not first:
+                buf += sep
+            buf += row.model_dump_json().encode()
+        else:
+            buf += row.model_dump_json().encode() + sep
+        first = False
+        if len(buf) >= FLUSH_BYTES:
+            yield bytes(buf)
+            buf.clear()
+    if fmt == "json":
+        buf += b"]"
+    if buf:
+        yield bytes(buf)
+
+
+async def compress(chunks: AsyncIterator[bytes], encoding: str | None) -> AsyncIterator[bytes]:
+    """Compress a byte stream incrementally with gzip or zstd."""
+    if encoding is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        sync_flush = zlib.Z_SYNC_FLUSH
+    else:
+        compressor = _zstandard.ZstdCompressor(level=3).compressobj()
+        sync_flush = _zstandard.COMPRESSOBJ_FLUSH_BLOCK
+    async for chunk in chunks:
+        # flush per chunk so the client sees rows as they are produced
+        yield compressor.compress(chunk) + compressor.flush(sync_flush)
+    yield compressor.flush()
+
+
+def stream_models(
+    rows: AsyncIterator[BaseModel],
+    fmt: str = "ndjson",
+    accept_encoding: str | None = None,
+) -> StreamingResponse:
+    """Stream ``rows`` as NDJSON or a JSON array, compressed if the client accepts it."""
+    encoding = negotiate_encoding(accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(
+        compress(encode_rows(rows, fmt), encoding),
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers,
+    )
@@ -0,0 +1,72 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel
+from src.app.dependencies import get_diagnostics
+
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+class AllocationDiff(BaseModel):
+    """Schema for allocation growth at one traceback."""
+    size_diff: int
+    size: int
+    count_diff: int
+    count: int
+    traceback: list[str]
+
+
+class MemoryDiffResponse(BaseModel):
+    """Schema for a tracemalloc snapshot diff."""
+    traced_bytes: int
+    peak_bytes: int
+    stats: list[AllocationDiff]
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+def profile(
+    seconds: float = Query(10.0, gt=0, le=300),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    idle: bool = Query(False, description="include threads waiting for work"),
+    diagnostics = Depends(get_diagnostics),
+):
+    """Sample all threads of the controller process; returns collapsed stacks for flame graphs."""
+    try:
+        stacks = diagnostics.profile(seconds, interval_ms / 1000, idle)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    filename = f"profile-{datetime.utcnow():%Y%m%dT%H%M%S}.folded"
+    return PlainTextResponse(
+        stacks,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/memory/start")
+def memory_start(
+    frames: int = Query(10, ge=1, le=50),
+    diagnostics = Depends(get_diagnostics),
+):
+    """Start tracemalloc (if needed) and take the baseline snapshot."""
+    diagnostics.memory_start(frames)
+    return {"ok": True}
+
+
+@router.post("/memory/diff", response_model=MemoryDiffResponse)
+def memory_diff(
+    top: int = Query(25, ge=1, le=500),
+    diagnostics = Depends(get_diagnostics),
+):
+    """Allocations grown since the previous snapshot, largest first; resets the baseline."""
+    try:
+        return diagnostics.memory_diff(top)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/memory/stop")
+def memory_stop(diagnostics = Depends(get_diagnostics)):
+    """Stop tracemalloc and drop its traces."""
+    diagnostics.memory_stop()
+    return {"ok": True}
@@ -0,0 +1,31 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel, Field
+from src.app.dependencies import get_decision_log
+
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+
+class DecisionRecord(BaseModel):
+    """Schema for one controller transition."""
+    ts: datetime
+    from_state: str = Field(alias="from")
+    to_state: str = Field(alias="to")
+    reason: str
+    moisture: float | None
+    thresholds_version: str | None
+    scheduled: bool
+
+
+@router.get("/decisions", response_model=list[DecisionRecord], response_model_by_alias=False)
+def list_decisions(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    state: str | None = Query(None, description="match transitions from or to this state"),
+    reason: str | None = Query(None, description="substring of the reason"),
+    limit: int = Query(100, gt=0, le=1000),
+    decision_log = Depends(get_decision_log),
+):
+    """Query the controller decision log, newest first."""
+    return decision_log.query(since=since, until=until, state=state, reason=reason, limit=limit)
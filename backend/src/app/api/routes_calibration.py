@@ -0,0 +1,160 @@
+
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.app.database.engine import get_session
+from src.app.database.repository import CalibrationRepository
+from src.app.dependencies import get_calibration
+from src.app.hardware.calibration import CalibrationCurve
+
+
+router = APIRouter(prefix="/calibration", tags=["calibration"])
+
+
+class CalibrationPointResponse(BaseModel):
+    """Schema for a calibration point."""
+    id: int
+    raw: float
+    moisture_rel: float
+    temperature_c: float | None
+    captured_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CalibrationResponse(BaseModel):
+    """Schema for a channel's calibration curve."""
+    channel: int
+    method: str
+    temp_coeff: float
+    reference_temp_c: float
+    active: bool  # a compiled curve is in use (otherwise the two-point conversion)
+    points: list[CalibrationPointResponse]
+
+
+class CalibrationUpdate(BaseModel):
+    """Schema for updating curve settings."""
+    method: Literal["linear", "spline"] | None = None
+    temp_coeff: float | None = Field(None, ge=-1000.0, le=1000.0)  # raw codes per °C
+    reference_temp_c: float | None = Field(None, ge=-20.0, le=60.0)
+
+
+class CalibrationPointCreate(BaseModel):
+    """Schema for a manually entered calibration point."""
+    raw: float = Field(ge=-32768, le=32767)
+    moisture_rel: float = Field(ge=0.0, le=1.0)
+    temperature_c: float | None = None
+
+
+class CaptureRequest(BaseModel):
+    """Schema for capturing a point from the live probe."""
+    moisture_rel: float = Field(ge=0.0, le=1.0)  # reference moisture of the sample
+    samples: int = Field(16, ge=1, le=1024)
+
+
+async def _response(repo: CalibrationRepository, channel: int, calibration) -> CalibrationResponse:
+    settings = await repo.get_settings(channel)
+    points = await repo.get_points(channel)
+    return CalibrationResponse(
+        channel=channel,
+        method=settings.method,
+        temp_coeff=settings.temp_coeff,
+        reference_temp_c=settings.reference_temp_c,
+        active=await run_in_threadpool(calibration.active, channel),
+        points=[CalibrationPointResponse.model_validate(p) for p in points],
+    )
+
+
+async def _apply(session: AsyncSession, repo: CalibrationRepository, channel: int, calibration) -> None:
+    """Validate the changed curve, install it on the leader and commit; roll back on failure."""
+    try:
+        spec = await repo.spec(channel)
+        if spec is not None:
+            CalibrationCurve.from_spec(spec)
+        await run_in_threadpool(calibration.apply, channel, spec)
+        await session.commit()
+    except ValueError as e:
+        await session.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/{channel}", response_model=CalibrationResponse)
+async def get_calibration_curve(
+    channel: int,
+    session: AsyncSession = Depends(get_session),
+    calibration = Depends(get_calibration),
+):
+    """Get the curve settings and points of a moisture channel."""
+    return await _response(CalibrationRepository(session), channel, calibration)
+
+
+@router.put("/{channel}", response_model=CalibrationResponse)
+async def update_calibration_curve(
+    channel: int,
+    update: CalibrationUpdate,
+    session: AsyncSession = Depends(get_session),
+    calibration = Depends(get_calibration),
+):
+    """Change the interpolation method or temperature compensation and recompile the curve."""
+    repo = CalibrationRepository(session, autocommit=False)
+    await repo.update_settings(channel, **update.model_dump())
+    await _apply(session, repo, channel, calibration)
+    return await _response(repo, channel, calibration)
+
+
+@router.post("/{channel}/capture", response_model=CalibrationPointResponse)
+async def capture_point(
+    channel: int,
+    capture: CaptureRequest,
+    session: AsyncSession = Depends(get_session),
+    calibration = Depends(get_calibration),
+):
+    """Read the probe now (averaged over ``samples``) and store it with the reference moisture.
+
+    Put the probe in a sample of known moisture (e.g. dried and weighed
+    soil, or water for the wet end) before calling this.
+    """
+    try:
+        reading = await run_in_threadpool(calibration.capture, channel, capture.samples)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    repo = CalibrationRepository(session, autocommit=False)
+    point = await repo.add_point(channel, reading["raw"], capture.moisture_rel, reading["temperature_c"])
+    await _apply(session, repo, channel, calibration)
+    return point
+
+
+@router.post("/{channel}/points", response_model=CalibrationPointResponse)
+async def add_point(
+    channel: int,
+    point: CalibrationPointCreate,
+    session: AsyncSession = Depends(get_session),
+    calibration = Depends(get_calibration),
+):
+    """Add a point measured elsewhere and recompile the curve."""
+    repo = CalibrationRepository(session, autocommit=False)
+    created = await repo.add_point(channel, point.raw, point.moisture_rel, point.temperature_c)
+    await _apply(session, repo, channel, calibration)
+    return created
+
+
+@router.delete("/{channel}/points/{point_id}")
+async def delete_point(
+    channel: int,
+    point_id: int,
+    session: AsyncSession = Depends(get_session),
+    calibration = Depends(get_calibration),
+):
+    """Remove a point; below two points the probe falls back to the two-point conversion."""
+    repo = CalibrationRepository(session, autocommit=False)
+    if not await repo.delete_point(channel, point_id):
+        raise HTTPException(status_code=404, detail="Calibration point not found")
+    await _apply(session, repo, channel, calibration)
+    return {"ok": True}
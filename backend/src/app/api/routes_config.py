@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends
+from dataclasses import replace
+from datetime import datetime, time, timedelta
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.app.database.engine import get_session
+from src.app.dependencies import get_runtime_config, get_scheduler
 from src.app.database.repository import ThresholdRepository
+from src.app.services.decision import DecisionParams
+from src.app.services.whatif import Candidate, load_history, summary
 
 
 router = APIRouter(prefix="/config", tags=["config"])
@@ -20,6 +26,7 @@ class ThresholdResponse(BaseModel):
     watering_seconds: int
     soak_minutes: int
     daily_budget_minutes: int
+    daily_budget_litres: float | None
     window_start_hour: int
     window_end_hour: int
     
@@ -38,10 +45,38 @@ class ThresholdUpdate(BaseModel):
     watering_seconds: int | None = Field(None, gt=0)
     soak_minutes: int | None = Field(None, gt=0)
     daily_budget_minutes: int | None = Field(None, gt=0)
+    daily_budget_litres: float | None = Field(None, gt=0)
     window_start_hour: int | None = Field(None, ge=0, lt=24)
     window_end_hour: int | None = Field(None, ge=0, lt=24)
 
 
+class WhatIfCandidate(ThresholdUpdate):
+    """Schema for one candidate; omitted fields keep the current thresholds."""
+    schedules: list[time] | None = None  # daily watering times; omitted = the stored schedules
+
+
+class WhatIfRequest(BaseModel):
+    """Schema for a what-if replay."""
+    days: int = Field(7, ge=1, le=90)
+    cycle_gain: float = Field(0.03, ge=0.0, le=0.5)  # moisture added by one watering cycle
+    candidates: list[WhatIfCandidate] = Field(min_length=1, max_length=64)
+
+
+class RuntimeConfigResponse(BaseModel):
+    """Schema for the active runtime configuration."""
+    version: int
+    loaded_at: datetime
+    path: str | None
+    last_error: str | None             # why the last reload was rejected
+    restart_required: list[str]        # changed settings that only apply after a restart
+    config: dict                       # the settings that reload while running
+
+
+class ReloadResponse(RuntimeConfigResponse):
+    """Schema for the outcome of a forced reload."""
+    reloaded: bool
+
+
 @router.get("/thresholds", response_model=ThresholdResponse)
 async def get_thresholds(session: AsyncSession = Depends(get_session)):
     """Get the current threshold configuration."""
@@ -54,6 +89,7 @@ async def get_thresholds(session: AsyncSession = Depends(get_session)):
 async def update_thresholds(
     threshold_data: ThresholdUpdate,
     session: AsyncSession = Depends(get_session),
+    scheduler = Depends(get_scheduler),
 ):
     """Update threshold configuration."""
     repo = ThresholdRepository(session)
@@ -67,8 +103,57 @@ async def update_thresholds(
         watering_seconds=threshold_data.watering_seconds,
         soak_minutes=threshold_data.soak_minutes,
         daily_budget_minutes=threshold_data.daily_budget_minutes,
+        daily_budget_litres=threshold_data.daily_budget_litres,
         window_start_hour=threshold_data.window_start_hour,
         window_end_hour=threshold_data.window_end_hour,
     )
+    await run_in_threadpool(scheduler.wake)
     return config
 
+
+def _candidate_params(current: DecisionParams, candidate: WhatIfCandidate) -> DecisionParams:
+    fields = candidate.model_dump(
+        exclude={"schedules", "air_temp_min", "air_temp_max", "air_humidity_min", "air_humidity_max"},
+        exclude_none=True,
+    )
+    if "soil_moisture_low" in fields:
+        fields["low"] = fields.pop("soil_moisture_low")
+    if "soil_moisture_high" in fields:
+        fields["high"] = fields.pop("soil_moisture_high")
+    params = replace(current, **fields)
+    if params.low >= params.high:
+        raise HTTPException(status_code=422, detail="soil_moisture_low must be below soil_moisture_high")
+    if params.window_start_hour >= params.window_end_hour:
+        raise HTTPException(status_code=422, detail="window_start_hour must be before window_end_hour")
+    return params
+
+
+@router.post("/whatif")
+async def whatif(request: WhatIfRequest, session: AsyncSession = Depends(get_session)):
+    """Replay candidate thresholds/schedules over the last ``days`` of recorded readings.
+
+    Each candidate runs through the controller's decision rules; the result
+    has predicted watering minutes, cycles, budget hits (and litres, with a
+    flow meter) per day next to what was actually watered.
+    """
+    current = DecisionParams.from_thresholds(await ThresholdRepository(session).get_current())
+    candidates = [Candidate(_candidate_params(current, c), c.schedules) for c in request.candidates]
+    today = datetime.utcnow().date()
+    history = await load_history(session, datetime.combine(today - timedelta(days=request.days - 1), time()))
+    return await run_in_threadpool(summary, history, candidates, request.cycle_gain)
+
+
+@router.get("/runtime", response_model=RuntimeConfigResponse)
+def get_runtime_config_status(runtime = Depends(get_runtime_config)):
+    """The configuration the controller runs with and its version.
+
+    Edits to the config file are picked up within ``config_poll_sec``.
+    """
+    return runtime.status()
+
+
+@router.post("/runtime/reload", response_model=ReloadResponse)
+def reload_runtime_config(runtime = Depends(get_runtime_config)):
+    """Reload the config file now instead of waiting for the watcher."""
+    reloaded = runtime.reload()
+    return {**runtime.status(), "reloaded": reloaded}
@@ -1,37 +1,188 @@
 
-from fastapi import APIRouter, Depends, HTTPException
+import math
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from src.app.api.routes_config import ThresholdUpdate
+from src.app.database.engine import get_session
+from src.app.database.repository import ScheduleRepository, ThresholdRepository
 from src.app.models import ValveCommand, WateringMode
-from src.app.dependencies import get_valve, get_state_repo
+from src.app.dependencies import get_valve, get_state_repo, get_scheduler, get_valve_gate
 
 router = APIRouter(prefix="/control", tags=["control"])
 
 
+class ValveBatchCommand(BaseModel):
+    type: Literal["valve"]
+    action: Literal["open", "close"]
+    seconds: int | None = Field(None, gt=0)
+
+
+class ModeBatchCommand(BaseModel):
+    type: Literal["mode"]
+    mode: Literal["auto", "manual"]
+
+
+class ThresholdsBatchCommand(ThresholdUpdate):
+    type: Literal["thresholds"]
+
+
+class ScheduleToggleBatchCommand(BaseModel):
+    type: Literal["schedule_toggle"]
+    id: int
+    enabled: bool | None = None     # None flips the current value
+
+
+BatchCommand = Annotated[
+    ValveBatchCommand | ModeBatchCommand | ThresholdsBatchCommand | ScheduleToggleBatchCommand,
+    Field(discriminator="type"),
+]
+
+
+class BatchRequest(BaseModel):
+    """Schema for an ordered list of commands applied in order, undone on failure."""
+    commands: list[BatchCommand] = Field(..., min_length=1, max_length=50)
+
+
+class BatchResult(BaseModel):
+    index: int
+    type: str
+    ok: bool = True
+    status: str | None = None       # valve commands: "accepted" or "merged" by the gate
+    detail: dict | None = None
+
+
+class BatchResponse(BaseModel):
+    ok: bool
+    results: list[BatchResult]
+
+
+def _client_id(request: Request) -> str:
+    """Rate-limit key: an explicit ``X-Client-Id`` or the peer address."""
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "unknown")
+
+
+def _raise_if_limited(result) -> None:
+    if result.status == "rate_limited":
+        raise HTTPException(
+            status_code=429,
+            detail="Too many valve commands",
+            headers={"Retry-After": str(math.ceil(result.retry_after))},
+        )
+
+
 @router.post("/valve")
 def control_valve(
     cmd: ValveCommand,
-    valve = Depends(get_valve),
-    state_repo = Depends(get_state_repo),
+    request: Request,
+    valve_gate = Depends(get_valve_gate),
+    scheduler = Depends(get_scheduler),
 ):
-    if cmd.action == "open":
-        if cmd.seconds and hasattr(valve, "open_for"):
-            valve.open_for(cmd.seconds)  # type: ignore[attr-defined]
-        else:
-            valve.open()
-        state_repo.set_valve_open(True)
-    elif cmd.action == "close":
-        valve.close()
-        state_repo.set_valve_open(False)
-    else:
+    """Open/close the valve; repeated commands are merged and storms are rate limited."""
+    if cmd.action not in ("open", "close"):
         raise HTTPException(status_code=400, detail="Unknown action")
-    return {"ok": True}
+    result = valve_gate.submit(_client_id(request), cmd.action, cmd.seconds)
+    _raise_if_limited(result)
+    if result.status == "accepted":
+        scheduler.wake()
+    return {"ok": True, "status": result.status}
 
 
 @router.post("/mode")
 def set_mode(
     mode: WateringMode,
     state_repo = Depends(get_state_repo),
+    scheduler = Depends(get_scheduler),
 ):
     if mode.mode not in ("auto", "manual"):
         raise HTTPException(status_code=400, detail="Unknown mode")
     state_repo.set_mode(mode.mode)
+    scheduler.wake()
     return {"ok": True, "mode": mode.mode}
+
+
+def _undo(valve, state_repo, before: dict, commands: list, mode_set: str | None) -> None:
+    """Put the mode and valve back after a failed batch.
+
+    Only what the batch commanded is restored. The mode is restored only while
+    it still holds ``mode_set``, the last mode the batch applied, so a change
+    made meanwhile through ``/control/mode`` or MQTT is kept. A valve it opened
+    is closed again; one it closed stays closed rather than reopening without
+    its timer.
+    """
+    if mode_set is not None and state_repo.snapshot()["mode"] == mode_set:
+        state_repo.set_mode(before["mode"])
+    if any(isinstance(cmd, ValveBatchCommand) for cmd in commands) and not before["valve_open"] and valve.is_open:
+        valve.close()
+        state_repo.set_valve_open(False)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def control_batch(
+    batch: BatchRequest,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    valve = Depends(get_valve),
+    state_repo = Depends(get_state_repo),
+    scheduler = Depends(get_scheduler),
+    valve_gate = Depends(get_valve_gate),
+):
+    """Validate and apply an ordered list of commands in one request.
+
+    Commands run in list order. Threshold and schedule changes share one DB
+    transaction that commits after the last command; valve commands go
+    through the valve gate like ``/control/valve`` (merging and rate limits
+    apply per command). If a command fails the transaction is rolled back
+    and the mode and valve are restored (see ``_undo``). Batches are not
+    isolated: commands from other requests and workers may interleave, and
+    the undo leaves their changes in place.
+    """
+    schedules = ScheduleRepository(session, autocommit=False)
+    thresholds = ThresholdRepository(session, autocommit=False)
+
+    for index, cmd in enumerate(batch.commands):
+        if isinstance(cmd, ScheduleToggleBatchCommand) and await schedules.get_by_id(cmd.id) is None:
+            raise HTTPException(
+                status_code=404,
+                detail={"index": index, "error": f"Schedule {cmd.id} not found"},
+            )
+
+    client = _client_id(request)
+    before = await run_in_threadpool(state_repo.snapshot)
+    results = [BatchResult(index=index, type=cmd.type) for index, cmd in enumerate(batch.commands)]
+    mode_set = None
+    try:
+        for result, cmd in zip(results, batch.commands):
+            if isinstance(cmd, ThresholdsBatchCommand):
+                config = await thresholds.update(**cmd.model_dump(exclude={"type"}))
+                result.detail = {"threshold_id": config.id}
+            elif isinstance(cmd, ScheduleToggleBatchCommand):
+                schedule = await schedules.get_by_id(cmd.id)
+                enabled = (not schedule.enabled) if cmd.enabled is None else cmd.enabled
+                schedule = await schedules.update(cmd.id, enabled=enabled)
+                result.detail = {"id": schedule.id, "enabled": schedule.enabled}
+            elif isinstance(cmd, ValveBatchCommand):
+                gate = await run_in_threadpool(valve_gate.submit, client, cmd.action, cmd.seconds)
+                if gate.status == "rate_limited":
+                    raise HTTPException(
+                        status_code=429,
+                        detail={"index": result.index, "error": "Too many valve commands"},
+                        headers={"Retry-After": str(math.ceil(gate.retry_after))},
+                    )
+                result.status = gate.status
+                result.detail = {"action": cmd.action, "seconds": cmd.seconds}
+            elif isinstance(cmd, ModeBatchCommand):
+                await run_in_threadpool(state_repo.set_mode, cmd.mode)
+                mode_set = cmd.mode
+                result.detail = {"mode": cmd.mode}
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        await run_in_threadpool(_undo, valve, state_repo, before, batch.commands, mode_set)
+        raise
+    finally:
+        await run_in_threadpool(scheduler.wake)
+
+    return BatchResponse(ok=True, results=results)
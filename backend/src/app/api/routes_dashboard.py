@@ -0,0 +1,141 @@
+
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from src.app.api.encoding import EncodedCache, negotiate_encoding
+from src.app.api.routes_config import ThresholdResponse
+from src.app.api.routes_history import WateringEventResponse
+from src.app.api.routes_schedule import ScheduleResponse
+from src.app.api.routes_status import metrics_from_snapshot
+from src.app.database.engine import get_engine
+from src.app.database.repository import (
+    ScheduleRepository,
+    SensorReadingRepository,
+    ThresholdRepository,
+    WateringEventRepository,
+)
+from src.app.dependencies import get_state_repo
+from src.app.models import Metrics
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+TREND_HOURS = 24
+RECENT_EVENTS = 5
+
+
+class UsageToday(BaseModel):
+    """Schema for today's watering against the daily budgets."""
+    watered_seconds: int
+    budget_seconds: int
+    watered_litres: float
+    budget_litres: float | None
+
+
+class TrendPoint(BaseModel):
+    """Schema for the average soil moisture of one hour."""
+    hour: datetime
+    moisture_rel: float
+
+
+class DashboardResponse(BaseModel):
+    """Schema for everything the dashboard page shows."""
+    version: str
+    metrics: Metrics
+    thresholds: ThresholdResponse
+    schedules: list[ScheduleResponse]       # enabled ones for today and tomorrow
+    usage: UsageToday
+    moisture_trend: list[TrendPoint]
+    recent_events: list[WateringEventResponse]
+
+
+class DashboardReadModel:
+    """Database part of the dashboard, reloaded only when its inputs change.
+
+    The key is the state repository's ``data_version`` (bumped by threshold and
+    schedule changes and by recorded history) plus the current hour, which
+    moves the trend window and the day of the schedules. The live state is
+    merged in per request from the in-memory snapshot.
+    """
+
+    def __init__(self) -> None:
+        self._key = None
+        self._data: dict | None = None
+        self._body = EncodedCache()
+
+    async def _load(self, hour: datetime) -> dict:
+        async with AsyncSession(get_engine()) as session:
+            thresholds = await ThresholdRepository(session).get_current()
+            schedule_repo = ScheduleRepository(session)
+            schedules = []
+            for day in (hour.date(), hour.date() + timedelta(days=1)):
+                schedules += await schedule_repo.get_enabled_for_date(day)
+            trend = await SensorReadingRepository(session).hourly_moisture(
+                hour - timedelta(hours=TREND_HOURS - 1)
+            )
+            events = await WateringEventRepository(session).get_recent(RECENT_EVENTS)
+            return dict(
+                thresholds=ThresholdResponse.model_validate(thresholds),
+                schedules=[
+                    ScheduleResponse.model_validate(s)
+                    for s in sorted(schedules, key=lambda s: (s.schedule_date, s.schedule_time))
+                ],
+                moisture_trend=[TrendPoint(hour=h, moisture_rel=m) for h, m in trend],
+                recent_events=[WateringEventResponse.model_validate(e) for e in events],
+            )
+
+    async def data(self, data_version: int, now: datetime) -> tuple[tuple, dict]:
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        key = (data_version, hour)
+        if key != self._key:
+            self._data = await self._load(hour)
+            self._key = key
+        return self._key, self._data
+
+    def body(self, version: str, snap: dict, data: dict, encoding: str | None) -> bytes:
+        def build() -> bytes:
+            thresholds = data["thresholds"]
+            dashboard = DashboardResponse(
+                version=version,
+                metrics=metrics_from_snapshot(snap),
+                usage=UsageToday(
+                    watered_seconds=snap["daily_watered_seconds"],
+                    budget_seconds=thresholds.daily_budget_minutes * 60,
+                    watered_litres=round(snap["daily_watered_litres"], 2),
+                    budget_litres=thresholds.daily_budget_litres,
+                ),
+                **data,
+            )
+            return dashboard.model_dump_json().encode()
+
+        return self._body.get(version, build, encoding)
+
+
+_read_model = DashboardReadModel()
+
+
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+    state_repo = Depends(get_state_repo),
+):
+    """State, thresholds, upcoming schedules, today's usage and trends in one response.
+
+    Served with a weak ``ETag``; a matching ``If-None-Match`` gets ``304``.
+    """
+    snap = await run_in_threadpool(state_repo.snapshot)
+    (data_version, hour), data = await _read_model.data(snap["data_version"], datetime.utcnow())
+    version = f"{snap['version']:x}.{data_version}.{hour:%Y%m%d%H}"
+    etag = f'W/"{version}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(accept_encoding, ("br", "gzip"))
+    body = _read_model.body(version, snap, data, encoding)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
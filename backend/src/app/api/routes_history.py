@@ -0,0 +1,92 @@
+
+from datetime import datetime
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.app.api.encoding import stream_models
+from src.app.database.engine import get_engine
+from src.app.database.repository import SensorReadingRepository, WateringEventRepository
+from src.app.services import export
+
+
+router = APIRouter(prefix="/history", tags=["history"])
+
+
+class ReadingResponse(BaseModel):
+    """Schema for a stored sensor reading."""
+    timestamp: datetime
+    reading_type: str
+    temperature_c: float | None
+    humidity_rel: float | None
+    moisture_rel: float | None
+
+    class Config:
+        from_attributes = True
+
+
+class WateringEventResponse(BaseModel):
+    """Schema for a recorded watering cycle."""
+    started_at: datetime
+    duration_seconds: int
+    reason: str
+    moisture_rel: float | None
+    litres: float | None
+
+    class Config:
+        from_attributes = True
+
+
+@router.get("/readings")
+async def stream_readings(
+    reading_type: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$"),
+    accept_encoding: str | None = Header(None),
+):
+    """Stream stored sensor readings, oldest first."""
+
+    async def rows():
+        # the stream opens its own session: request-scoped ones close before the body is sent
+        async with AsyncSession(get_engine()) as session:
+            async for reading in SensorReadingRepository(session).stream(reading_type, since, until):
+                yield ReadingResponse.model_validate(reading)
+
+    return stream_models(rows(), fmt, accept_encoding)
+
+
+@router.get("/events")
+async def stream_events(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$"),
+    accept_encoding: str | None = Header(None),
+):
+    """Stream recorded watering cycles, oldest first."""
+
+    async def rows():
+        async with AsyncSession(get_engine()) as session:
+            async for event in WateringEventRepository(session).stream(since, until):
+                yield WateringEventResponse.model_validate(event)
+
+    return stream_models(rows(), fmt, accept_encoding)
+
+
+@router.get("/export")
+async def export_history(
+    table: str = Query("readings", pattern="^(readings|events)$"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    chunk_size: int = Query(export.DEFAULT_CHUNK_SIZE, gt=0, le=50_000),
+):
+    """Stream a history table as a zstd-compressed Arrow IPC stream."""
+    try:
+        export.schema(table)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return StreamingResponse(
+        export.arrow_stream(get_engine(), table, since, until, chunk_size),
+        media_type="application/vnd.apache.arrow.stream",
+        headers={"Content-Disposition": f'attachment; filename="{table}.arrows"'},
+    )
@@ -0,0 +1,134 @@
+
+from datetime import datetime
+from typing import Any, Literal
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.app.database.engine import get_session
+from src.app.database.repository import RuleRepository
+from src.app.dependencies import get_scheduler
+from src.app.services.rules import compile_rule
+
+
+router = APIRouter(prefix="/rules", tags=["rules"])
+
+
+class RuleCondition(BaseModel):
+    """Schema for one rule condition, e.g. ``air.temperature_c < 4``."""
+    field: str
+    op: str
+    value: Any
+
+
+class RuleCreate(BaseModel):
+    """Schema for creating a watering rule."""
+    name: str = Field(..., min_length=1, max_length=100)
+    action: Literal["skip", "water"]
+    priority: int = 0
+    enabled: bool = True
+    conditions: list[RuleCondition] = Field(default_factory=list, max_length=32)
+
+
+class RuleUpdate(BaseModel):
+    """Schema for updating a watering rule."""
+    name: str | None = Field(None, min_length=1, max_length=100)
+    action: Literal["skip", "water"] | None = None
+    priority: int | None = None
+    enabled: bool | None = None
+    conditions: list[RuleCondition] | None = Field(None, max_length=32)
+
+
+class RuleResponse(BaseModel):
+    """Schema for rule response."""
+    id: int
+    name: str
+    action: str
+    priority: int
+    enabled: bool
+    conditions: list[RuleCondition]
+    updated_at: datetime
+
+
+def _response(rule) -> RuleResponse:
+    spec = RuleRepository.spec(rule)
+    return RuleResponse(
+        id=rule.id,
+        enabled=rule.enabled,
+        updated_at=rule.updated_at,
+        **spec,
+    )
+
+
+def _validate(action: str, conditions: list[RuleCondition]) -> None:
+    try:
+        compile_rule({"action": action, "conditions": [c.model_dump() for c in conditions]})
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@router.get("", response_model=list[RuleResponse])
+async def list_rules(session: AsyncSession = Depends(get_session)):
+    """List all watering rules, highest priority first."""
+    return [_response(rule) for rule in await RuleRepository(session).get_all()]
+
+
+@router.post("", response_model=RuleResponse, status_code=201)
+async def create_rule(
+    rule_data: RuleCreate,
+    session: AsyncSession = Depends(get_session),
+    scheduler = Depends(get_scheduler),
+):
+    """Create a rule; the controller compiles it before its next tick."""
+    _validate(rule_data.action, rule_data.conditions)
+    rule = await RuleRepository(session).create(
+        name=rule_data.name,
+        action=rule_data.action,
+        conditions=[c.model_dump() for c in rule_data.conditions],
+        priority=rule_data.priority,
+        enabled=rule_data.enabled,
+    )
+    await run_in_threadpool(scheduler.wake)
+    return _response(rule)
+
+
+@router.put("/{rule_id}", response_model=RuleResponse)
+async def update_rule(
+    rule_id: int,
+    rule_data: RuleUpdate,
+    session: AsyncSession = Depends(get_session),
+    scheduler = Depends(get_scheduler),
+):
+    """Update a rule."""
+    repo = RuleRepository(session)
+    rule = await repo.get_by_id(rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    current = RuleRepository.spec(rule)
+    conditions = rule_data.conditions
+    if conditions is None:
+        conditions = [RuleCondition(**c) for c in current["conditions"]]
+    _validate(rule_data.action or current["action"], conditions)
+    rule = await repo.update(
+        rule_id,
+        name=rule_data.name,
+        action=rule_data.action,
+        priority=rule_data.priority,
+        enabled=rule_data.enabled,
+        conditions=[c.model_dump() for c in rule_data.conditions] if rule_data.conditions is not None else None,
+    )
+    await run_in_threadpool(scheduler.wake)
+    return _response(rule)
+
+
+@router.delete("/{rule_id}")
+async def delete_rule(
+    rule_id: int,
+    session: AsyncSession = Depends(get_session),
+    scheduler = Depends(get_scheduler),
+):
+    """Delete a rule."""
+    if not await RuleRepository(session).delete_by_id(rule_id):
+        raise HTTPException(status_code=404, detail="Rule not found")
+    await run_in_threadpool(scheduler.wake)
+    return {"ok": True, "id": rule_id}
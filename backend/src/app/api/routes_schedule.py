@@ -1,8 +1,11 @@
 from datetime import date, time
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.app.database.engine import get_session
+from src.app.api.encoding import stream_models
+from src.app.database.engine import get_engine, get_session
+from src.app.dependencies import get_scheduler
 from src.app.database.repository import ScheduleRepository
 
 
@@ -41,17 +44,31 @@ class ScheduleResponse(BaseModel):
 
 
 @router.get("/list", response_model=list[ScheduleResponse])
-async def list_schedules(session: AsyncSession = Depends(get_session)):
-    """List all watering schedules."""
+async def list_schedules(
+    fmt: str | None = Query(None, alias="format", pattern="^(ndjson|json)$"),
+    accept_encoding: str | None = Header(None),
+    session: AsyncSession = Depends(get_session),
+):
+    """List all watering schedules (``format=ndjson|json`` streams them)."""
+    if fmt is not None:
+        return stream_models(_stream_schedules(), fmt, accept_encoding)
     repo = ScheduleRepository(session)
     schedules = await repo.get_all()
     return schedules
 
 
+async def _stream_schedules():
+    # request-scoped sessions are closed before a streamed body is sent
+    async with AsyncSession(get_engine()) as session:
+        async for schedule in ScheduleRepository(session).stream_all():
+            yield ScheduleResponse.model_validate(schedule)
+
+
 @router.post("/create", response_model=ScheduleResponse, status_code=201)
 async def create_schedule(
     schedule_data: ScheduleCreate,
     session: AsyncSession = Depends(get_session),
+    scheduler = Depends(get_scheduler),
 ):
     """Create a new watering schedule."""
     repo = ScheduleRepository(session)
@@ -62,6 +79,7 @@ async def create_schedule(
         duration_seconds=schedule_data.duration_seconds,
         enabled=schedule_data.enabled,
     )
+    await run_in_threadpool(scheduler.wake)
     return schedule
 
 
@@ -70,6 +88,7 @@ async def update_schedule(
     schedule_id: int,
     schedule_data: ScheduleUpdate,
     session: AsyncSession = Depends(get_session),
+    scheduler = Depends(get_scheduler),
 ):
     """Update an existing schedule."""
     repo = ScheduleRepository(session)
@@ -83,6 +102,7 @@ async def update_schedule(
     )
     if schedule is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
+    await run_in_threadpool(scheduler.wake)
     return schedule
 
 
@@ -90,12 +110,14 @@ async def update_schedule(
 async def delete_schedule(
     schedule_id: int,
     session: AsyncSession = Depends(get_session),
+    scheduler = Depends(get_scheduler),
 ):
     """Delete a schedule."""
     repo = ScheduleRepository(session)
     deleted = await repo.delete_by_id(schedule_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Schedule not found")
+    await run_in_threadpool(scheduler.wake)
     return {"ok": True, "id": schedule_id}
 
 
@@ -103,11 +125,13 @@ async def delete_schedule(
 async def toggle_schedule(
     schedule_id: int,
     session: AsyncSession = Depends(get_session),
+    scheduler = Depends(get_scheduler),
 ):
     """Toggle the enabled status of a schedule."""
     repo = ScheduleRepository(session)
     schedule = await repo.toggle_enabled(schedule_id)
     if schedule is None:
         raise HTTPException(status_code=404, detail="Schedule not found")
+    await run_in_threadpool(scheduler.wake)
     return schedule
 
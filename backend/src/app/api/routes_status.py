@@ -1,22 +1,85 @@
 
-from fastapi import APIRouter, Depends
-from src.app.models import Metrics
+import asyncio
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from src.app.api.encoding import EncodedCache, negotiate_encoding
+from src.app.config import config
+from src.app.models import Forecast, Metrics, SensorHealth
 from src.app.dependencies import get_state_repo, get_controller, get_valve
 
 router = APIRouter(prefix="/status", tags=["status"])
 
+# polled every second or so; the body only changes when the state version does
+_metrics_cache = EncodedCache()
+
 
 @router.get("/metrics", response_model=Metrics)
 def get_metrics(
+    accept_encoding: str | None = Header(None),
     state_repo = Depends(get_state_repo),
     controller = Depends(get_controller),
     valve = Depends(get_valve),
 ):
     snap = state_repo.snapshot()
+    encoding = negotiate_encoding(accept_encoding, ("br", "gzip"))
+    build = lambda: _metrics_json(snap)
+    if len(_metrics_cache.get(snap["version"], build)) < config.compress_min_bytes:
+        encoding = None  # the same minimum as CompressionMiddleware
+    body = _metrics_cache.get(snap["version"], build, encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _metrics_json(snap: dict) -> bytes:
+    return metrics_from_snapshot(snap).model_dump_json().encode()
+
+
+def metrics_from_snapshot(snap: dict) -> Metrics:
     return Metrics(
         air=snap["air"],
         soil=snap["soil"],
         valve_open=snap["valve_open"],
         mode=snap["mode"],
         state=snap["controller_state"],
+        flow_lpm=snap["flow_lpm"],
+        daily_watered_litres=round(snap["daily_watered_litres"], 2),
+        leak_detected=snap["leak_detected"],
     )
+
+
+@router.get("/stream")
+async def stream_metrics(
+    interval: float = Query(1.0, ge=0.2, le=60.0),
+    heartbeat: float = Query(30.0, ge=1.0),
+    state_repo = Depends(get_state_repo),
+):
+    """Stream metrics as NDJSON, one line per change (and a heartbeat when idle)."""
+
+    async def lines():
+        last = None
+        idle = 0.0
+        while True:
+            snap = await run_in_threadpool(state_repo.snapshot)
+            line = _metrics_cache.get(snap["version"], lambda: _metrics_json(snap)).decode()
+            if line != last or idle >= heartbeat:
+                yield line + "\n"
+                last = line
+                idle = 0.0
+            await asyncio.sleep(interval)
+            idle += interval
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.get("/forecast", response_model=Forecast)
+def get_forecast(controller = Depends(get_controller)):
+    return controller.forecast()
+
+
+@router.get("/health", response_model=list[SensorHealth])
+def get_sensor_health(controller = Depends(get_controller)):
+    """Per-channel sensor health; flagged readings are not used for decisions."""
+    return controller.health()
@@ -1,25 +1,304 @@
 
-from pydantic import BaseModel, Field
+import copy
+import json
+import os
+import threading
+from datetime import datetime
+from pydantic import BaseModel, Field, ValidationError, model_validator
 
 
 class WateringWindow(BaseModel):
-    start_hour: int = 3
-    end_hour: int = 6  # not inclusive (3:00–5:59)
+    start_hour: int = Field(3, ge=0, lt=24)
+    end_hour: int = Field(6, ge=1, le=24)  # not inclusive (3:00–5:59)
+
+    @model_validator(mode="after")
+    def _check_order(self):
+        if self.start_hour >= self.end_hour:
+            raise ValueError("window start_hour must be before end_hour")
+        return self
 
 
 class ControllerConfig(BaseModel):
     threshold_low: float = Field(0.38, ge=0.0, le=1.0)
     threshold_high: float = Field(0.45, ge=0.0, le=1.0)
-    watering_seconds: int = 90
-    soak_minutes: int = 8
-    max_cycle_minutes: int = 30
-    daily_budget_minutes: int = 20
+    watering_seconds: int = Field(90, gt=0)
+    soak_minutes: int = Field(8, gt=0)
+    max_cycle_minutes: int = Field(30, gt=0)
+    daily_budget_minutes: int = Field(20, gt=0)
+    daily_budget_litres: float | None = None  # only enforced with a flow meter
     window: WateringWindow = WateringWindow()
 
+    @model_validator(mode="after")
+    def _check_thresholds(self):
+        if self.threshold_low >= self.threshold_high:
+            raise ValueError("threshold_low must be below threshold_high")
+        return self
+
+
+class HardwareConfig(BaseModel):
+    kind: str = os.environ.get("IRRIGATION_HARDWARE", "mock")  # "mock" / "pi" / "sim"
+    valve_gpio_pin: int = 17
+    moisture_channel: int = 0
+    moisture_dry_raw: int = 21000
+    moisture_wet_raw: int = 11000
+    moisture_oversample: int = Field(1, ge=1, le=1024)  # ADC conversions averaged per soil reading
+    flow_gpio_pin: int | None = 27       # None when no flow meter is fitted
+    flow_pulses_per_litre: float = 450.0  # YF-S201 style sensors: ~7.5 Hz per L/min
+    # "sim": real drivers against simulated buses (see hardware/sim.py)
+    sim_latency_sec: float = 0.0
+    sim_fail_rate: float = 0.0
+
+
+class MqttConfig(BaseModel):
+    host: str | None = os.environ.get("IRRIGATION_MQTT_HOST")  # None disables the bridge
+    port: int = int(os.environ.get("IRRIGATION_MQTT_PORT", "1883"))
+    username: str | None = os.environ.get("IRRIGATION_MQTT_USERNAME")
+    password: str | None = os.environ.get("IRRIGATION_MQTT_PASSWORD")
+    client_id: str = "irrigation-controller"
+    topic_prefix: str = "irrigation"
+    qos: int = 1
+    batch_interval_sec: float = 1.0   # newest event per topic is sent once per interval
+
 
 class AppConfig(BaseModel):
     controller: ControllerConfig = ControllerConfig()
-    tick_interval_sec: int = 5
+    hardware: HardwareConfig = HardwareConfig()
+    mqtt: MqttConfig = MqttConfig()
+    tick_interval_sec: int = Field(5, gt=0)           # cadence while watering or inside the window
+    idle_sample_interval_sec: int = Field(60, gt=0)   # sensor cadence when nothing is pending
+    history_interval_sec: int = Field(300, gt=0)
+    sensor_hold_sec: int = Field(180, ge=0)  # how long a flagged soil reading falls back to the last good one
+    leak_threshold_lpm: float = Field(0.2, ge=0.0)  # flow above this with the valve closed counts as a leak
+    leak_confirm_ticks: int = Field(2, ge=1)
+    state_path: str = "./controller_state.json"
+    decision_log_path: str = "./decisions.log"
+    decision_log_max_bytes: int = 1_000_000
+    decision_log_backups: int = 3
+    # raw readings go to segment files here instead of the database (see ``SampleStore``)
+    sample_store_dir: str | None = None
+    sample_flush_sec: float = Field(1.0, gt=0)
+    compress_min_bytes: int = 500        # smaller responses are not worth compressing
+    # span tracing: fraction of ticks/requests traced; 0 disables it (X-Trace-Id forces a trace)
+    trace_sample_rate: float = float(os.environ.get("IRRIGATION_TRACE_SAMPLE_RATE", "0"))
+    trace_dir: str = "./traces"
+    trace_max_bytes: int = 5_000_000
+    trace_backups: int = 2
+    # multi-worker deployments: one process owns the controller, the rest proxy to it
+    leader_lock_path: str = "./controller.lock"
+    ipc_socket_path: str = "./controller.sock"
+    leader_poll_sec: float = Field(2.0, gt=0)   # how often followers retry the lock
+
+    # runtime config file, watched for changes (see ``RuntimeConfig``)
+    config_path: str = os.environ.get("IRRIGATION_CONFIG", "./irrigation.json")
+    config_poll_sec: float = Field(2.0, gt=0)
+
+
+# Sections that take effect while running; everything else is read once at
+# startup (hardware pins, paths, MQTT, ...) and needs a restart to change.
+RELOADABLE = (
+    "controller",
+    "tick_interval_sec",
+    "idle_sample_interval_sec",
+    "history_interval_sec",
+    "sensor_hold_sec",
+    "leak_threshold_lpm",
+    "leak_confirm_ticks",
+    "hardware.moisture_dry_raw",
+    "hardware.moisture_wet_raw",
+    "hardware.moisture_oversample",
+)
+
+ENV_PREFIX = "IRRIGATION__"
+
+
+def _env_overrides(environ) -> dict:
+    """``IRRIGATION__CONTROLLER__WINDOW__START_HOUR=4`` -> ``{"controller": {"window": {"start_hour": 4}}}``."""
+    overrides: dict = {}
+    for key, value in environ.items():
+        if not key.startswith(ENV_PREFIX):
+            continue
+        *parents, leaf = key[len(ENV_PREFIX):].lower().split("__")
+        node = overrides
+        for part in parents:
+            node = node.setdefault(part, {})
+        try:
+            node[leaf] = json.loads(value)
+        except ValueError:
+            node[leaf] = value
+    return overrides
+
+
+def _merge(base: dict, override: dict) -> dict:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def load_config(path: str | None = None, environ=None) -> AppConfig:
+    """Defaults, overridden by the JSON file at ``path`` (if it exists), overridden by ``IRRIGATION__*``.
+
+    Raises ``ValueError`` (pydantic's ``ValidationError`` included) for an
+    unreadable or invalid configuration.
+    """
+    data: dict = {}
+    if path is not None and os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: expected a JSON object")
+    data = _merge(data, _env_overrides(os.environ if environ is None else environ))
+    return AppConfig.model_validate(data)
+
+
+def _get(data: dict, dotted: str):
+    for part in dotted.split("."):
+        data = data[part]
+    return data
+
+
+def _set(data: dict, dotted: str, value) -> None:
+    *parents, leaf = dotted.split(".")
+    for part in parents:
+        data = data[part]
+    data[leaf] = value
+
+
+def _leaf_diff(old, new, prefix: str = "") -> list[str]:
+    if isinstance(old, dict) and isinstance(new, dict):
+        return [d for key in old.keys() | new.keys() for d in _leaf_diff(old.get(key), new.get(key), f"{prefix}{key}.")]
+    return [prefix.rstrip(".")] if old != new else []
+
+
+class RuntimeConfig:
+    """The active ``AppConfig``, reloaded from its file without a restart.
+
+    ``check`` compares the file's mtime (cheap enough to poll every couple
+    of seconds on a Pi) and ``reload`` builds and validates a complete new
+    ``AppConfig`` before swapping it in with one assignment, so readers see
+    either the old or the new configuration, never a mix. An invalid file
+    leaves the running configuration untouched and is reported in
+    ``status``. Only the ``RELOADABLE`` sections change while running;
+    other differences are listed as ``restart_required``.
+    """
+
+    def __init__(self, path: str | None = None, current: AppConfig | None = None) -> None:
+        self.path = path
+        self._current = current if current is not None else load_config(path)
+        self.version = 1
+        self.loaded_at = datetime.utcnow()
+        self.last_error: str | None = None
+        self.restart_required: list[str] = []
+        self._mtime = self._stat()
+        self._listeners: list = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def current(self) -> AppConfig:
+        return self._current
+
+    def subscribe(self, callback) -> None:
+        """Call ``callback(config)`` after every swap (on the reloading thread)."""
+        self._listeners.append(callback)
+
+    def _stat(self) -> float | None:
+        try:
+            return os.stat(self.path).st_mtime_ns if self.path else None
+        except OSError:
+            return None
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last look; True if the config was swapped."""
+        mtime = self._stat()
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        return self.reload()
+
+    def reload(self) -> bool:
+        """Load, validate and apply the file; True if the active config changed."""
+        with self._lock:
+            try:
+                loaded = load_config(self.path)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e) if not isinstance(e, ValidationError) else _validation_message(e)
+                return False
+            self.last_error = None
+            old = self._current.model_dump()
+            new = loaded.model_dump()
+            merged = copy.deepcopy(old)
+            for dotted in RELOADABLE:
+                _set(merged, dotted, _get(new, dotted))
+            self.restart_required = sorted(set(_leaf_diff(merged, new)))
+            if merged == old:
+                return False
+            self._current = AppConfig.model_validate(merged)
+            self.version += 1
+            self.loaded_at = datetime.utcnow()
+            current = self._current
+        for callback in self._listeners:
+            try:
+                callback(current)
+            except Exception:
+                pass
+        return True
+
+    def status(self) -> dict:
+        return dict(
+            version=self.version,
+            loaded_at=self.loaded_at.isoformat(),
+            path=self.path,
+            last_error=self.last_error,
+            restart_required=self.restart_required,
+            config=self._current.model_dump(mode="json", include=_reloadable_fields()),
+        )
+
+    def start(self, interval: float = 2.0) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                self.check()
+
+        self._thread = threading.Thread(target=run, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching; listeners belong to whoever started it and are dropped too."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        self._listeners.clear()
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'config'}: {err['msg']}" for err in e.errors())
+
+
+def _reloadable_fields() -> dict:
+    include: dict = {}
+    for dotted in RELOADABLE:
+        *parents, leaf = dotted.split(".")
+        node = include
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = True
+    return include
+
+
+runtime = RuntimeConfig(AppConfig().config_path)
+# startup values; code that should follow reloads calls ``get_config()`` instead
+config = runtime.current
 
 
-config = AppConfig()
+def get_config() -> AppConfig:
+    """The active configuration; take it once per unit of work for a consistent view."""
+    return runtime.current
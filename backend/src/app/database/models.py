@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Boolean, DateTime, Float, Integer, String, Time, Date
+from sqlalchemy import Boolean, DateTime, Float, Integer, String, Text, Time, Date
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -37,6 +37,7 @@ class ThresholdConfig(Base):
     watering_seconds: Mapped[int] = mapped_column(Integer, nullable=False, default=90)
     soak_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=8)
     daily_budget_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=20)
+    daily_budget_litres: Mapped[float] = mapped_column(Float, nullable=True)
     window_start_hour: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
     window_end_hour: Mapped[int] = mapped_column(Integer, nullable=False, default=6)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -55,3 +56,55 @@ class SensorReading(Base):
     moisture_rel: Mapped[float] = mapped_column(Float, nullable=True)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
 
+
+class WateringEvent(Base):
+    """Watering cycles started by the controller."""
+    
+    __tablename__ = "watering_events"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    duration_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    reason: Mapped[str] = mapped_column(String(50), nullable=False)
+    moisture_rel: Mapped[float] = mapped_column(Float, nullable=True)
+    litres: Mapped[float] = mapped_column(Float, nullable=True)
+
+
+class SensorCalibration(Base):
+    """Calibration curve settings of one moisture probe channel."""
+    
+    __tablename__ = "sensor_calibrations"
+    
+    channel: Mapped[int] = mapped_column(Integer, primary_key=True)
+    method: Mapped[str] = mapped_column(String(10), nullable=False, default="linear")
+    temp_coeff: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    reference_temp_c: Mapped[float] = mapped_column(Float, nullable=False, default=20.0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CalibrationPoint(Base):
+    """Reference moisture measured against a raw probe reading."""
+    
+    __tablename__ = "calibration_points"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    channel: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    raw: Mapped[float] = mapped_column(Float, nullable=False)
+    moisture_rel: Mapped[float] = mapped_column(Float, nullable=False)
+    temperature_c: Mapped[float] = mapped_column(Float, nullable=True)
+    captured_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class WateringRule(Base):
+    """User-defined rule that skips or requests watering (see services/rules.py)."""
+    
+    __tablename__ = "watering_rules"
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    action: Mapped[str] = mapped_column(String(10), nullable=False)
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    enabled: Mapped[bool] = mapped_column(Boolean, default=True)
+    conditions: Mapped[str] = mapped_column(Text, nullable=False, default="[]")  # JSON list
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,14 +1,39 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from itertools import islice
 from datetime import date, time, datetime
-from sqlalchemy import select, delete
+from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.app.database.models import WateringSchedule, ThresholdConfig, SensorReading
+from src.app.database.models import (
+    CalibrationPoint,
+    SensorCalibration,
+    SensorReading,
+    ThresholdConfig,
+    WateringEvent,
+    WateringRule,
+    WateringSchedule,
+)
+from src.app.database.sample_store import SampleStore, get_sample_store
+from src.app.services.tracing import traced
 
 
+@traced("db")
 class ScheduleRepository:
     """Repository for watering schedule CRUD operations."""
     
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(self, session: AsyncSession, autocommit: bool = True) -> None:
         self.session = session
+        self.autocommit = autocommit
+    
+    async def _save(self, obj: WateringSchedule | None = None) -> None:
+        """Commit (or only flush when the caller owns the transaction)."""
+        if not self.autocommit:
+            await self.session.flush()
+            return
+        await self.session.commit()
+        if obj is not None:
+            await self.session.refresh(obj)
     
     async def create(
         self,
@@ -27,8 +52,7 @@ class ScheduleRepository:
             enabled=enabled,
         )
         self.session.add(schedule)
-        await self.session.commit()
-        await self.session.refresh(schedule)
+        await self._save(schedule)
         return schedule
     
     async def get_by_id(self, schedule_id: int) -> WateringSchedule | None:
@@ -43,6 +67,16 @@ class ScheduleRepository:
         result = await self.session.execute(select(WateringSchedule))
         return list(result.scalars().all())
     
+    async def stream_all(self, chunk_size: int = 500) -> AsyncIterator[WateringSchedule]:
+        """Yield all schedules through a server-side cursor."""
+        result = await self.session.stream_scalars(
+            select(WateringSchedule)
+            .order_by(WateringSchedule.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        async for schedule in result:
+            yield schedule
+    
     async def get_enabled_for_date(self, target_date: date) -> list[WateringSchedule]:
         """Get enabled schedules for a specific date."""
         result = await self.session.execute(
@@ -79,8 +113,7 @@ class ScheduleRepository:
             schedule.enabled = enabled
         
         schedule.updated_at = datetime.utcnow()
-        await self.session.commit()
-        await self.session.refresh(schedule)
+        await self._save(schedule)
         return schedule
     
     async def toggle_enabled(self, schedule_id: int) -> WateringSchedule | None:
@@ -91,8 +124,7 @@ class ScheduleRepository:
         
         schedule.enabled = not schedule.enabled
         schedule.updated_at = datetime.utcnow()
-        await self.session.commit()
-        await self.session.refresh(schedule)
+        await self._save(schedule)
         return schedule
     
     async def delete_by_id(self, schedule_id: int) -> bool:
@@ -100,15 +132,25 @@ class ScheduleRepository:
         result = await self.session.execute(
             delete(WateringSchedule).where(WateringSchedule.id == schedule_id)
         )
-        await self.session.commit()
+        await self._save()
         return result.rowcount > 0
 
 
+@traced("db")
 class ThresholdRepository:
     """Repository for threshold configuration operations."""
     
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(self, session: AsyncSession, autocommit: bool = True) -> None:
         self.session = session
+        self.autocommit = autocommit
+    
+    async def _save(self, obj: ThresholdConfig) -> None:
+        """Commit (or only flush when the caller owns the transaction)."""
+        if not self.autocommit:
+            await self.session.flush()
+            return
+        await self.session.commit()
+        await self.session.refresh(obj)
     
     async def get_current(self) -> ThresholdConfig:
         """Get the current threshold configuration (creates default if none exists)."""
@@ -120,8 +162,7 @@ class ThresholdRepository:
         if config is None:
             config = ThresholdConfig()
             self.session.add(config)
-            await self.session.commit()
-            await self.session.refresh(config)
+            await self._save(config)
         
         return config
     
@@ -136,6 +177,7 @@ class ThresholdRepository:
         watering_seconds: int | None = None,
         soak_minutes: int | None = None,
         daily_budget_minutes: int | None = None,
+        daily_budget_litres: float | None = None,
         window_start_hour: int | None = None,
         window_end_hour: int | None = None,
     ) -> ThresholdConfig:
@@ -160,22 +202,41 @@ class ThresholdRepository:
             config.soak_minutes = soak_minutes
         if daily_budget_minutes is not None:
             config.daily_budget_minutes = daily_budget_minutes
+        if daily_budget_litres is not None:
+            config.daily_budget_litres = daily_budget_litres
         if window_start_hour is not None:
             config.window_start_hour = window_start_hour
         if window_end_hour is not None:
             config.window_end_hour = window_end_hour
         
         config.updated_at = datetime.utcnow()
-        await self.session.commit()
-        await self.session.refresh(config)
+        await self._save(config)
         return config
 
 
+@traced("db")
 class SensorReadingRepository:
-    """Repository for sensor reading history."""
+    """Repository for sensor reading history.
+
+    Readings live in the ``sensor_readings`` table, or in a ``SampleStore``
+    when one is configured (``sample_store_dir``); readings from the store
+    come back as unsaved ``SensorReading`` objects without an ``id``.
+    """
     
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(self, session: AsyncSession, store: SampleStore | None = None) -> None:
         self.session = session
+        self.store = store if store is not None else get_sample_store()
+    
+    @staticmethod
+    def _reading(row: tuple) -> SensorReading:
+        ts, reading_type, temperature_c, humidity_rel, moisture_rel = row
+        return SensorReading(
+            reading_type=reading_type,
+            temperature_c=temperature_c,
+            humidity_rel=humidity_rel,
+            moisture_rel=moisture_rel,
+            timestamp=ts,
+        )
     
     async def create(
         self,
@@ -191,6 +252,10 @@ class SensorReadingRepository:
             humidity_rel=humidity_rel,
             moisture_rel=moisture_rel,
         )
+        if self.store is not None:
+            reading.timestamp = datetime.utcnow()
+            self.store.append(reading_type, temperature_c, humidity_rel, moisture_rel, timestamp=reading.timestamp)
+            return reading
         self.session.add(reading)
         await self.session.commit()
         await self.session.refresh(reading)
@@ -198,6 +263,9 @@ class SensorReadingRepository:
     
     async def get_recent(self, reading_type: str, limit: int = 100) -> list[SensorReading]:
         """Get recent sensor readings of a specific type."""
+        if self.store is not None:
+            rows = self.store.rows(reading_type=reading_type, newest_first=True)
+            return [self._reading(row) for row in await asyncio.to_thread(list, islice(rows, limit))]
         result = await self.session.execute(
             select(SensorReading)
             .where(SensorReading.reading_type == reading_type)
@@ -205,4 +273,298 @@ class SensorReadingRepository:
             .limit(limit)
         )
         return list(result.scalars().all())
+    
+    async def stream(
+        self,
+        reading_type: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        chunk_size: int = 500,
+    ) -> AsyncIterator[SensorReading]:
+        """Yield readings oldest first through a server-side cursor."""
+        if self.store is not None:
+            # segments are read in a worker thread, a chunk at a time, off the event loop
+            rows = self.store.rows(since, until, reading_type)
+            while chunk := await asyncio.to_thread(list, islice(rows, chunk_size)):
+                for row in chunk:
+                    yield self._reading(row)
+            return
+        stmt = select(SensorReading).order_by(SensorReading.timestamp)
+        if reading_type is not None:
+            stmt = stmt.where(SensorReading.reading_type == reading_type)
+        if since is not None:
+            stmt = stmt.where(SensorReading.timestamp >= since)
+        if until is not None:
+            stmt = stmt.where(SensorReading.timestamp < until)
+        result = await self.session.stream_scalars(stmt.execution_options(yield_per=chunk_size))
+        async for reading in result:
+            yield reading
+    
+    async def moisture_series(
+        self, since: datetime, until: datetime | None = None
+    ) -> list[tuple[datetime, float]]:
+        """(timestamp, moisture) of soil readings, oldest first, without loading ORM rows."""
+        if self.store is not None:
+            rows = await asyncio.to_thread(list, self.store.rows(since, until, "soil"))
+            return [(row[0], row[4]) for row in rows if row[4] is not None]
+        stmt = (
+            select(SensorReading.timestamp, SensorReading.moisture_rel)
+            .where(
+                SensorReading.reading_type == "soil",
+                SensorReading.timestamp >= since,
+                SensorReading.moisture_rel.is_not(None),
+            )
+            .order_by(SensorReading.timestamp)
+        )
+        if until is not None:
+            stmt = stmt.where(SensorReading.timestamp < until)
+        result = await self.session.execute(stmt)
+        return [(ts, moisture) for ts, moisture in result.all()]
+    
+    async def series(
+        self, since: datetime, until: datetime | None, reading_type: str
+    ) -> list[tuple[datetime, float | None, float | None, float | None]]:
+        """(timestamp, temperature, humidity, moisture) of one reading type, oldest first."""
+        if self.store is not None:
+            rows = await asyncio.to_thread(list, self.store.rows(since, until, reading_type))
+            return [(row[0], row[2], row[3], row[4]) for row in rows]
+        stmt = (
+            select(
+                SensorReading.timestamp,
+                SensorReading.temperature_c,
+                SensorReading.humidity_rel,
+                SensorReading.moisture_rel,
+            )
+            .where(SensorReading.reading_type == reading_type, SensorReading.timestamp >= since)
+            .order_by(SensorReading.timestamp)
+        )
+        if until is not None:
+            stmt = stmt.where(SensorReading.timestamp < until)
+        result = await self.session.execute(stmt)
+        return [tuple(row) for row in result.all()]
+    
+    async def hourly_moisture(self, since: datetime) -> list[tuple[datetime, float]]:
+        """Average soil moisture per hour since ``since``, oldest first."""
+        if self.store is not None:
+            return await asyncio.to_thread(self.store.hourly_mean, since, "soil", "moisture_rel")
+        hour = func.strftime("%Y-%m-%d %H:00:00", SensorReading.timestamp)
+        result = await self.session.execute(
+            select(hour, func.avg(SensorReading.moisture_rel))
+            .where(
+                SensorReading.reading_type == "soil",
+                SensorReading.timestamp >= since,
+                SensorReading.moisture_rel.is_not(None),
+            )
+            .group_by(hour)
+            .order_by(hour)
+        )
+        return [(datetime.fromisoformat(h), avg) for h, avg in result.all()]
 
+
+@traced("db")
+class WateringEventRepository:
+    """Repository for watering event history."""
+    
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+    
+    async def add_many(self, events: list[dict]) -> None:
+        """Insert several events in one transaction."""
+        self.session.add_all(WateringEvent(**event) for event in events)
+        await self.session.commit()
+    
+    async def get_recent(self, limit: int = 100) -> list[WateringEvent]:
+        """Get the most recent watering events."""
+        result = await self.session.execute(
+            select(WateringEvent).order_by(WateringEvent.started_at.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
+    
+    async def stream(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        chunk_size: int = 500,
+    ) -> AsyncIterator[WateringEvent]:
+        """Yield events oldest first through a server-side cursor."""
+        stmt = select(WateringEvent).order_by(WateringEvent.started_at)
+        if since is not None:
+            stmt = stmt.where(WateringEvent.started_at >= since)
+        if until is not None:
+            stmt = stmt.where(WateringEvent.started_at < until)
+        result = await self.session.stream_scalars(stmt.execution_options(yield_per=chunk_size))
+        async for event in result:
+            yield event
+
+
+@traced("db")
+class CalibrationRepository:
+    """Repository for moisture probe calibration curves and their points."""
+    
+    def __init__(self, session: AsyncSession, autocommit: bool = True) -> None:
+        self.session = session
+        self.autocommit = autocommit
+    
+    async def _save(self, obj=None) -> None:
+        """Commit (or only flush when the caller owns the transaction)."""
+        if not self.autocommit:
+            await self.session.flush()
+            return
+        await self.session.commit()
+        if obj is not None:
+            await self.session.refresh(obj)
+    
+    async def get_settings(self, channel: int) -> SensorCalibration:
+        """Get the curve settings of a channel (creates defaults if none exist)."""
+        settings = await self.session.get(SensorCalibration, channel)
+        if settings is None:
+            settings = SensorCalibration(channel=channel, method="linear", temp_coeff=0.0, reference_temp_c=20.0)
+            self.session.add(settings)
+            await self._save(settings)
+        return settings
+    
+    async def update_settings(
+        self,
+        channel: int,
+        method: str | None = None,
+        temp_coeff: float | None = None,
+        reference_temp_c: float | None = None,
+    ) -> SensorCalibration:
+        """Update the curve settings of a channel."""
+        settings = await self.get_settings(channel)
+        if method is not None:
+            settings.method = method
+        if temp_coeff is not None:
+            settings.temp_coeff = temp_coeff
+        if reference_temp_c is not None:
+            settings.reference_temp_c = reference_temp_c
+        settings.updated_at = datetime.utcnow()
+        await self._save(settings)
+        return settings
+    
+    async def get_points(self, channel: int) -> list[CalibrationPoint]:
+        """Get the points of a channel, ordered by raw reading."""
+        result = await self.session.execute(
+            select(CalibrationPoint)
+            .where(CalibrationPoint.channel == channel)
+            .order_by(CalibrationPoint.raw, CalibrationPoint.id)
+        )
+        return list(result.scalars().all())
+    
+    async def add_point(
+        self,
+        channel: int,
+        raw: float,
+        moisture_rel: float,
+        temperature_c: float | None = None,
+    ) -> CalibrationPoint:
+        """Record a reference moisture for a raw reading."""
+        point = CalibrationPoint(
+            channel=channel,
+            raw=raw,
+            moisture_rel=moisture_rel,
+            temperature_c=temperature_c,
+            captured_at=datetime.utcnow(),
+        )
+        self.session.add(point)
+        await self._save(point)
+        return point
+    
+    async def delete_point(self, channel: int, point_id: int) -> bool:
+        """Delete a point; False if the channel has no such point."""
+        result = await self.session.execute(
+            delete(CalibrationPoint).where(
+                CalibrationPoint.channel == channel,
+                CalibrationPoint.id == point_id,
+            )
+        )
+        await self._save()
+        return result.rowcount > 0
+    
+    async def spec(self, channel: int) -> dict | None:
+        """Curve spec for ``CalibrationCurve.from_spec``; None below two points."""
+        points = await self.get_points(channel)
+        if len(points) < 2:
+            return None
+        settings = await self.get_settings(channel)
+        return dict(
+            method=settings.method,
+            temp_coeff=settings.temp_coeff,
+            reference_temp_c=settings.reference_temp_c,
+            points=[[p.raw, p.moisture_rel, p.temperature_c] for p in points],
+        )
+
+
+@traced("db")
+class RuleRepository:
+    """Repository for user-defined watering rules."""
+    
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+    
+    async def create(
+        self,
+        name: str,
+        action: str,
+        conditions: list[dict],
+        priority: int = 0,
+        enabled: bool = True,
+    ) -> WateringRule:
+        """Create a rule (validate it with ``compile_rule`` first)."""
+        rule = WateringRule(
+            name=name,
+            action=action,
+            conditions=json.dumps(conditions),
+            priority=priority,
+            enabled=enabled,
+        )
+        self.session.add(rule)
+        await self.session.commit()
+        await self.session.refresh(rule)
+        return rule
+    
+    async def get_by_id(self, rule_id: int) -> WateringRule | None:
+        """Get a rule by ID."""
+        result = await self.session.execute(select(WateringRule).where(WateringRule.id == rule_id))
+        return result.scalar_one_or_none()
+    
+    async def get_all(self) -> list[WateringRule]:
+        """Get all rules, highest priority first."""
+        result = await self.session.execute(
+            select(WateringRule).order_by(WateringRule.priority.desc(), WateringRule.id)
+        )
+        return list(result.scalars().all())
+    
+    async def update(self, rule_id: int, **fields) -> WateringRule | None:
+        """Update the given fields of a rule; None values are left as they are."""
+        rule = await self.get_by_id(rule_id)
+        if rule is None:
+            return None
+        for key, value in fields.items():
+            if value is not None:
+                setattr(rule, key, json.dumps(value) if key == "conditions" else value)
+        rule.updated_at = datetime.utcnow()
+        await self.session.commit()
+        await self.session.refresh(rule)
+        return rule
+    
+    async def delete_by_id(self, rule_id: int) -> bool:
+        """Delete a rule by ID."""
+        result = await self.session.execute(delete(WateringRule).where(WateringRule.id == rule_id))
+        await self.session.commit()
+        return result.rowcount > 0
+    
+    async def specs(self) -> list[dict]:
+        """Enabled rules as specs for ``RuleSet``."""
+        result = await self.session.execute(select(WateringRule).where(WateringRule.enabled == True))
+        return [self.spec(rule) for rule in result.scalars().all()]
+    
+    @staticmethod
+    def spec(rule: WateringRule) -> dict:
+        """A stored rule as a ``compile_rule`` spec."""
+        return dict(
+            name=rule.name,
+            action=rule.action,
+            priority=rule.priority,
+            conditions=json.loads(rule.conditions),
+        )
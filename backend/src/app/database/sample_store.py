@@ -0,0 +1,392 @@
+
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, timedelta
+
+
+# Segment file: 16-byte header, then fixed-width little-endian records.
+MAGIC = b"IRSAMP01"
+HEADER = struct.Struct("<8sHH4x")
+# timestamp (µs since the epoch, UTC), kind, channel, temperature, humidity, moisture
+RECORD = struct.Struct("<qBBxxfff")
+_TS = struct.Struct("<q")
+KINDS = ("soil", "air")
+INDEX_STRIDE = 512  # records per sparse index entry (12 KiB of records)
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_NAN = float("nan")
+
+
+def _to_us(ts: datetime) -> int:
+    return (ts - _EPOCH) // _US
+
+
+def _from_us(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=us)
+
+
+def _value(v: float) -> float | None:
+    # NaN marks a missing value; float32 is shown with the digits it actually has
+    return None if v != v else float(format(v, ".7g"))
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError(
+            "numpy is required for array reads (pip install 'home-irrigation-service[speedups]')"
+        ) from e
+    return numpy
+
+
+def record_dtype():
+    """The on-disk record as a numpy structured dtype (``ts`` is ``datetime64[us]``)."""
+    np = _numpy()
+    return np.dtype({
+        "names": ["ts", "kind", "channel", "temperature_c", "humidity_rel", "moisture_rel"],
+        "formats": ["<M8[us]", "u1", "u1", "<f4", "<f4", "<f4"],
+        "offsets": [0, 8, 9, 12, 16, 20],
+        "itemsize": RECORD.size,
+    })
+
+
+class _Segment:
+    """One day of records, read through a shared read-only mmap.
+
+    The mapping is refreshed when the file has grown; ``index`` holds the
+    timestamp of every ``INDEX_STRIDE``-th record, so a time lookup only
+    binary-searches one stretch of the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.map: mmap.mmap | None = None
+        self.count = 0
+        self.index: list[int] = []
+
+    def refresh(self) -> None:
+        size = os.path.getsize(self.path)
+        if size < HEADER.size:
+            self.count = 0  # header not written yet
+            self.index.clear()
+            return
+        count = (size - HEADER.size) // RECORD.size
+        if count == self.count and self.map is not None:
+            return
+        if count < self.count:
+            self.index.clear()  # truncated by tail recovery
+        with open(self.path, "rb") as f:
+            if f.read(8) != MAGIC:
+                raise ValueError(f"{self.path} is not a sample segment")
+            # earlier mappings stay valid for arrays still referencing them
+            self.map = mmap.mmap(f.fileno(), HEADER.size + count * RECORD.size, access=mmap.ACCESS_READ)
+        self.count = count
+        for i in range(len(self.index) * INDEX_STRIDE, count, INDEX_STRIDE):
+            self.index.append(self.ts(i))
+
+    def ts(self, i: int) -> int:
+        return _TS.unpack_from(self.map, HEADER.size + i * RECORD.size)[0]
+
+    def lower_bound(self, us: int | None) -> int:
+        """Index of the first record at or after ``us``."""
+        if us is None:
+            return 0
+        block = bisect_left(self.index, us)
+        lo, hi = max(block - 1, 0) * INDEX_STRIDE, min(block * INDEX_STRIDE, self.count)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts(mid) < us:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bounds(self, since_us: int | None, until_us: int | None) -> tuple[int, int]:
+        hi = self.lower_bound(until_us) if until_us is not None else self.count
+        return self.lower_bound(since_us), hi
+
+    def records(self, lo: int, hi: int, newest_first: bool = False) -> Iterator[tuple]:
+        if newest_first:
+            unpack, buf = RECORD.unpack_from, self.map
+            return (unpack(buf, HEADER.size + i * RECORD.size) for i in range(hi - 1, lo - 1, -1))
+        view = memoryview(self.map)[HEADER.size + lo * RECORD.size:HEADER.size + hi * RECORD.size]
+        return RECORD.iter_unpack(view)
+
+    def array(self, lo: int, hi: int):
+        np = _numpy()
+        return np.frombuffer(self.map, dtype=record_dtype(), count=hi - lo, offset=HEADER.size + lo * RECORD.size)
+
+
+class SampleStore:
+    """Append-only store of raw sensor samples in daily segment files.
+
+    Each record is 24 bytes: a microsecond UTC timestamp, the reading kind
+    and channel, and temperature/humidity/moisture as float32 (NaN when
+    missing). Appends are packed into a buffer and written when it reaches
+    ``flush_bytes``, or by a timer ``flush_interval`` seconds after the
+    first buffered sample; ``durable`` adds an fsync per write. Reads map the segments read-only:
+    ``arrays`` yields zero-copy numpy views, ``rows`` plain tuples.
+
+    Timestamps are kept non-decreasing within a segment (a sample older
+    than the last one in its day is stored at that last time), which is
+    what lets the sparse index find a time range without a scan. Opening a
+    segment for writing drops a torn last record and trailing zero-filled
+    records left by a crash.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        flush_bytes: int = 64 * 1024,
+        flush_interval: float = 1.0,
+        durable: bool = False,
+    ) -> None:
+        self.root = root
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.durable = durable
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._buffer = bytearray()
+        self._file = None
+        self._day: date | None = None
+        self._last_us = 0
+        self._last_write = time.monotonic()
+        self._timer: threading.Timer | None = None
+        self._segments: dict[date, _Segment] = {}
+
+    def _path(self, day: date) -> str:
+        return os.path.join(self.root, f"{day.isoformat()}.seg")
+
+    def _open_for_append(self, day: date) -> None:
+        """Switch writing to ``day``'s segment, repairing its tail first."""
+        self._write()
+        if self._file is not None:
+            self._file.close()
+        path = self._path(day)
+        with open(path, "a+b") as f:
+            f.seek(0)
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                # new file, or a crash before the header was complete
+                f.truncate(0)
+                f.write(HEADER.pack(MAGIC, 1, RECORD.size))
+            elif header[:8] != MAGIC:
+                raise ValueError(f"{path} is not a sample segment")
+            size = f.seek(0, os.SEEK_END)
+            count = (size - HEADER.size) // RECORD.size
+            last_us = 0
+            while count:
+                f.seek(HEADER.size + (count - 1) * RECORD.size)
+                last_us = _TS.unpack(f.read(_TS.size))[0]
+                if last_us:
+                    break
+                count -= 1
+            if HEADER.size + count * RECORD.size != size:
+                f.truncate(HEADER.size + count * RECORD.size)
+        self._file = open(path, "ab")
+        self._day = day
+        self._last_us = last_us
+
+    def _write(self) -> None:
+        if self._buffer and self._file is not None:
+            self._file.write(self._buffer)
+            self._file.flush()
+            if self.durable:
+                os.fsync(self._file.fileno())
+            self._buffer.clear()
+        self._last_write = time.monotonic()
+
+    def append(
+        self,
+        reading_type: str,
+        temperature_c: float | None = None,
+        humidity_rel: float | None = None,
+        moisture_rel: float | None = None,
+        timestamp: datetime | None = None,
+        channel: int = 0,
+    ) -> None:
+        """Buffer one sample (``timestamp`` defaults to now, UTC)."""
+        self.append_many([(
+            timestamp or datetime.utcnow(), reading_type, temperature_c, humidity_rel, moisture_rel, channel
+        )])
+
+    def append_many(self, samples: Iterable[tuple]) -> int:
+        """Buffer ``(timestamp, reading_type, temperature_c, humidity_rel, moisture_rel[, channel])`` tuples."""
+        pack = RECORD.pack
+        n = 0
+        with self._lock:
+            for sample in samples:
+                ts, kind, temperature, humidity, moisture = sample[:5]
+                day = ts.date()
+                if day != self._day:
+                    self._open_for_append(day)
+                us = max(_to_us(ts), self._last_us)
+                self._last_us = us
+                self._buffer += pack(
+                    us,
+                    KINDS.index(kind),
+                    sample[5] if len(sample) > 5 else 0,
+                    _NAN if temperature is None else temperature,
+                    _NAN if humidity is None else humidity,
+                    _NAN if moisture is None else moisture,
+                )
+                n += 1
+            if (
+                len(self._buffer) >= self.flush_bytes
+                or time.monotonic() - self._last_write >= self.flush_interval
+            ):
+                self._write()
+            elif self._buffer and self._timer is None:
+                # the last samples must reach readers even if no more arrive
+                self._timer = threading.Timer(self.flush_interval, self._flush_due)
+                self._timer.daemon = True
+                self._timer.start()
+        return n
+
+    def _flush_due(self) -> None:
+        with self._lock:
+            self._timer = None
+            self._write()
+
+    def flush(self) -> None:
+        """Write buffered samples so readers (and other processes) see them."""
+        with self._lock:
+            self._write()
+
+    def days(self) -> list[date]:
+        """Days with a segment, oldest first."""
+        days = []
+        for name in os.listdir(self.root):
+            if name.endswith(".seg"):
+                try:
+                    days.append(date.fromisoformat(name[:-4]))
+                except ValueError:
+                    continue
+        return sorted(days)
+
+    def _ranges(
+        self, since: datetime | None, until: datetime | None, newest_first: bool = False
+    ) -> Iterator[tuple[_Segment, int, int]]:
+        """(segment, first, end) record ranges covering ``[since, until)``."""
+        self.flush()
+        since_us = _to_us(since) if since is not None else None
+        until_us = _to_us(until) if until is not None else None
+        days = [
+            d for d in self.days()
+            if (since is None or d >= since.date()) and (until is None or d <= until.date())
+        ]
+        for day in reversed(days) if newest_first else days:
+            with self._lock:
+                segment = self._segments.get(day)
+                if segment is None:
+                    segment = self._segments[day] = _Segment(self._path(day))
+                segment.refresh()
+                lo, hi = segment.bounds(since_us, until_us)
+            if lo < hi:
+                yield segment, lo, hi
+
+    def arrays(self, since: datetime | None = None, until: datetime | None = None) -> Iterator:
+        """Zero-copy numpy views of the records in ``[since, until)``, one per segment."""
+        for segment, lo, hi in self._ranges(since, until):
+            yield segment.array(lo, hi)
+
+    def read(self, since: datetime | None = None, until: datetime | None = None):
+        """All records in ``[since, until)`` as one numpy array (copied only across segments)."""
+        np = _numpy()
+        parts = list(self.arrays(since, until))
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=record_dtype())
+
+    def rows(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        reading_type: str | None = None,
+        newest_first: bool = False,
+    ) -> Iterator[tuple[datetime, str, float | None, float | None, float | None]]:
+        """``(timestamp, reading_type, temperature_c, humidity_rel, moisture_rel)`` tuples."""
+        kind = KINDS.index(reading_type) if reading_type is not None else None
+        for segment, lo, hi in self._ranges(since, until, newest_first):
+            for us, k, _, temperature, humidity, moisture in segment.records(lo, hi, newest_first):
+                if kind is None or k == kind:
+                    yield _from_us(us), KINDS[k], _value(temperature), _value(humidity), _value(moisture)
+
+    def hourly_mean(
+        self, since: datetime | None = None, reading_type: str = "soil", field: str = "moisture_rel"
+    ) -> list[tuple[datetime, float]]:
+        """Mean of ``field`` per hour since ``since``, oldest first, skipping missing values."""
+        try:
+            np = _numpy()
+        except RuntimeError:
+            sums: dict[datetime, list] = {}
+            position = ("temperature_c", "humidity_rel", "moisture_rel").index(field) + 2
+            for row in self.rows(since, None, reading_type):
+                if row[position] is not None:
+                    bucket = sums.setdefault(row[0].replace(minute=0, second=0, microsecond=0), [0.0, 0])
+                    bucket[0] += row[position]
+                    bucket[1] += 1
+            return [(hour, total / n) for hour, (total, n) in sorted(sums.items())]
+
+        kind = KINDS.index(reading_type)
+        hours, totals, counts = [], [], []
+        for records in self.arrays(since):
+            values = records[field]
+            keep = (records["kind"] == kind) & ~np.isnan(values)
+            bucket = records["ts"][keep].astype("M8[h]")
+            if not len(bucket):
+                continue
+            # records are time-ordered, so each hour is one run
+            starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+            hours.append(bucket[starts])
+            totals.append(np.add.reduceat(values[keep].astype("f8"), starts))
+            counts.append(np.diff(np.r_[starts, len(bucket)]))
+        if not hours:
+            return []
+        # a day boundary never splits an hour: segments are whole days
+        return [
+            (hour.astype(datetime), float(total / count))
+            for hour, total, count in zip(np.concatenate(hours), np.concatenate(totals), np.concatenate(counts))
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._write()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._day = None
+            self._segments.clear()
+
+
+_store: SampleStore | None = None
+
+
+def init_sample_store(root: str, **kwargs) -> SampleStore:
+    """Make ``SensorReadingRepository`` keep readings in a ``SampleStore`` at ``root``."""
+    global _store
+    _store = SampleStore(root, **kwargs)
+    return _store
+
+
+def get_sample_store() -> SampleStore | None:
+    """The configured store, or None when readings live in the database."""
+    return _store
+
+
+def close_sample_store() -> None:
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
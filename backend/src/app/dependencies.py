@@ -1,22 +1,47 @@
 
+from src.app.config import RuntimeConfig
 from src.app.hardware.valve import ValveInterface
+from src.app.services.audit import DecisionLog
+from src.app.services.calibration import CalibrationService
 from src.app.services.controller import WateringController
+from src.app.services.diagnostics import Diagnostics
 from src.app.services.repository import StateRepository
+from src.app.services.scheduler import ControllerScheduler
+from src.app.services.valve_gate import ValveCommandGate
 
 _state_repo: StateRepository | None = None
 _valve: ValveInterface | None = None
 _controller: WateringController | None = None
+_scheduler: ControllerScheduler | None = None
+_decision_log: DecisionLog | None = None
+_valve_gate: ValveCommandGate | None = None
+_diagnostics: Diagnostics | None = None
+_calibration: CalibrationService | None = None
+_runtime_config: RuntimeConfig | None = None
 
 
 def set_singletons(
     state_repo: StateRepository,
     valve: ValveInterface,
     controller: WateringController,
+    scheduler: ControllerScheduler,
+    decision_log: DecisionLog | None = None,
+    valve_gate: ValveCommandGate | None = None,
+    diagnostics: Diagnostics | None = None,
+    calibration: CalibrationService | None = None,
+    runtime_config: RuntimeConfig | None = None,
 ) -> None:
-    global _state_repo, _valve, _controller
+    global _state_repo, _valve, _controller, _scheduler, _decision_log, _valve_gate, _diagnostics, _calibration
+    global _runtime_config
     _state_repo = state_repo
     _valve = valve
     _controller = controller
+    _scheduler = scheduler
+    _decision_log = decision_log
+    _valve_gate = valve_gate
+    _diagnostics = diagnostics
+    _calibration = calibration
+    _runtime_config = runtime_config
 
 
 def get_state_repo() -> StateRepository:
@@ -32,3 +57,33 @@ def get_valve() -> ValveInterface:
 def get_controller() -> WateringController:
     assert _controller is not None
     return _controller
+
+
+def get_scheduler() -> ControllerScheduler:
+    assert _scheduler is not None
+    return _scheduler
+
+
+def get_decision_log() -> DecisionLog:
+    assert _decision_log is not None
+    return _decision_log
+
+
+def get_valve_gate() -> ValveCommandGate:
+    assert _valve_gate is not None
+    return _valve_gate
+
+
+def get_diagnostics() -> Diagnostics:
+    assert _diagnostics is not None
+    return _diagnostics
+
+
+def get_calibration() -> CalibrationService:
+    assert _calibration is not None
+    return _calibration
+
+
+def get_runtime_config() -> RuntimeConfig:
+    assert _runtime_config is not None
+    return _runtime_config
@@ -0,0 +1,44 @@
+
+from src.app.config import HardwareConfig
+from src.app.hardware.flow import FlowMeterInterface, MockFlowMeter
+from src.app.hardware.sensors import MockSensorReader, SensorReaderInterface
+from src.app.hardware.valve import MockValve, ValveInterface
+
+
+def build_sensors(hw: HardwareConfig) -> SensorReaderInterface:
+    if hw.kind == "pi":
+        from src.app.hardware.pi import PiSensorReader
+        return PiSensorReader(
+            moisture_channel=hw.moisture_channel,
+            dry_raw=hw.moisture_dry_raw,
+            wet_raw=hw.moisture_wet_raw,
+            oversample=hw.moisture_oversample,
+        )
+    if hw.kind == "sim":
+        from src.app.hardware.sim import shared_hardware
+        return shared_hardware(hw).sensor_reader(hw)
+    return MockSensorReader()
+
+
+def build_valve(hw: HardwareConfig) -> ValveInterface:
+    if hw.kind == "pi":
+        from src.app.hardware.pi import GpioValve
+        return GpioValve(hw.valve_gpio_pin)
+    if hw.kind == "sim":
+        from src.app.hardware.sim import shared_hardware
+        return shared_hardware(hw).valve(hw)
+    return MockValve()
+
+
+def build_flow_meter(hw: HardwareConfig, valve: ValveInterface) -> FlowMeterInterface | None:
+    if hw.kind == "pi":
+        if hw.flow_gpio_pin is None:
+            return None
+        from src.app.hardware.pi import GpioFlowMeter
+        return GpioFlowMeter(hw.flow_gpio_pin, pulses_per_litre=hw.flow_pulses_per_litre)
+    if hw.kind == "sim":
+        if hw.flow_gpio_pin is None:
+            return None
+        from src.app.hardware.sim import shared_hardware
+        return shared_hardware(hw).flow_meter(hw)
+    return MockFlowMeter(valve, pulses_per_litre=hw.flow_pulses_per_litre)
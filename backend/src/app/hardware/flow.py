@@ -0,0 +1,51 @@
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from src.app.hardware.valve import ValveInterface
+
+
+class FlowMeterInterface(ABC):
+    """Pulse-output flow meter; ``pulses`` only ever grows."""
+
+    pulses_per_litre: float
+
+    @property
+    @abstractmethod
+    def pulses(self) -> int:
+        ...
+
+    @property
+    def litres(self) -> float:
+        return self.pulses / self.pulses_per_litre
+
+    def close(self) -> None:
+        pass
+
+
+class MockFlowMeter(FlowMeterInterface):
+    """Flow derived from the valve state: ``litres_per_min`` while open, ``leak_lpm`` while closed."""
+
+    def __init__(
+        self,
+        valve: ValveInterface,
+        litres_per_min: float = 6.0,
+        leak_lpm: float = 0.0,
+        pulses_per_litre: float = 450.0,
+    ) -> None:
+        self.valve = valve
+        self.litres_per_min = litres_per_min
+        self.leak_lpm = leak_lpm
+        self.pulses_per_litre = pulses_per_litre
+        self._lock = threading.Lock()
+        self._pulses = 0.0
+        self._updated = time.monotonic()
+
+    @property
+    def pulses(self) -> int:
+        with self._lock:
+            now = time.monotonic()
+            rate = self.litres_per_min if self.valve.is_open else self.leak_lpm
+            self._pulses += rate / 60 * (now - self._updated) * self.pulses_per_litre
+            self._updated = now
+            return int(self._pulses)
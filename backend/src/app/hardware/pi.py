@@ -0,0 +1,171 @@
+
+from datetime import datetime
+from statistics import fmean
+from src.app.config import HardwareConfig
+from src.app.hardware.flow import FlowMeterInterface
+from src.app.hardware.sensors import SensorReaderInterface
+from src.app.hardware.valve import ValveInterface
+from src.app.models import AirReading, SoilReading
+from src.app.services.tracing import traced
+
+
+# Driver stacks (blinka, adafruit drivers, w1thermsensor, gpiozero) are imported
+# when a device is constructed, not when this module is imported, so that they
+# are only loaded on a Pi and never slow down startup in mock mode.
+
+
+def moisture_from_raw(raw: int, dry_raw: int, wet_raw: int) -> float:
+    """Two-point linear conversion of a capacitive probe reading to 0..1."""
+    raw = max(min(raw, dry_raw), wet_raw)
+    return (dry_raw - raw) / (dry_raw - wet_raw)
+
+
+@traced("hardware")
+class PiSensorReader(SensorReaderInterface):
+    """SHT31-D air sensor and ADS1115 moisture probe on I2C, DS18B20 soil probe on 1-Wire."""
+
+    def __init__(
+        self,
+        i2c=None,
+        moisture_channel: int = 0,
+        dry_raw: int = 21000,
+        wet_raw: int = 11000,
+        soil_thermometer=None,
+        oversample: int = 1,
+    ) -> None:
+        import adafruit_sht31d
+        from adafruit_ads1x15.ads1115 import ADS1115
+        from adafruit_ads1x15.analog_in import AnalogIn
+
+        if i2c is None:
+            import board
+            i2c = board.I2C()
+        if soil_thermometer is None:
+            from w1thermsensor import W1ThermSensor
+            soil_thermometer = W1ThermSensor()
+
+        self._sht = adafruit_sht31d.SHT31D(i2c)
+        self._moisture = AnalogIn(ADS1115(i2c), moisture_channel)
+        self._soil_thermometer = soil_thermometer
+        self.moisture_channel = moisture_channel
+        self.dry_raw = dry_raw
+        self.wet_raw = wet_raw
+        self.oversample = max(oversample, 1)
+        # compiled ``CalibrationTable``; swapped whole, so the tick never sees a half-built one
+        self.calibration = None
+
+    def read_air(self) -> AirReading | None:
+        try:
+            temperature = self._sht.temperature
+            humidity = self._sht.relative_humidity
+        except (OSError, RuntimeError):
+            return None
+        return AirReading(
+            temperature_c=temperature,
+            humidity_rel=humidity,
+            timestamp=datetime.utcnow(),
+        )
+
+    def _read_raw(self, samples: int) -> tuple[list[int], float] | None:
+        try:
+            raws = [self._moisture.value for _ in range(samples)]
+            temperature = self._soil_thermometer.get_temperature()
+        except Exception:
+            return None
+        return raws, temperature
+
+    def read_soil(self) -> SoilReading | None:
+        sample = self._read_raw(self.oversample)
+        if sample is None:
+            return None
+        raws, temperature = sample
+        table = self.calibration
+        if table is not None:
+            moisture = table.mean(raws, temperature)
+        else:
+            moisture = moisture_from_raw(round(fmean(raws)), self.dry_raw, self.wet_raw)
+        return SoilReading(
+            temperature_c=temperature,
+            moisture_rel=moisture,
+            timestamp=datetime.utcnow(),
+        )
+
+    def read_moisture_raw(self, samples: int = 1) -> tuple[float, float] | None:
+        sample = self._read_raw(samples)
+        if sample is None:
+            return None
+        raws, temperature = sample
+        return fmean(raws), temperature
+
+    def set_calibration(self, table) -> None:
+        """Use a compiled ``CalibrationTable``, or the two-point conversion again with ``None``."""
+        self.calibration = table
+
+    def configure(self, hw: HardwareConfig) -> None:
+        self.dry_raw = hw.moisture_dry_raw
+        self.wet_raw = hw.moisture_wet_raw
+        self.oversample = max(hw.moisture_oversample, 1)
+
+
+@traced("hardware")
+class GpioValve(ValveInterface):
+    """Solenoid valve switched by a MOSFET on a GPIO pin."""
+
+    def __init__(self, pin: int, pin_factory=None) -> None:
+        from gpiozero import OutputDevice
+
+        self._device = OutputDevice(
+            pin,
+            active_high=True,
+            initial_value=False,
+            pin_factory=pin_factory,
+        )
+
+    def open(self) -> None:
+        self._device.on()
+
+    def close(self) -> None:
+        self._device.off()
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self._device.value)
+
+
+class GpioFlowMeter(FlowMeterInterface):
+    """Hall-effect flow sensor with an open-collector pulse output on a GPIO pin.
+
+    Every falling edge is one pulse. With the pigpio pin factory the daemon
+    counts edges itself (sampled every few microseconds, no Python per pulse);
+    otherwise a gpiozero edge callback bumps the counter. Those callbacks all
+    run on the pin factory's edge thread, so the counter has a single writer
+    and readers never block it.
+    """
+
+    def __init__(self, pin: int, pulses_per_litre: float = 450.0, pin_factory=None) -> None:
+        from gpiozero import DigitalInputDevice
+
+        self.pulses_per_litre = pulses_per_litre
+        self._count = 0
+        self._tally = None
+        self._device = DigitalInputDevice(pin, pull_up=True, pin_factory=pin_factory)
+        connection = getattr(self._device.pin_factory, "connection", None)
+        if connection is not None:
+            import pigpio
+            self._tally = connection.callback(pin, pigpio.FALLING_EDGE)
+        else:
+            self._device.when_activated = self._on_pulse
+
+    def _on_pulse(self) -> None:
+        self._count += 1
+
+    @property
+    def pulses(self) -> int:
+        if self._tally is not None:
+            return self._tally.tally()
+        return self._count
+
+    def close(self) -> None:
+        if self._tally is not None:
+            self._tally.cancel()
+        self._device.close()
@@ -2,10 +2,14 @@
 from datetime import datetime
 from abc import ABC, abstractmethod
 from random import random
+from src.app.config import HardwareConfig
 from src.app.models import AirReading, SoilReading
+from src.app.services.tracing import traced
 
 
 class SensorReaderInterface(ABC):
+    moisture_channel: int | None = None  # ADC channel of a calibratable moisture probe
+
     @abstractmethod
     def read_air(self) -> AirReading | None:
         ...
@@ -14,7 +18,18 @@ class SensorReaderInterface(ABC):
     def read_soil(self) -> SoilReading | None:
         ...
 
+    def read_moisture_raw(self, samples: int = 1) -> tuple[float, float | None] | None:
+        """Mean raw probe code over ``samples`` conversions and the soil temperature."""
+        return None
+
+    def set_calibration(self, table) -> None:
+        raise NotImplementedError("This sensor reader has no calibratable moisture probe")
+
+    def configure(self, hw: HardwareConfig) -> None:
+        """Apply reloaded hardware settings (conversion and oversampling; pins need a restart)."""
+
 
+@traced("hardware")
 class MockSensorReader(SensorReaderInterface):
     """Stub implementation generating somewhat realistic values."""
 
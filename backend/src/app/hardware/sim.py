@@ -0,0 +1,457 @@
+
+import argparse
+import errno
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from src.app.config import HardwareConfig
+from src.app.hardware.pi import GpioFlowMeter, GpioValve, PiSensorReader
+
+
+# Simulated buses that speak the same protocol as the real chips, so the real
+# drivers (adafruit_sht31d, adafruit_ads1x15, w1thermsensor, gpiozero) run
+# unmodified on a plain Linux box with programmable latency and faults.
+
+
+class FakeI2CDevice:
+    """Register-level model of a chip behind one I2C address."""
+
+    address: int = 0
+
+    def write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def read(self, count: int) -> bytes:
+        raise NotImplementedError
+
+
+class SimI2CBus:
+    """Drop-in for ``busio.I2C`` routing transactions to ``FakeI2CDevice`` models.
+
+    Every transaction sleeps ``latency`` seconds and fails with ``EIO`` with
+    probability ``fail_rate`` (or for the next ``fail_next(n)`` transactions).
+    Addresses without a device NACK with ``EREMOTEIO`` like the Linux driver.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, seed: int | None = None) -> None:
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.devices: dict[int, FakeI2CDevice] = {}
+        self.transactions = 0
+        self.faults = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._fail_next = 0
+
+    def attach(self, device: FakeI2CDevice) -> FakeI2CDevice:
+        self.devices[device.address] = device
+        return device
+
+    def detach(self, address: int) -> None:
+        self.devices.pop(address, None)
+
+    def fail_next(self, count: int = 1) -> None:
+        self._fail_next += count
+
+    def try_lock(self) -> bool:
+        return self._lock.acquire(blocking=False)
+
+    def unlock(self) -> None:
+        self._lock.release()
+
+    def scan(self) -> list[int]:
+        return sorted(self.devices)
+
+    def _device(self, address: int) -> FakeI2CDevice:
+        self.transactions += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self._fail_next or (self.fail_rate and self._random.random() < self.fail_rate):
+            self._fail_next = max(0, self._fail_next - 1)
+            self.faults += 1
+            raise OSError(errno.EIO, "simulated bus error")
+        device = self.devices.get(address)
+        if device is None:
+            raise OSError(errno.EREMOTEIO, f"no device at 0x{address:02x}")
+        return device
+
+    def writeto(self, address: int, buffer, *, start: int = 0, end: int | None = None) -> None:
+        device = self._device(address)
+        data = bytes(buffer[start:end])
+        if data:
+            device.write(data)
+
+    def readfrom_into(self, address: int, buffer, *, start: int = 0, end: int | None = None) -> None:
+        device = self._device(address)
+        end = len(buffer) if end is None else end
+        buffer[start:end] = device.read(end - start)
+
+    def writeto_then_readfrom(
+        self,
+        address: int,
+        buffer_out,
+        buffer_in,
+        *,
+        out_start: int = 0,
+        out_end: int | None = None,
+        in_start: int = 0,
+        in_end: int | None = None,
+    ) -> None:
+        self.writeto(address, buffer_out, start=out_start, end=out_end)
+        self.readfrom_into(address, buffer_in, start=in_start, end=in_end)
+
+    def deinit(self) -> None:
+        pass
+
+
+def sht31_crc(data: bytes) -> int:
+    """CRC-8 (poly 0x31, init 0xFF) used by Sensirion chips."""
+    crc = 0xFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x31) if crc & 0x80 else crc << 1
+    return crc & 0xFF
+
+
+class FakeSHT31(FakeI2CDevice):
+    """SHT31-D: 16-bit commands, 6-byte measurement frames with CRC.
+
+    ``corrupt_crc`` makes the next measurement fail the driver's CRC check.
+    """
+
+    def __init__(
+        self,
+        temperature_c: float = 22.0,
+        humidity_rel: float = 50.0,
+        noise: float = 0.0,
+        address: int = 0x44,
+        seed: int | None = None,
+    ) -> None:
+        self.address = address
+        self.temperature_c = temperature_c
+        self.humidity_rel = humidity_rel
+        self.noise = noise
+        self.corrupt_crc = False
+        self.serial = 0x1234ABCD
+        self._random = random.Random(seed)
+        self._out = b""
+
+    @staticmethod
+    def _word(value: int) -> bytes:
+        raw = struct.pack(">H", value)
+        return raw + bytes([sht31_crc(raw)])
+
+    def _measurement(self) -> bytes:
+        t = self.temperature_c + self._random.uniform(-self.noise, self.noise)
+        h = self.humidity_rel + self._random.uniform(-self.noise, self.noise)
+        t_raw = round((min(max(t, -45.0), 130.0) + 45) * 65535 / 175)
+        h_raw = round(min(max(h, 0.0), 100.0) * 65535 / 100)
+        frame = bytearray(self._word(t_raw) + self._word(h_raw))
+        if self.corrupt_crc:
+            self.corrupt_crc = False
+            frame[2] ^= 0xFF
+        return bytes(frame)
+
+    def write(self, data: bytes) -> None:
+        command = int.from_bytes(data[:2], "big")
+        if command >> 8 in (0x24, 0x2C) or command == 0xE000:
+            self._out = self._measurement()
+        elif command == 0xF32D:
+            self._out = self._word(0x0000)
+        elif command == 0x3780:
+            self._out = self._word(self.serial >> 16) + self._word(self.serial & 0xFFFF)
+        else:
+            self._out = b""
+
+    def read(self, count: int) -> bytes:
+        out = self._out[:count]
+        return out + b"\xff" * (count - len(out))
+
+
+class FakeADS1115(FakeI2CDevice):
+    """ADS1115: pointer register plus 16-bit conversion/config registers.
+
+    Single-shot conversions take ``1 / data_rate`` seconds, during which the
+    config register's OS bit reads 0 and the driver keeps polling.
+    """
+
+    DATA_RATES = (8, 16, 32, 64, 128, 250, 475, 860)
+    # MUX settings 0-3 are differential pairs, 4-7 single-ended AIN0-3
+    DIFFERENTIAL = ((0, 1), (0, 3), (1, 3), (2, 3))
+
+    def __init__(self, address: int = 0x48, noise: int = 0, seed: int | None = None) -> None:
+        self.address = address
+        self.noise = noise
+        self.channels = [0, 0, 0, 0]
+        self.registers = {0: 0, 1: 0x8583, 2: 0x8000, 3: 0x7FFF}
+        self._pointer = 0
+        self._ready_at = 0.0
+        self._random = random.Random(seed)
+
+    def set_raw(self, channel: int, raw: int) -> None:
+        self.channels[channel] = raw
+
+    def _convert(self, config: int) -> int:
+        mux = (config >> 12) & 0x7
+        if mux >= 4:
+            value = self.channels[mux - 4]
+        else:
+            pos, neg = self.DIFFERENTIAL[mux]
+            value = self.channels[pos] - self.channels[neg]
+        if self.noise:
+            value += self._random.randint(-self.noise, self.noise)
+        return max(-32768, min(32767, value)) & 0xFFFF
+
+    def write(self, data: bytes) -> None:
+        self._pointer = data[0] & 0x03
+        if len(data) < 3:
+            return
+        value = int.from_bytes(data[1:3], "big")
+        if self._pointer != 1:
+            self.registers[self._pointer] = value
+            return
+        self.registers[1] = value & 0x7FFF
+        self.registers[0] = self._convert(value)
+        single_shot = value & 0x0100
+        if single_shot and value & 0x8000:
+            self._ready_at = time.monotonic() + 1 / self.DATA_RATES[(value >> 5) & 0x7]
+
+    def read(self, count: int) -> bytes:
+        value = self.registers[self._pointer]
+        if self._pointer == 1 and time.monotonic() >= self._ready_at:
+            value |= 0x8000
+        return value.to_bytes(2, "big")[:count]
+
+
+class FakeW1Bus:
+    """``/sys/bus/w1/devices``-style tree of DS18B20 ``w1_slave`` files."""
+
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._temperatures: dict[str, float] = {}
+        self._faults: dict[str, str | None] = {}
+
+    def add_ds18b20(self, sensor_id: str = "0000000a1b2c", temperature_c: float = 18.0) -> str:
+        self._temperatures[sensor_id] = temperature_c
+        self._faults[sensor_id] = None
+        self._write(sensor_id)
+        return sensor_id
+
+    def set_temperature(self, sensor_id: str, temperature_c: float) -> None:
+        self._temperatures[sensor_id] = temperature_c
+        self._write(sensor_id)
+
+    def set_fault(self, sensor_id: str, fault: str | None) -> None:
+        """``"crc"`` (frame not valid), ``"reset"`` (85 °C power-on value) or None."""
+        self._faults[sensor_id] = fault
+        self._write(sensor_id)
+
+    def remove(self, sensor_id: str) -> None:
+        path = self.root / f"28-{sensor_id}"
+        (path / "w1_slave").unlink(missing_ok=True)
+        path.rmdir()
+
+    def _write(self, sensor_id: str) -> None:
+        fault = self._faults[sensor_id]
+        temperature = 85.0 if fault == "reset" else self._temperatures[sensor_id]
+        raw = round(temperature * 16) & 0xFFFF
+        scratchpad = f"{raw & 0xFF:02x} {raw >> 8:02x} 4b 46 7f ff 0c 10 1c"
+        status = "NO" if fault == "crc" else "YES"
+        content = f"{scratchpad} : crc=1c {status}\n{scratchpad} t={round(temperature * 1000)}\n"
+        path = self.root / f"28-{sensor_id}"
+        path.mkdir(exist_ok=True)
+        # readers poll the file concurrently, so never expose a half-written one
+        tmp = path / "w1_slave.tmp"
+        tmp.write_text(content)
+        os.replace(tmp, path / "w1_slave")
+
+    def thermometer(self, sensor_id: str | None = None, latency: float = 0.0):
+        """A real ``W1ThermSensor`` reading from this tree, ``latency`` seconds per read."""
+        os.environ.setdefault("W1THERMSENSOR_NO_KERNEL_MODULE", "1")
+        from w1thermsensor import Sensor, W1ThermSensor
+
+        def get_raw_sensor_strings(sensor):
+            if latency:
+                time.sleep(latency)
+            return W1ThermSensor.get_raw_sensor_strings(sensor)
+
+        cls = type(
+            "SimW1ThermSensor",
+            (W1ThermSensor,),
+            {"BASE_DIRECTORY": self.root, "get_raw_sensor_strings": get_raw_sensor_strings},
+        )
+        sensor_id = sensor_id or next(iter(self._temperatures))
+        return cls(Sensor.DS18B20, sensor_id)
+
+
+class SimHardware:
+    """SHT31 + ADS1115 on a simulated I2C bus, a DS18B20 tree and a gpiozero mock pin factory.
+
+    The valve and the flow meter share the mock pin factory; ``start_flow``
+    feeds the flow meter pin from a background thread depending on the valve
+    pin, like water behind a real solenoid.
+    """
+
+    def __init__(
+        self,
+        w1_root: str | None = None,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        w1_latency: float = 0.0,
+        noise: bool = False,
+        seed: int | None = None,
+    ) -> None:
+        from gpiozero.pins.mock import MockFactory
+
+        self.bus = SimI2CBus(latency=latency, fail_rate=fail_rate, seed=seed)
+        self.sht31 = self.bus.attach(FakeSHT31(noise=0.3 if noise else 0.0, seed=seed))
+        self.ads = self.bus.attach(FakeADS1115(noise=40 if noise else 0, seed=seed))
+        self.w1 = FakeW1Bus(w1_root or tempfile.mkdtemp(prefix="irrigation-w1-"))
+        self.soil_sensor_id = self.w1.add_ds18b20()
+        self.w1_latency = w1_latency
+        self.pin_factory = MockFactory()
+        self.litres_per_min = 6.0
+        self.leak_lpm = 0.0
+        self._flow_thread: threading.Thread | None = None
+        self._flow_stop = threading.Event()
+
+    def set_moisture(self, moisture_rel: float, hw: HardwareConfig) -> None:
+        raw = hw.moisture_dry_raw - moisture_rel * (hw.moisture_dry_raw - hw.moisture_wet_raw)
+        self.ads.set_raw(hw.moisture_channel, round(raw))
+
+    def sensor_reader(self, hw: HardwareConfig) -> PiSensorReader:
+        return PiSensorReader(
+            i2c=self.bus,
+            moisture_channel=hw.moisture_channel,
+            dry_raw=hw.moisture_dry_raw,
+            wet_raw=hw.moisture_wet_raw,
+            oversample=hw.moisture_oversample,
+            soil_thermometer=self.w1.thermometer(self.soil_sensor_id, latency=self.w1_latency),
+        )
+
+    def valve(self, hw: HardwareConfig) -> GpioValve:
+        return GpioValve(hw.valve_gpio_pin, pin_factory=self.pin_factory)
+
+    def valve_pin_state(self, hw: HardwareConfig) -> bool:
+        return bool(self.pin_factory.pin(hw.valve_gpio_pin).state)
+
+    def flow_meter(self, hw: HardwareConfig) -> GpioFlowMeter:
+        return GpioFlowMeter(
+            hw.flow_gpio_pin,
+            pulses_per_litre=hw.flow_pulses_per_litre,
+            pin_factory=self.pin_factory,
+        )
+
+    def pulse(self, hw: HardwareConfig, count: int = 1) -> None:
+        """Drive ``count`` open-collector pulses (falling then rising edge) on the flow meter pin."""
+        pin = self.pin_factory.pin(hw.flow_gpio_pin)
+        for _ in range(count):
+            pin.drive_low()
+            pin.drive_high()
+        # MockPin records every transition otherwise
+        pin.clear_states()
+
+    def start_flow(self, hw: HardwareConfig, interval: float = 0.05) -> None:
+        """Pulse the flow meter at ``litres_per_min`` while the valve pin is high, else ``leak_lpm``."""
+        if self._flow_thread is not None:
+            return
+        self._flow_stop.clear()
+        self._flow_thread = threading.Thread(target=self._run_flow, args=(hw, interval), daemon=True)
+        self._flow_thread.start()
+
+    def stop_flow(self) -> None:
+        self._flow_stop.set()
+        if self._flow_thread is not None:
+            self._flow_thread.join()
+            self._flow_thread = None
+
+    def _run_flow(self, hw: HardwareConfig, interval: float) -> None:
+        owed = 0.0
+        last = time.monotonic()
+        while not self._flow_stop.wait(interval):
+            now = time.monotonic()
+            rate = self.litres_per_min if self.valve_pin_state(hw) else self.leak_lpm
+            owed += rate / 60 * (now - last) * hw.flow_pulses_per_litre
+            last = now
+            whole = int(owed)
+            owed -= whole
+            self.pulse(hw, whole)
+
+
+_shared: SimHardware | None = None
+
+
+def shared_hardware(hw: HardwareConfig) -> SimHardware:
+    """Process-wide simulated hardware used by ``IRRIGATION_HARDWARE=sim``."""
+    global _shared
+    if _shared is None:
+        _shared = SimHardware(
+            latency=hw.sim_latency_sec,
+            fail_rate=hw.sim_fail_rate,
+            noise=True,
+        )
+        _shared.set_moisture(0.4, hw)
+        if hw.flow_gpio_pin is not None:
+            _shared.start_flow(hw)
+    return _shared
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the real drivers against simulated hardware")
+    p.add_argument("--samples", type=int, default=100)
+    p.add_argument("--latency", type=float, default=0.0, help="seconds per I2C transaction")
+    p.add_argument("--fail-rate", type=float, default=0.0, help="probability of an I2C error")
+    p.add_argument("--w1-latency", type=float, default=0.0, help="seconds per DS18B20 read")
+    p.add_argument("--seed", type=int, default=None)
+    args = p.parse_args()
+
+    hw = HardwareConfig(kind="sim")
+    sim = SimHardware(
+        latency=args.latency,
+        fail_rate=args.fail_rate,
+        w1_latency=args.w1_latency,
+        noise=True,
+        seed=args.seed,
+    )
+    sim.set_moisture(0.4, hw)
+    # construction probes the bus, so build the drivers before injecting faults
+    fail_rate, sim.bus.fail_rate = sim.bus.fail_rate, 0.0
+    sensors = sim.sensor_reader(hw)
+    valve = sim.valve(hw)
+    sim.bus.fail_rate = fail_rate
+
+    ops = {
+        "read_air": sensors.read_air,
+        "read_soil": sensors.read_soil,
+        "valve_toggle": lambda: valve.close() if valve.is_open else valve.open(),
+    }
+    print(f"{'op':<14}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'failed':>8}")
+    for name, op in ops.items():
+        times = []
+        failed = 0
+        for _ in range(args.samples):
+            t0 = time.perf_counter()
+            result = op()
+            times.append((time.perf_counter() - t0) * 1000)
+            if name != "valve_toggle" and result is None:
+                failed += 1
+        print(
+            f"{name:<14}{sum(times) / len(times):>10.3f}{_percentile(times, 0.5):>10.3f}"
+            f"{_percentile(times, 0.99):>10.3f}{max(times):>10.3f}{failed:>8}"
+        )
+    print(f"i2c transactions: {sim.bus.transactions}, injected faults: {sim.bus.faults}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 import threading
 import time
 from abc import ABC, abstractmethod
+from src.app.services.tracing import traced
 
 
 class ValveInterface(ABC):
@@ -19,6 +20,7 @@ class ValveInterface(ABC):
         ...
 
 
+@traced("hardware")
 class MockValve(ValveInterface):
     """In-memory stub for development and tests."""
 
@@ -40,34 +42,57 @@ class MockValve(ValveInterface):
             return self._open
 
 
+@traced("hardware")
 class TimedValveWrapper(ValveInterface):
-    """Wrapper that can open valve for a fixed time in a background thread."""
+    """Wrapper that can open the valve for a fixed time.
+
+    One background thread closes the valve when the ``open_for`` deadline
+    passes; repeated calls move the deadline instead of starting more threads,
+    and ``close()`` cancels it.
+    """
 
     def __init__(self, inner: ValveInterface) -> None:
         self._inner = inner
+        self._deadline: float | None = None
+        self._timer = threading.Condition()
         self._timer_thread: threading.Thread | None = None
-        self._timer_lock = threading.Lock()
 
     def open(self) -> None:
         self._inner.open()
 
     def close(self) -> None:
+        with self._timer:
+            self._deadline = None
+            self._timer.notify()
         self._inner.close()
 
     @property
     def is_open(self) -> bool:
         return self._inner.is_open
 
+    @property
+    def deadline(self) -> float | None:
+        """``time.monotonic()`` at which the valve closes, if a timer is set."""
+        return self._deadline
+
     def open_for(self, seconds: int) -> None:
         self.open()
-
-        def worker() -> None:
-            time.sleep(seconds)
-            self.close()
-
-        with self._timer_lock:
-            if self._timer_thread and self._timer_thread.is_alive():
-                # do not cancel previous, just start another
-                pass
-            self._timer_thread = threading.Thread(target=worker, daemon=True)
-            self._timer_thread.start()
+        with self._timer:
+            self._deadline = time.monotonic() + seconds
+            self._timer.notify()
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._run_timer, daemon=True)
+                self._timer_thread.start()
+
+    def _run_timer(self) -> None:
+        with self._timer:
+            while True:
+                if self._deadline is None:
+                    self._timer.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._timer.wait(remaining)
+                    continue
+                self._deadline = None
+                self._inner.close()
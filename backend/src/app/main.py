@@ -1,63 +1,323 @@
 
-import threading
-import time
-from contextlib import asynccontextmanager
+import argparse
+import asyncio
+import os
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.app.config import config
-from src.app.hardware.sensors import MockSensorReader, SensorReaderInterface
-from src.app.hardware.valve import MockValve, TimedValveWrapper, ValveInterface
-from src.app.services.repository import StateRepository
-from src.app.services.controller import WateringController
-from src.app.api import routes_status, routes_control, routes_schedule, routes_config
+from src.app.config import config, runtime
 from src.app import dependencies
-from src.app.database.engine import init_db, create_tables
+from src.app.services.leader import LeaderLock
+
+
+def _decision_log():
+    from src.app.services.audit import DecisionLog
+
+    return DecisionLog(
+        config.decision_log_path,
+        max_bytes=config.decision_log_max_bytes,
+        backups=config.decision_log_backups,
+    )
+
+
+def _configure_tracing() -> None:
+    """One trace file per worker process; ``python -m src.app.services.tracing`` merges them."""
+    if config.trace_sample_rate <= 0:
+        return
+    from src.app.services.tracing import tracer
+
+    tracer.configure(
+        os.path.join(config.trace_dir, f"trace-{os.getpid()}.json"),
+        sample_rate=config.trace_sample_rate,
+        max_bytes=config.trace_max_bytes,
+        backups=config.trace_backups,
+    )
+
+
+def _start_leader() -> tuple:
+    """Create the hardware, controller and IPC server in the leader process."""
+    from src.app.hardware.factory import build_flow_meter, build_sensors, build_valve
+    from src.app.hardware.valve import TimedValveWrapper
+    from src.app.services.calibration import CalibrationService
+    from src.app.services.controller import WateringController
+    from src.app.services.diagnostics import Diagnostics
+    from src.app.services.events import ConfigChanged, EventBus
+    from src.app.services.ipc import ControlServer
+    from src.app.services.repository import StateRepository
+    from src.app.services.scheduler import ControllerScheduler
+    from src.app.services.state_store import StateStore
+    from src.app.services.valve_gate import ValveCommandGate
+
+    events = EventBus()
+    state_repo = StateRepository(store=StateStore(config.state_path), events=events)
+    sensors = build_sensors(config.hardware)
+    valve = TimedValveWrapper(build_valve(config.hardware))
+    decision_log = _decision_log()
+    flow_meter = build_flow_meter(config.hardware, valve)
+    controller = WateringController(sensors, valve, state_repo, decision_log, flow_meter)
+    scheduler = ControllerScheduler(controller)
+    valve_gate = ValveCommandGate(valve, state_repo)
+    diagnostics = Diagnostics()
+    calibration = CalibrationService(sensors)
+    ipc_server = ControlServer(
+        config.ipc_socket_path,
+        state_repo,
+        valve,
+        controller,
+        scheduler,
+        valve_gate,
+        diagnostics,
+        calibration,
+        runtime,
+    )
+
+    def on_reload(cfg) -> None:
+        # the next tick hands the new settings to the controller and its sensors
+        scheduler.wake()
+        events.publish(ConfigChanged(section="runtime", values=runtime.status()["config"]))
+
+    runtime.subscribe(on_reload)
+
+    # expose for DI
+    dependencies.set_singletons(
+        state_repo,
+        valve,
+        controller,
+        scheduler,
+        decision_log,
+        valve_gate,
+        diagnostics,
+        calibration,
+        runtime,
+    )
+    return scheduler, ipc_server, _mqtt_bridge(events, state_repo, valve_gate, scheduler)
+
+
+def _mqtt_bridge(events, state_repo, valve_gate, scheduler):
+    """Bridge bus events to MQTT when a broker is configured."""
+    mqtt = config.mqtt
+    if not mqtt.host:
+        return None
+    from src.app.services.mqtt import MqttBridge, PahoMqttClient
+
+    client = PahoMqttClient(
+        mqtt.host,
+        mqtt.port,
+        client_id=mqtt.client_id,
+        username=mqtt.username,
+        password=mqtt.password,
+        qos=mqtt.qos,
+        will=(f"{mqtt.topic_prefix}/status", "offline"),
+    )
+    return MqttBridge(
+        events,
+        client,
+        state_repo,
+        valve_gate,
+        scheduler,
+        prefix=mqtt.topic_prefix,
+        batch_interval=mqtt.batch_interval_sec,
+    )
+
+
+def _start_follower() -> None:
+    """Proxy state and commands to the leader over the local socket."""
+    from src.app.services.ipc import (
+        ControlClient,
+        RemoteCalibration,
+        RemoteController,
+        RemoteDiagnostics,
+        RemoteRuntimeConfig,
+        RemoteScheduler,
+        RemoteStateRepository,
+        RemoteValve,
+        RemoteValveGate,
+    )
+
+    client = ControlClient(config.ipc_socket_path)
+    dependencies.set_singletons(
+        RemoteStateRepository(client),
+        RemoteValve(client),
+        RemoteController(client),
+        RemoteScheduler(client),
+        # workers only read the log file; the leader flushes it every few seconds
+        _decision_log(),
+        RemoteValveGate(client),
+        RemoteDiagnostics(config.ipc_socket_path),
+        RemoteCalibration(config.ipc_socket_path),
+        RemoteRuntimeConfig(client),
+    )
+
+
+async def _lead():
+    """Start the controller in this process; returns the coroutine that stops it."""
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from src.app.database.engine import create_tables, get_engine
+    from src.app.database.repository import ThresholdRepository
+    from src.app.services.calibration import load_calibration
+
+    scheduler, ipc_server, mqtt_bridge = _start_leader()
+    # only the leader creates tables so workers do not race on a fresh DB
+    await create_tables()
+    # seed default thresholds and the forecaster before the controller thread starts
+    async with AsyncSession(get_engine()) as session:
+        await ThresholdRepository(session).get_current()
+        await scheduler.controller.seed_history(session)
+        await load_calibration(session, dependencies.get_calibration(), config.hardware.moisture_channel)
+    ipc_server.start()
+    if mqtt_bridge is not None:
+        mqtt_bridge.start()
+    scheduler.start()
+    runtime.start(config.config_poll_sec)
+
+    async def stop() -> None:
+        runtime.stop()
+        scheduler.stop()
+        if mqtt_bridge is not None:
+            await mqtt_bridge.stop()
+        scheduler.controller.decision_log.close()
+        ipc_server.stop()
+
+    return stop
+
+
+async def _follow(leader: LeaderLock, promoted: list) -> None:
+    """Retry the lock until the leader goes away, then take over its role.
+
+    The OS drops the lock when the leader dies; the first follower to take it
+    starts the controller, and the others reconnect to its socket.
+    """
+    while not leader.try_acquire():
+        await asyncio.sleep(config.leader_poll_sec)
+    promoted.append(await _lead())
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events."""
+    from src.app.database.engine import init_db
+    from src.app.database.sample_store import close_sample_store, init_sample_store
+
     init_db()
-    await create_tables()
+    if config.sample_store_dir:
+        init_sample_store(config.sample_store_dir, flush_interval=config.sample_flush_sec)
+    _configure_tracing()
+
+    # with `uvicorn --workers N` only the worker holding the lock drives the
+    # hardware, the others proxy to it over a local socket until one of them
+    # can take over
+    leader = LeaderLock(config.leader_lock_path)
+    stops = []
+    follower = None
+    if leader.try_acquire():
+        stops.append(await _lead())
+    else:
+        _start_follower()
+        follower = asyncio.create_task(_follow(leader, stops))
     yield
+    if follower is not None:
+        follower.cancel()
+        with suppress(asyncio.CancelledError):
+            await follower
+    for stop in stops:
+        await stop()
+    close_sample_store()
+    leader.release()
+
+
+def create_app() -> FastAPI:
+    """Build the application; hardware and the controller start in ``lifespan``."""
+    from src.app.api import routes_status, routes_control, routes_schedule, routes_config, routes_audit, routes_history, routes_dashboard, routes_admin, routes_calibration, routes_rules
+
+    from src.app.api.encoding import CompressionMiddleware, FastJSONResponse
+    from src.app.services.tracing import TracingMiddleware
+
+    app = FastAPI(
+        title="Irrigation Controller",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
+    app.add_middleware(CompressionMiddleware, minimum_size=config.compress_min_bytes)
+
+    # Add CORS middleware to allow browser requests from frontend
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Trace-Id", "ETag"],  # the dashboard revalidates with If-None-Match
+    )
+    # outermost, so the request span covers compression and CORS too
+    app.add_middleware(TracingMiddleware)
+
+    # routers
+    app.include_router(routes_status.router)
+    app.include_router(routes_control.router)
+    app.include_router(routes_schedule.router)
+    app.include_router(routes_config.router)
+    app.include_router(routes_audit.router)
+    app.include_router(routes_history.router)
+    app.include_router(routes_dashboard.router)
+    app.include_router(routes_admin.router)
+    app.include_router(routes_calibration.router)
+    app.include_router(routes_rules.router)
+    return app
 
 
-app = FastAPI(title="Irrigation Controller", lifespan=lifespan)
+app = create_app()
 
-# Add CORS middleware to allow browser requests from frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# singletons
-_state_repo = StateRepository()
-_sensors: SensorReaderInterface = MockSensorReader()
-_valve_inner: ValveInterface = MockValve()
-_valve = TimedValveWrapper(_valve_inner)
-_controller = WateringController(_sensors, _valve, _state_repo)
+def profile_startup(top: int = 25) -> None:
+    """Print the slowest imports and the app build time in a fresh interpreter."""
+    import subprocess
+    import sys
 
-# expose for DI
-dependencies.set_singletons(_state_repo, _valve, _controller)
+    code = (
+        "import time; t = time.perf_counter();"
+        "from src.app.main import create_app; create_app();"
+        "print(f'{(time.perf_counter() - t) * 1000:.1f}')"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        rows.append((int(fields[1]), int(fields[0]), fields[2].rstrip()))
 
+    print(f"startup (import + create_app): {proc.stdout.strip()} ms")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f} {name}")
 
-def _background_loop() -> None:
-    while True:
-        _controller.tick()
-        time.sleep(config.tick_interval_sec)
 
+def main() -> None:
+    p = argparse.ArgumentParser(description="Irrigation controller service")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--workers", type=int, default=1)
+    p.add_argument("--profile-startup", action="store_true", help="report import times and exit")
+    args = p.parse_args()
 
-_thread = threading.Thread(target=_background_loop, daemon=True)
-_thread.start()
+    if args.profile_startup:
+        profile_startup()
+        return
 
-# routers
-app.include_router(routes_status.router)
-app.include_router(routes_control.router)
-app.include_router(routes_schedule.router)
-app.include_router(routes_config.router)
+    import uvicorn
+    uvicorn.run(
+        "src.app.main:create_app",
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+    )
 
 
-# to run: uvicorn app.main:app --host 0.0.0.0 --port 8000
+if __name__ == "__main__":
+    main()
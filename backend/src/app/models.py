@@ -1,6 +1,6 @@
 
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AirReading(BaseModel):
@@ -21,11 +21,32 @@ class Metrics(BaseModel):
     valve_open: bool
     mode: str           # "auto" / "manual"
     state: str          # controller state
+    flow_lpm: float | None = None       # None without a flow meter
+    daily_watered_litres: float = 0.0
+    leak_detected: bool = False         # flow while the valve is closed
+
+
+class Forecast(BaseModel):
+    drying_rate_per_hour: float | None = None
+    cross_at: datetime | None = None
+    window_start: datetime | None = None
+    window_end: datetime | None = None
+    planned_cycles: int = 0
+    cycles_done: int = 0
+
+
+class SensorHealth(BaseModel):
+    channel: str
+    status: str         # "ok" / "unknown" / "missing" / "range" / "flatline" / "rate" / "spike"
+    last_value: float | None = None
+    last_flag: str | None = None
+    last_flag_at: datetime | None = None
+    flagged_total: int = 0
 
 
 class ValveCommand(BaseModel):
     action: str         # "open" / "close"
-    seconds: int | None = None
+    seconds: int | None = Field(None, gt=0)
 
 
 class WateringMode(BaseModel):
@@ -0,0 +1,187 @@
+
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime
+from src.app.models import AirReading, SensorHealth, SoilReading
+
+
+class ChannelMonitor:
+    """Online plausibility checks for one sensor channel.
+
+    Each sample is checked, in order, for being missing, out of ``[low, high]``,
+    stuck (``flat_samples`` identical values in a row, except the ``clamped``
+    values a calibrated reading is pinned to), changing faster than
+    ``max_rate_per_min`` (plus the noise level) since the last accepted value,
+    or a spike more than ``mad_k`` robust deviations from the median of the
+    last ``window`` accepted values. The window is small and fixed, so every
+    check is constant-time.
+    ``confirm`` consecutive spike/rate rejections are taken as a genuine step
+    (e.g. watering) and the channel re-baselines on the new level.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        low: float,
+        high: float,
+        max_rate_per_min: float,
+        min_scale: float,
+        flat_samples: int | None = None,
+        flat_epsilon: float = 1e-9,
+        clamped: tuple[float, ...] = (),
+        window: int = 15,
+        mad_k: float = 6.0,
+        confirm: int = 3,
+    ) -> None:
+        self.name = name
+        self.low = low
+        self.high = high
+        self.max_rate_per_min = max_rate_per_min
+        self.min_scale = min_scale
+        self.flat_samples = flat_samples
+        self.flat_epsilon = flat_epsilon
+        self.clamped = clamped
+        self.mad_k = mad_k
+        self.confirm = confirm
+        self._window: deque[float] = deque(maxlen=window)
+        self._sorted: list[float] = []
+        self._last_value: float | None = None
+        self._last_ts: datetime | None = None
+        self._flat_value: float | None = None
+        self._flat_count = 0
+        self._rejected = 0
+        self.status = "unknown"
+        self.last_value: float | None = None
+        self.last_flag: str | None = None
+        self.last_flag_at: datetime | None = None
+        self.flagged_total = 0
+
+    def _accept(self, ts: datetime, value: float) -> None:
+        if len(self._window) == self._window.maxlen:
+            old = self._window[0]
+            del self._sorted[bisect_left(self._sorted, old)]
+        self._window.append(value)
+        insort(self._sorted, value)
+        self._last_value = value
+        self._last_ts = ts
+        self._rejected = 0
+
+    def _rebaseline(self, ts: datetime, value: float) -> None:
+        self._window.clear()
+        self._sorted.clear()
+        self._accept(ts, value)
+
+    def _median(self, values: list[float]) -> float:
+        n = len(values)
+        mid = n // 2
+        return values[mid] if n % 2 else (values[mid - 1] + values[mid]) / 2
+
+    def _classify(self, ts: datetime, value: float | None) -> str | None:
+        if value is None:
+            return "missing"
+        if not self.low <= value <= self.high:
+            return "range"
+
+        if self.flat_samples is not None:
+            if value in self.clamped:
+                self._flat_value = None
+            elif self._flat_value is not None and abs(value - self._flat_value) <= self.flat_epsilon:
+                self._flat_count += 1
+            else:
+                self._flat_value = value
+                self._flat_count = 1
+            if self._flat_value is not None and self._flat_count >= self.flat_samples:
+                return "flatline"
+
+        # robust noise scale of the recent accepted values
+        scale = self.min_scale
+        warm = len(self._sorted) == self._window.maxlen
+        if warm:
+            median = self._median(self._sorted)
+            mad = self._median(sorted(abs(v - median) for v in self._sorted))
+            scale = max(1.4826 * mad, self.min_scale)
+
+        if self._last_ts is not None:
+            minutes = (ts - self._last_ts).total_seconds() / 60
+            if abs(value - self._last_value) > self.max_rate_per_min * minutes + self.mad_k * scale:
+                return "rate"
+
+        if warm and abs(value - median) > self.mad_k * scale:
+            return "spike"
+        return None
+
+    def check(self, ts: datetime, value: float | None) -> bool:
+        """Classify a sample; returns True when it may be used."""
+        self.last_value = value
+        flag = self._classify(ts, value)
+        if flag is None:
+            self._accept(ts, value)
+        elif flag in ("spike", "rate"):
+            self._rejected += 1
+            if self._rejected >= self.confirm:
+                self._rebaseline(ts, value)
+                flag = None
+        if flag is not None:
+            self.flagged_total += 1
+            self.last_flag = flag
+            self.last_flag_at = ts
+        self.status = flag or "ok"
+        return flag is None
+
+    def health(self) -> SensorHealth:
+        return SensorHealth(
+            channel=self.name,
+            status=self.status,
+            last_value=self.last_value,
+            last_flag=self.last_flag,
+            last_flag_at=self.last_flag_at,
+            flagged_total=self.flagged_total,
+        )
+
+
+class SensorHealthMonitor:
+    """Per-channel anomaly detection for the air and soil sensors.
+
+    Flagged soil moisture readings are replaced by the last good reading for up
+    to ``hold_seconds`` and dropped afterwards, so the controller never acts on
+    a single bad sample and falls back to ``no_soil_data`` on a dead sensor.
+    """
+
+    def __init__(self, hold_seconds: float = 180) -> None:
+        self.hold_seconds = hold_seconds
+        self.channels = {
+            "soil_moisture": ChannelMonitor(
+                "soil_moisture", 0.0, 1.0, max_rate_per_min=0.2, min_scale=0.005, flat_samples=30,
+                # soil drier than the dry calibration point reads exactly 0.0 (wetter: 1.0)
+                clamped=(0.0, 1.0),
+            ),
+            "soil_temperature": ChannelMonitor(
+                "soil_temperature", -20.0, 60.0, max_rate_per_min=5.0, min_scale=0.2,
+            ),
+            "air_temperature": ChannelMonitor(
+                "air_temperature", -30.0, 70.0, max_rate_per_min=5.0, min_scale=0.2,
+            ),
+            "air_humidity": ChannelMonitor(
+                "air_humidity", 0.0, 100.0, max_rate_per_min=20.0, min_scale=1.0,
+            ),
+        }
+        self._good_soil: SoilReading | None = None
+        self._good_at: datetime | None = None
+
+    def check_air(self, now: datetime, air: AirReading | None) -> None:
+        self.channels["air_temperature"].check(now, air.temperature_c if air else None)
+        self.channels["air_humidity"].check(now, air.humidity_rel if air else None)
+
+    def filter_soil(self, now: datetime, soil: SoilReading | None) -> SoilReading | None:
+        """Return the reading to decide on: ``soil`` if plausible, else the last good one (or None)."""
+        self.channels["soil_temperature"].check(now, soil.temperature_c if soil else None)
+        if self.channels["soil_moisture"].check(now, soil.moisture_rel if soil else None):
+            self._good_soil = soil
+            self._good_at = now
+            return soil
+        if self._good_at is not None and (now - self._good_at).total_seconds() <= self.hold_seconds:
+            return self._good_soil
+        return None
+
+    def health(self) -> list[SensorHealth]:
+        return [channel.health() for channel in self.channels.values()]
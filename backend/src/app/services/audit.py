@@ -0,0 +1,134 @@
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class DecisionLog:
+    """Append-only line-JSON log of controller transitions.
+
+    Records go through a buffered binary writer that is flushed every
+    ``flush_interval`` seconds, and the file is rotated like
+    ``logging.RotatingFileHandler`` (``path.1`` .. ``path.N``) once it grows
+    past ``max_bytes``. Only transitions are written, never plain ticks.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 1_000_000,
+        backups: int = 3,
+        flush_interval: float = 5.0,
+        buffer_size: int = 64 * 1024,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+    def _open(self) -> None:
+        self._file = open(self.path, "ab", buffering=self.buffer_size)
+        self._size = self._file.tell()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.unlink(self.path)
+        self._open()
+
+    def record(
+        self,
+        ts: datetime,
+        from_state: str,
+        to_state: str,
+        reason: str,
+        moisture: float | None = None,
+        thresholds_version: str | None = None,
+        scheduled: bool = False,
+    ) -> None:
+        line = json.dumps({
+            "ts": ts.isoformat(),
+            "from": from_state,
+            "to": to_state,
+            "reason": reason,
+            "moisture": moisture,
+            "thresholds_version": thresholds_version,
+            "scheduled": scheduled,
+        }).encode() + b"\n"
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._size += len(line)
+            self._dirty = True
+            if self._size >= self.max_bytes:
+                self._rotate()
+        self.flush_if_due()
+
+    def flush_if_due(self) -> None:
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            self._dirty = False
+            self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def query(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        state: str | None = None,
+        reason: str | None = None,
+        limit: int = 100,
+    ) -> list[dict]:
+        """Return matching records, newest first."""
+        self.flush()
+        paths = [f"{self.path}.{i}" for i in range(self.backups, 0, -1)] + [self.path]
+        since_s = since.isoformat() if since else None
+        until_s = until.isoformat() if until else None
+        matches: list[dict] = []
+        for path in paths:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if since_s and rec["ts"] < since_s:
+                        continue
+                    if until_s and rec["ts"] > until_s:
+                        continue
+                    if state and rec["to"] != state and rec["from"] != state:
+                        continue
+                    if reason and reason not in rec["reason"]:
+                        continue
+                    matches.append(rec)
+        matches.reverse()
+        return matches[:limit]
@@ -0,0 +1,53 @@
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.app.database.repository import CalibrationRepository
+from src.app.hardware.calibration import CalibrationCurve
+from src.app.hardware.sensors import SensorReaderInterface
+
+
+class CalibrationService:
+    """Captures raw probe readings and installs compiled curves on the leader's sensors.
+
+    Compiling a curve evaluates it once per ADC code, off the controller
+    thread; the reader then only swaps in the finished table, so soil
+    readings cost one lookup per sample however many points the curve has.
+    """
+
+    def __init__(self, sensors: SensorReaderInterface) -> None:
+        self.sensors = sensors
+
+    def _check_channel(self, channel: int) -> None:
+        if self.sensors.moisture_channel != channel:
+            raise RuntimeError(f"No calibratable moisture probe on channel {channel}")
+
+    def capture(self, channel: int, samples: int = 16) -> dict:
+        """Average ``samples`` raw conversions and read the soil temperature."""
+        self._check_channel(channel)
+        reading = self.sensors.read_moisture_raw(samples)
+        if reading is None:
+            raise RuntimeError("Moisture probe read failed")
+        raw, temperature = reading
+        return {"raw": raw, "temperature_c": temperature}
+
+    def apply(self, channel: int, spec: dict | None) -> None:
+        """Compile and install a curve; ``None`` goes back to the two-point conversion."""
+        self._check_channel(channel)
+        table = CalibrationCurve.from_spec(spec).compile() if spec is not None else None
+        self.sensors.set_calibration(table)
+
+    def active(self, channel: int) -> bool:
+        return (
+            self.sensors.moisture_channel == channel
+            and getattr(self.sensors, "calibration", None) is not None
+        )
+
+
+async def load_calibration(session: AsyncSession, service: CalibrationService, channel: int) -> bool:
+    """Install the stored curve of ``channel`` at startup; False if there is none to apply."""
+    if service.sensors.moisture_channel != channel:
+        return False
+    spec = await CalibrationRepository(session).spec(channel)
+    if spec is None:
+        return False
+    service.apply(channel, spec)
+    return True
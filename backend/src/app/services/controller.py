@@ -1,9 +1,29 @@
 
+import asyncio
+from collections import deque
 from datetime import datetime, timedelta
-from src.app.config import config
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.app.config import AppConfig, get_config
+from src.app.database.engine import get_engine
+from src.app.database.repository import (
+    RuleRepository,
+    ScheduleRepository,
+    SensorReadingRepository,
+    ThresholdRepository,
+    WateringEventRepository,
+)
+from src.app.hardware.flow import FlowMeterInterface
 from src.app.hardware.sensors import SensorReaderInterface
 from src.app.hardware.valve import ValveInterface
+from src.app.models import Forecast, SensorHealth
+from src.app.services.anomaly import SensorHealthMonitor
+from src.app.services.audit import DecisionLog
+from src.app.services.decision import DecisionParams, budget_used, decide
+from src.app.services.events import ConfigChanged, StateChanged
+from src.app.services.forecast import MoistureForecaster, WateringPlan
 from src.app.services.repository import StateRepository
+from src.app.services.rules import RuleSet, facts
+from src.app.services.tracing import tracer
 
 
 class WateringController:
@@ -14,60 +34,346 @@ class WateringController:
         sensors: SensorReaderInterface,
         valve: ValveInterface,
         state_repo: StateRepository,
+        decision_log: DecisionLog | None = None,
+        flow_meter: FlowMeterInterface | None = None,
     ) -> None:
         self.sensors = sensors
         self.valve = valve
         self.state_repo = state_repo
+        self.decision_log = decision_log
+        self.flow_meter = flow_meter
         self._state: str = "idle"
         self._state_until: datetime | None = None
+        self._reason: str = ""
+        self._inputs: dict = {}
         self._db_thresholds = None
         self._last_threshold_load: datetime | None = None
+        self._cache_generation = 0
+        self._loaded_generation = -1
+        self._rules = RuleSet()
+        self._last_rules_load: datetime | None = None
+        self._rules_generation = -1
+        self._last_cycle_at: datetime | None = None
+        self.forecaster = MoistureForecaster()
+        self._config = get_config()
+        self.health_monitor = SensorHealthMonitor(hold_seconds=self._config.sensor_hold_sec)
+        self._plan: WateringPlan | None = None
+        self._last_history_write: datetime | None = None
+        self._last_data_touch: datetime | None = None
+        self._schedule_times: list[datetime] = []
+        self._pending_events: deque[dict] = deque(maxlen=256)
+        self._current_event: dict | None = None
+        self._last_pulses: int | None = None
+        self._last_flow_at: datetime | None = None
+        self._valve_was_open = False
+        self._leak_ticks = 0
+        self._resume(datetime.utcnow())
+        self._published_state = self._state
 
     @property
     def state(self) -> str:
         return self._state
 
+    def _resume(self, now: datetime) -> None:
+        """Pick up an in-flight watering/soak cycle restored by the state repository."""
+        snap = self.state_repo.snapshot()
+        if snap["mode"] != "auto" or snap["controller_state"] not in ("watering", "soak"):
+            return
+        self._state = snap["controller_state"]
+        self._state_until = snap["state_until"]
+        self._reason = "restored after restart"
+        if self._state == "watering" and self._state_until is not None and self._state_until > now:
+            self.valve.open()
+            self.state_repo.set_valve_open(True)
+
+    def _publish_state(self, now: datetime) -> None:
+        until = self._state_until if self._state in ("watering", "soak") else None
+        self.state_repo.set_controller_state(self._state, until)
+        if self._state != self._published_state:
+            # events are queued when watering ends, once their volume is known
+            if self._current_event is not None:
+                self._pending_events.append(self._current_event)
+                self._current_event = None
+            if self._state == "watering" and self._state_until is not None:
+                self._current_event = dict(
+                    started_at=now,
+                    duration_seconds=round((self._state_until - now).total_seconds()),
+                    reason=self._reason,
+                    moisture_rel=self._inputs.get("moisture"),
+                    litres=0.0 if self.flow_meter is not None else None,
+                )
+            if self.decision_log is not None:
+                self.decision_log.record(
+                    now,
+                    from_state=self._published_state,
+                    to_state=self._state,
+                    reason=self._reason,
+                    **self._inputs,
+                )
+            if self.state_repo.publishing:
+                self.state_repo.events.publish(StateChanged(
+                    state=self._state, previous=self._published_state, reason=self._reason, until=until
+                ))
+            self._published_state = self._state
+
+    @property
+    def plan(self) -> WateringPlan | None:
+        return self._plan
+
+    def forecast(self) -> Forecast:
+        """Summary of the drying model and the current watering plan."""
+        rate = self.forecaster.drying_rate()
+        plan = self._plan
+        if plan is None:
+            return Forecast(drying_rate_per_hour=rate)
+        return Forecast(
+            drying_rate_per_hour=rate,
+            cross_at=plan.cross_at,
+            window_start=plan.window_start,
+            window_end=plan.window_end,
+            planned_cycles=plan.cycles,
+            cycles_done=plan.cycles_done,
+        )
+
+    def health(self) -> list[SensorHealth]:
+        """Per-channel sensor health from the anomaly detector."""
+        return self.health_monitor.health()
+
+    def _account_flow(self, now: datetime) -> None:
+        """Turn flow meter pulses since the last tick into litres.
+
+        Volume measured while the valve was open at either end of the interval
+        counts as watering (the line drains for a moment after closing); flow
+        with the valve closed for ``leak_confirm_ticks`` intervals in a row is
+        reported as a leak.
+        """
+        if self.flow_meter is None:
+            return
+        cfg = get_config()
+        pulses = self.flow_meter.pulses
+        valve_open = self.valve.is_open
+        if self._last_pulses is None:
+            self._last_pulses, self._last_flow_at, self._valve_was_open = pulses, now, valve_open
+            return
+        litres = (pulses - self._last_pulses) / self.flow_meter.pulses_per_litre
+        minutes = (now - self._last_flow_at).total_seconds() / 60
+        flow_lpm = litres / minutes if minutes > 0 else 0.0
+        watering = valve_open or self._valve_was_open
+        self._last_pulses, self._last_flow_at, self._valve_was_open = pulses, now, valve_open
+
+        if watering:
+            if litres:
+                self.state_repo.add_watered_litres(litres)
+            if self._current_event is not None:
+                self._current_event["litres"] += litres
+            self._leak_ticks = 0
+        elif flow_lpm > cfg.leak_threshold_lpm:
+            self._leak_ticks += 1
+        else:
+            self._leak_ticks = 0
+        self.state_repo.set_flow(round(flow_lpm, 2), self._leak_ticks >= cfg.leak_confirm_ticks)
+
+    def _budget_used(self, snap: dict, budget_minutes: int, budget_litres: float | None) -> str | None:
+        """Reason for stopping when a daily budget is used up, else None."""
+        litres = snap["daily_watered_litres"] if self.flow_meter is not None else None
+        return budget_used(snap["daily_watered_seconds"], litres, budget_minutes, budget_litres)
+
+    def _update_plan(self, now: datetime, params: DecisionParams) -> None:
+        """Precompute the plan for the next window (kept fixed once it opens)."""
+        if self._plan is not None and self._plan.window_start <= now < self._plan.window_end:
+            return
+        self._plan = self.forecaster.plan(
+            now,
+            low=params.low,
+            high=params.high,
+            start_hour=params.window_start_hour,
+            end_hour=params.window_end_hour,
+            max_cycles=max(1, params.daily_budget_minutes * 60 // params.watering_seconds),
+        )
+
+    def _plan_due(self, now: datetime, moisture: float, high: float) -> bool:
+        return self._plan is not None and self._plan.is_due(now) and moisture < high
+
+    def _start_planned_cycle(self, now: datetime) -> None:
+        if self._plan is not None and self._plan.is_due(now):
+            self._plan.cycles_done += 1
+
+    async def seed_history(self, session: AsyncSession) -> None:
+        """Feed stored soil readings to the forecaster; call before the first tick.
+
+        The forecaster needs samples in time order, so this must run before
+        any live sample is added.
+        """
+        recent = await SensorReadingRepository(session).get_recent("soil", limit=500)
+        for reading in reversed(recent):
+            if reading.moisture_rel is not None:
+                self.forecaster.add_sample(reading.timestamp, reading.moisture_rel)
+
+    async def _record_history(self, now: datetime, soil) -> None:
+        """Persist new soil readings."""
+        if soil is None:
+            return
+        try:
+            engine = get_engine()
+            async with AsyncSession(engine) as session:
+                repo = SensorReadingRepository(session)
+                history_interval = get_config().history_interval_sec
+                # a sample store takes every reading; the database one per interval
+                interval = 0 if repo.store is not None else history_interval
+                if (
+                    self._last_history_write is None
+                    or (now - self._last_history_write).total_seconds() >= interval
+                ):
+                    await repo.create(
+                        reading_type="soil",
+                        temperature_c=soil.temperature_c,
+                        moisture_rel=soil.moisture_rel,
+                    )
+                    self._last_history_write = now
+                    # read models built from history are refreshed once per
+                    # interval, not for every raw sample
+                    if (
+                        self._last_data_touch is None
+                        or (now - self._last_data_touch).total_seconds() >= history_interval
+                    ):
+                        self._last_data_touch = now
+                        self.state_repo.touch_data()
+        except Exception:
+            pass
+
+    async def _flush_events(self) -> None:
+        """Write watering events queued since the last tick."""
+        if not self._pending_events:
+            return
+        try:
+            engine = get_engine()
+            async with AsyncSession(engine) as session:
+                await WateringEventRepository(session).add_many(list(self._pending_events))
+            self._pending_events.clear()
+            self.state_repo.touch_data()
+        except Exception:
+            pass
+
     async def _load_thresholds(self):
         """Load thresholds from database (cached for 60 seconds)."""
         now = datetime.utcnow()
+        generation = self._cache_generation
         if (
             self._db_thresholds is None
             or self._last_threshold_load is None
+            or self._loaded_generation != generation
             or (now - self._last_threshold_load).total_seconds() > 60
         ):
-            from src.app.database.engine import get_engine
-            from src.app.database.repository import ThresholdRepository
-            from sqlalchemy.ext.asyncio import AsyncSession
-            
             try:
                 engine = get_engine()
                 async with AsyncSession(engine) as session:
                     repo = ThresholdRepository(session)
+                    previous = self._db_thresholds
                     self._db_thresholds = await repo.get_current()
                     self._last_threshold_load = now
+                    self._loaded_generation = generation
+                    if previous is None or previous.updated_at != self._db_thresholds.updated_at:
+                        self._publish_thresholds(self._db_thresholds)
             except Exception:
                 self._db_thresholds = None
         
         return self._db_thresholds
 
+    async def _load_rules(self) -> RuleSet:
+        """Load and compile the enabled watering rules (cached like thresholds).
+
+        Rules are compiled here, once per change, so a tick only runs the
+        compiled closures. A set that fails to compile keeps the previous one.
+        """
+        now = datetime.utcnow()
+        generation = self._cache_generation
+        if (
+            self._last_rules_load is None
+            or self._rules_generation != generation
+            or (now - self._last_rules_load).total_seconds() > 60
+        ):
+            try:
+                engine = get_engine()
+                async with AsyncSession(engine) as session:
+                    if self._last_rules_load is None and self._last_cycle_at is None:
+                        recent = await WateringEventRepository(session).get_recent(limit=1)
+                        if recent:
+                            self._last_cycle_at = recent[0].started_at
+                    self._rules = RuleSet(await RuleRepository(session).specs())
+                self._last_rules_load = now
+                self._rules_generation = generation
+            except Exception:
+                pass
+        return self._rules
+
+    def _publish_thresholds(self, thresholds) -> None:
+        if self.state_repo.publishing:
+            values = {c.name: getattr(thresholds, c.name) for c in thresholds.__table__.columns}
+            self.state_repo.events.publish(ConfigChanged(section="thresholds", values=values))
+
+    def _apply_config(self, cfg: AppConfig) -> None:
+        """Take over reloaded settings that components keep a copy of."""
+        self.health_monitor.hold_seconds = cfg.sensor_hold_sec
+        self.sensors.configure(cfg.hardware)
+
+    def invalidate_cache(self) -> None:
+        """Force thresholds to be reloaded on the next tick."""
+        self._cache_generation += 1
+        self.state_repo.touch_data()
+
+    def next_wakeup(self, now: datetime) -> datetime:
+        """Earliest time the controller has something to do.
+
+        This is the minimum of the sensor sampling cadence, the end of the
+        current watering/soak phase, the next window opening, the next
+        scheduled watering today and midnight (for tomorrow's schedules).
+        """
+        cfg = get_config()
+        thresholds = self._db_thresholds
+        active = (
+            self._state in ("watering", "soak")
+            or self.valve.is_open
+            or self._within_window(now, thresholds)
+        )
+        interval = cfg.tick_interval_sec if active else cfg.idle_sample_interval_sec
+        candidates = [now + timedelta(seconds=interval)]
+
+        if self._state in ("watering", "soak") and self._state_until is not None:
+            candidates.append(self._state_until)
+
+        start_hour = thresholds.window_start_hour if thresholds else cfg.controller.window.start_hour
+        opening = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        if opening <= now:
+            opening += timedelta(days=1)
+        candidates.append(opening)
+
+        candidates.extend(t for t in self._schedule_times if t > now)
+        candidates.append(datetime.combine(now.date() + timedelta(days=1), datetime.min.time()))
+        return max(min(candidates), now)
+
     def _within_window(self, now: datetime, thresholds=None) -> bool:
         """Check if current time is within watering window."""
         if thresholds:
             return thresholds.window_start_hour <= now.hour < thresholds.window_end_hour
-        w = config.controller.window
+        w = get_config().controller.window
         return w.start_hour <= now.hour < w.end_hour
 
     async def _check_scheduled_watering(self, now: datetime) -> bool:
         """Check if there's a scheduled watering event for current time."""
-        from src.app.database.engine import get_engine
-        from src.app.database.repository import ScheduleRepository
-        from sqlalchemy.ext.asyncio import AsyncSession
-        
         try:
             engine = get_engine()
             async with AsyncSession(engine) as session:
                 repo = ScheduleRepository(session)
                 schedules = await repo.get_enabled_for_date(now.date())
+                times = [
+                    datetime.combine(now.date(), s.schedule_time.replace(second=0, microsecond=0))
+                    for s in schedules
+                ]
+                if times != self._schedule_times and self.state_repo.publishing:
+                    self.state_repo.events.publish(
+                        ConfigChanged(section="schedules", values={"today": times})
+                    )
+                self._schedule_times = times
                 
                 for schedule in schedules:
                     schedule_hour = schedule.schedule_time.hour
@@ -82,31 +388,55 @@ class WateringController:
 
     def tick(self) -> None:
         """Call this periodically from a background loop."""
-        import asyncio
-        
+        with tracer.start_trace("tick", "controller") as span:
+            self._tick()
+            span.set(state=self._state)
+
+    def _tick(self) -> None:
         now = datetime.utcnow()
+        # reloaded settings are handed to the components here, between ticks
+        cfg = get_config()
+        if cfg is not self._config:
+            self._config = cfg
+            self._apply_config(cfg)
         self.state_repo.reset_daily_if_needed(now)
 
         # read sensors
-        air = self.sensors.read_air()
-        soil = self.sensors.read_soil()
+        with tracer.span("read_sensors", "controller"):
+            air = self.sensors.read_air()
+            soil = self.sensors.read_soil()
         if air is not None:
             self.state_repo.set_air(air)
         if soil is not None:
             self.state_repo.set_soil(soil)
 
+        # raw readings are shown as-is, but flagged ones never drive decisions
+        with tracer.span("sensor_health", "controller"):
+            self.health_monitor.check_air(now, air)
+            measured = soil
+            soil = self.health_monitor.filter_soil(now, measured)
+            if soil is not None and soil is measured:
+                self.forecaster.add_sample(now, soil.moisture_rel)
+
         # sync valve state
-        self.state_repo.set_valve_open(self.valve.is_open)
+        with tracer.span("sync_valve", "controller"):
+            self.state_repo.set_valve_open(self.valve.is_open)
+            self._account_flow(now)
 
         mode = self.state_repo.snapshot()["mode"]
         if mode != "auto":
             self._state = "manual"
-            self.state_repo.set_controller_state(self._state)
+            self._reason = "mode set to manual"
+            self._inputs = {}
+            self._publish_state(now)
+            if self.decision_log is not None:
+                self.decision_log.flush_if_due()
             return
 
         # Reset state to idle if switching from manual to auto
         if self._state == "manual":
             self._state = "idle"
+            self._reason = "mode set to auto"
 
         try:
             loop = asyncio.get_event_loop()
@@ -116,128 +446,78 @@ class WateringController:
                 loop.run_until_complete(self._auto_tick_async(now, soil))
         except Exception:
             self._auto_tick(now, soil)
+        if self.decision_log is not None:
+            self.decision_log.flush_if_due()
 
     async def _auto_tick_async(self, now: datetime, soil) -> None:
         """Async version of auto tick that uses database."""
-        thresholds = await self._load_thresholds()
-        scheduled = await self._check_scheduled_watering(now)
+        with tracer.span("record_history", "controller"):
+            await self._record_history(now, soil)
+        with tracer.span("load_thresholds", "controller"):
+            thresholds = await self._load_thresholds()
+        with tracer.span("load_rules", "controller"):
+            await self._load_rules()
+        with tracer.span("check_schedules", "controller"):
+            scheduled = await self._check_scheduled_watering(now)
         
-        if thresholds:
-            await self._auto_tick_with_db(now, soil, thresholds, scheduled)
-        else:
-            self._auto_tick(now, soil)
+        with tracer.span("decide", "controller"):
+            if thresholds:
+                await self._auto_tick_with_db(now, soil, thresholds, scheduled)
+            else:
+                self._auto_tick(now, soil)
+        with tracer.span("flush_events", "controller"):
+            await self._flush_events()
 
     def _auto_tick(self, now: datetime, soil) -> None:
         """Fallback auto tick using config file (when DB is unavailable)."""
-        cfg = config.controller
-        snap = self.state_repo.snapshot()
-
-        daily_budget_sec = cfg.daily_budget_minutes * 60
-        if snap["daily_watered_seconds"] >= daily_budget_sec:
-            self._state = "budget_exceeded"
-            self.valve.close()
-            self.state_repo.set_valve_open(False)
-            self.state_repo.set_controller_state(self._state)
-            return
-
-        if soil is None:
-            self._state = "no_soil_data"
-            self.valve.close()
-            self.state_repo.set_valve_open(False)
-            self.state_repo.set_controller_state(self._state)
-            return
-
-        moisture = soil.moisture_rel
-
-        if self._state == "idle":
-            if moisture < cfg.threshold_low and self._within_window(now):
-                self.valve.open()
-                self.state_repo.set_valve_open(True)
-                self._state = "watering"
-                self._state_until = now + timedelta(seconds=cfg.watering_seconds)
-                self.state_repo.add_watered_seconds(cfg.watering_seconds)
-
-        elif self._state == "watering":
-            if now >= (self._state_until or now):
-                self.valve.close()
-                self.state_repo.set_valve_open(False)
-                self._state = "soak"
-                self._state_until = now + timedelta(minutes=cfg.soak_minutes)
-
-        elif self._state == "soak":
-            if now >= (self._state_until or now):
-                if moisture < cfg.threshold_low:
-                    self.valve.open()
-                    self.state_repo.set_valve_open(True)
-                    self._state = "watering"
-                    self._state_until = now + timedelta(seconds=cfg.watering_seconds)
-                    self.state_repo.add_watered_seconds(cfg.watering_seconds)
-                else:
-                    self._state = "idle"
-
-        # stop watering if too wet
-        if moisture > cfg.threshold_high:
-            self.valve.close()
-            self.state_repo.set_valve_open(False)
-            self._state = "idle"
-
-        self.state_repo.set_controller_state(self._state)
+        params = DecisionParams.from_config(get_config().controller)
+        self._decide(now, soil, params, "config", scheduled=False)
 
     async def _auto_tick_with_db(self, now: datetime, soil, thresholds, scheduled: bool) -> None:
         """Auto tick using database thresholds and schedules."""
-        snap = self.state_repo.snapshot()
-
-        daily_budget_sec = thresholds.daily_budget_minutes * 60
-        if snap["daily_watered_seconds"] >= daily_budget_sec:
-            self._state = "budget_exceeded"
-            self.valve.close()
-            self.state_repo.set_valve_open(False)
-            self.state_repo.set_controller_state(self._state)
-            return
-
-        if soil is None:
-            self._state = "no_soil_data"
-            self.valve.close()
-            self.state_repo.set_valve_open(False)
-            self.state_repo.set_controller_state(self._state)
-            return
+        params = DecisionParams.from_thresholds(thresholds)
+        version = f"{thresholds.id}@{thresholds.updated_at.isoformat()}"
+        self._decide(now, soil, params, version, scheduled)
 
-        moisture = soil.moisture_rel
-
-        if self._state == "idle":
-            should_water = (
-                (moisture < thresholds.soil_moisture_low and self._within_window(now, thresholds))
-                or scheduled
-            )
-            if should_water:
+    def _decide(self, now: datetime, soil, params: DecisionParams, version: str, scheduled: bool) -> None:
+        """Run the shared decision rules and act on the outcome."""
+        snap = self.state_repo.snapshot()
+        moisture = soil.moisture_rel if soil is not None else None
+        self._inputs = dict(moisture=moisture, thresholds_version=version, scheduled=scheduled)
+
+        budget = self._budget_used(snap, params.daily_budget_minutes, params.daily_budget_litres)
+        planned = False
+        if budget is None and moisture is not None:
+            self._update_plan(now, params)
+            planned = self._plan_due(now, moisture, params.high)
+
+        blocked = requested = None
+        if self._rules:
+            blocked, requested = self._rules.evaluate(facts(
+                now,
+                soil,
+                snap["air"],
+                snap["flow_lpm"] if self.flow_meter is not None else None,
+                snap["daily_watered_seconds"],
+                snap["daily_watered_litres"] if self.flow_meter is not None else None,
+                self._last_cycle_at,
+            ))
+
+        decision = decide(
+            self._state, self._state_until, now, moisture, params, budget, planned, scheduled, blocked, requested
+        )
+        if decision.start_cycle:
+            self._last_cycle_at = now
+            self._start_planned_cycle(now)
+            self.state_repo.add_watered_seconds(params.watering_seconds)
+        if decision.valve is not None:
+            if decision.valve:
                 self.valve.open()
-                self.state_repo.set_valve_open(True)
-                self._state = "watering"
-                self._state_until = now + timedelta(seconds=thresholds.watering_seconds)
-                self.state_repo.add_watered_seconds(thresholds.watering_seconds)
-
-        elif self._state == "watering":
-            if now >= (self._state_until or now):
+            else:
                 self.valve.close()
-                self.state_repo.set_valve_open(False)
-                self._state = "soak"
-                self._state_until = now + timedelta(minutes=thresholds.soak_minutes)
-
-        elif self._state == "soak":
-            if now >= (self._state_until or now):
-                if moisture < thresholds.soil_moisture_low:
-                    self.valve.open()
-                    self.state_repo.set_valve_open(True)
-                    self._state = "watering"
-                    self._state_until = now + timedelta(seconds=thresholds.watering_seconds)
-                    self.state_repo.add_watered_seconds(thresholds.watering_seconds)
-                else:
-                    self._state = "idle"
-
-        # stop watering if too wet
-        if moisture > thresholds.soil_moisture_high:
-            self.valve.close()
-            self.state_repo.set_valve_open(False)
-            self._state = "idle"
-
-        self.state_repo.set_controller_state(self._state)
+            self.state_repo.set_valve_open(decision.valve)
+        self._state = decision.state
+        self._state_until = decision.until
+        if decision.reason is not None:
+            self._reason = decision.reason
+        self._publish_state(now)
@@ -0,0 +1,143 @@
+
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+
+
+@dataclass(frozen=True)
+class DecisionParams:
+    """The thresholds one automatic watering decision depends on."""
+
+    low: float
+    high: float
+    watering_seconds: int
+    soak_minutes: int
+    daily_budget_minutes: int
+    daily_budget_litres: float | None
+    window_start_hour: int
+    window_end_hour: int
+
+    @classmethod
+    def from_thresholds(cls, thresholds) -> "DecisionParams":
+        """From a ``ThresholdConfig`` row."""
+        return cls(
+            low=thresholds.soil_moisture_low,
+            high=thresholds.soil_moisture_high,
+            watering_seconds=thresholds.watering_seconds,
+            soak_minutes=thresholds.soak_minutes,
+            daily_budget_minutes=thresholds.daily_budget_minutes,
+            daily_budget_litres=thresholds.daily_budget_litres,
+            window_start_hour=thresholds.window_start_hour,
+            window_end_hour=thresholds.window_end_hour,
+        )
+
+    @classmethod
+    def from_config(cls, cfg) -> "DecisionParams":
+        """From the ``ControllerConfig`` fallback."""
+        return cls(
+            low=cfg.threshold_low,
+            high=cfg.threshold_high,
+            watering_seconds=cfg.watering_seconds,
+            soak_minutes=cfg.soak_minutes,
+            daily_budget_minutes=cfg.daily_budget_minutes,
+            daily_budget_litres=cfg.daily_budget_litres,
+            window_start_hour=cfg.window.start_hour,
+            window_end_hour=cfg.window.end_hour,
+        )
+
+    def within_window(self, now: datetime) -> bool:
+        return self.window_start_hour <= now.hour < self.window_end_hour
+
+
+@dataclass(frozen=True)
+class Decision:
+    """Outcome of one tick: the next state and what to do about it."""
+
+    state: str
+    until: datetime | None
+    reason: str | None = None     # None keeps the previous reason
+    valve: bool | None = None     # True to open, False to close, None to leave as is
+    start_cycle: bool = False     # a watering cycle of ``watering_seconds`` starts
+
+
+def budget_used(
+    watered_seconds: float,
+    watered_litres: float | None,
+    budget_minutes: int,
+    budget_litres: float | None,
+) -> str | None:
+    """Reason for stopping when a daily budget is used up, else None.
+
+    ``watered_litres`` is None without a flow meter, which disables the
+    litre budget.
+    """
+    if watered_seconds >= budget_minutes * 60:
+        return "daily budget used"
+    if budget_litres is not None and watered_litres is not None and watered_litres >= budget_litres:
+        return "daily litre budget used"
+    return None
+
+
+def decide(
+    state: str,
+    until: datetime | None,
+    now: datetime,
+    moisture: float | None,
+    params: DecisionParams,
+    budget: str | None = None,
+    planned: bool = False,
+    scheduled: bool = False,
+    blocked: str | None = None,
+    requested: str | None = None,
+) -> Decision:
+    """The automatic watering state machine (idle -> watering -> soak -> ...).
+
+    Pure, so the controller and the what-if replay run the very same rules:
+    ``budget`` is the reason a daily budget is used up, ``planned`` whether
+    the forecaster's plan wants a cycle now and ``scheduled`` whether a
+    schedule is due. ``blocked`` and ``requested`` are the reasons of a
+    matching user rule that skips or asks for a cycle.
+    """
+    if budget is not None:
+        return Decision("budget_exceeded", until, budget, valve=False)
+    if moisture is None:
+        return Decision("no_soil_data", until, "no soil reading", valve=False)
+
+    decision = Decision(state, until)
+    if state == "idle":
+        dry = moisture < params.low and params.within_window(now)
+        if blocked is not None and (dry or planned or scheduled or requested):
+            decision = Decision(state, until, blocked)
+        elif dry or planned or scheduled or requested:
+            reason = (
+                "moisture below low threshold" if dry
+                else "planned cycle" if planned
+                else "scheduled" if scheduled
+                else requested
+            )
+            decision = _water(now, params, reason)
+
+    elif state == "watering":
+        if now >= (until or now):
+            decision = Decision(
+                "soak", now + timedelta(minutes=params.soak_minutes), "watering time elapsed", valve=False
+            )
+
+    elif state == "soak":
+        if now >= (until or now):
+            if (moisture < params.low or planned) and blocked is not None:
+                decision = Decision("idle", until, blocked)
+            elif moisture < params.low or planned:
+                decision = _water(now, params, "still dry after soak" if moisture < params.low else "planned cycle")
+            else:
+                decision = Decision("idle", until, "moisture recovered after soak")
+
+    # stop watering if too wet
+    if moisture > params.high:
+        decision = replace(decision, state="idle", reason="moisture above high threshold", valve=False)
+    return decision
+
+
+def _water(now: datetime, params: DecisionParams, reason: str) -> Decision:
+    return Decision(
+        "watering", now + timedelta(seconds=params.watering_seconds), reason, valve=True, start_cycle=True
+    )
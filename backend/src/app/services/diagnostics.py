@@ -0,0 +1,128 @@
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+# frames a thread sits in while it waits for work; skipped unless asked for
+IDLE_FUNCTIONS = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("socketserver.py", "serve_forever"),
+    ("queue.py", "get"),
+    ("base_events.py", "_run_once"),
+}
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+_profile_lock = threading.Lock()
+
+
+def _label(code) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005, include_idle: bool = False) -> Counter:
+    """Sample the stacks of all other threads every ``interval`` seconds.
+
+    Stacks are counted as tuples of code objects (thread name first, root
+    frame next) and only turned into strings once at the end, so a sample
+    costs little more than walking the frames. One profile runs at a time.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        own = threading.get_ident()
+        counts: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                code = frame.f_code
+                if not include_idle and (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                stack.reverse()
+                counts[(names.get(ident, str(ident)), *stack)] += 1
+            time.sleep(interval)
+        return counts
+    finally:
+        _profile_lock.release()
+
+
+def collapsed(counts: Counter) -> str:
+    """Brendan Gregg's collapsed stack format (``flamegraph.pl``, speedscope, inferno)."""
+    lines = []
+    for (thread, *stack), count in counts.most_common():
+        frames = ";".join(_label(code) for code in stack)
+        lines.append(f"{thread};{frames} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class Diagnostics:
+    """On-demand stack profiles and tracemalloc diffs of this process.
+
+    With several workers the leader's instance is used (through
+    ``RemoteDiagnostics``), since the controller thread and the drivers run there.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._baseline: tracemalloc.Snapshot | None = None
+
+    def profile(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+        return collapsed(sample_stacks(seconds, interval, include_idle))
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+
+    def memory_start(self, frames: int = 10) -> None:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._baseline = self._snapshot()
+
+    def memory_stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+
+    def memory_diff(self, top: int = 25) -> dict:
+        """Allocation growth by traceback since the last start/diff; the new snapshot becomes the baseline."""
+        with self._lock:
+            if not tracemalloc.is_tracing() or self._baseline is None:
+                raise RuntimeError("Memory tracing is not running")
+            snapshot = self._snapshot()
+            stats = snapshot.compare_to(self._baseline, "traceback")[:top]
+            self._baseline = snapshot
+            current, peak = tracemalloc.get_traced_memory()
+        return dict(
+            traced_bytes=current,
+            peak_bytes=peak,
+            stats=[
+                dict(
+                    size_diff=stat.size_diff,
+                    size=stat.size,
+                    count_diff=stat.count_diff,
+                    count=stat.count,
+                    traceback=[f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                )
+                for stat in stats
+            ],
+        )
@@ -0,0 +1,152 @@
+
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Literal
+from pydantic import BaseModel, Field
+from src.app.models import AirReading, SoilReading
+
+
+class Event(BaseModel):
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+    @property
+    def topic(self) -> str:
+        raise NotImplementedError
+
+
+class ReadingEvent(Event):
+    kind: Literal["air", "soil"]
+    temperature_c: float
+    humidity_rel: float | None = None   # air only
+    moisture_rel: float | None = None   # soil only
+    measured_at: datetime
+
+    @classmethod
+    def of(cls, reading: AirReading | SoilReading) -> "ReadingEvent":
+        return cls(
+            kind="soil" if hasattr(reading, "moisture_rel") else "air",
+            temperature_c=reading.temperature_c,
+            humidity_rel=getattr(reading, "humidity_rel", None),
+            moisture_rel=getattr(reading, "moisture_rel", None),
+            measured_at=reading.timestamp,
+        )
+
+    @property
+    def topic(self) -> str:
+        return f"readings/{self.kind}"
+
+
+class ValveChanged(Event):
+    is_open: bool
+
+    @property
+    def topic(self) -> str:
+        return "valve"
+
+
+class StateChanged(Event):
+    state: str
+    previous: str
+    reason: str = ""
+    until: datetime | None = None
+
+    @property
+    def topic(self) -> str:
+        return "state"
+
+
+class ConfigChanged(Event):
+    section: str        # "mode" / "thresholds" / "schedules"
+    values: dict[str, Any]
+
+    @property
+    def topic(self) -> str:
+        return f"config/{self.section}"
+
+
+class Subscription:
+    """Bounded queue of events for one consumer, bound to the loop it was created on.
+
+    A consumer that falls behind loses the oldest events (counted in
+    ``dropped``) rather than holding up the publisher.
+    """
+
+    def __init__(self, bus: "EventBus", prefixes: tuple[str, ...], maxsize: int) -> None:
+        self.bus = bus
+        self.prefixes = prefixes
+        self.dropped = 0
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[Event] = asyncio.Queue(maxsize)
+
+    def wants(self, topic: str) -> bool:
+        return not self.prefixes or topic.startswith(self.prefixes)
+
+    def _put(self, event: Event) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    def deliver(self, event: Event) -> None:
+        """Thread-safe; the event is queued on the subscriber's loop."""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    async def get(self) -> Event:
+        return await self._queue.get()
+
+    def get_nowait(self) -> Event:
+        return self._queue.get_nowait()
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Event:
+        return await self.get()
+
+
+class EventBus:
+    """In-process publish/subscribe for controller and state changes.
+
+    ``publish`` may be called from any thread (the controller thread, API
+    threadpool, IPC handlers) and never blocks; each subscriber receives the
+    events on its own event loop. Lives in the leader process, next to the
+    hardware.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: tuple[Subscription, ...] = ()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, *prefixes: str, maxsize: int = 256) -> Subscription:
+        """Events whose topic starts with one of ``prefixes`` (all when none given)."""
+        sub = Subscription(self, prefixes, maxsize)
+        with self._lock:
+            self._subscribers = (*self._subscribers, sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+
+    def publish(self, event: Event) -> None:
+        topic = event.topic
+        for sub in self._subscribers:
+            if sub.wants(topic):
+                sub.deliver(event)
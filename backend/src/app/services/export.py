@@ -0,0 +1,195 @@
+
+import argparse
+import asyncio
+import io
+import os
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from itertools import islice
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from src.app.database.models import SensorReading, WateringEvent
+from src.app.database.sample_store import get_sample_store
+
+# table name -> (model, timestamp column, exported columns)
+TABLES = {
+    "readings": (
+        SensorReading,
+        "timestamp",
+        ("timestamp", "reading_type", "temperature_c", "humidity_rel", "moisture_rel"),
+    ),
+    "events": (
+        WateringEvent,
+        "started_at",
+        ("started_at", "duration_seconds", "reason", "moisture_rel", "litres"),
+    ),
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError(
+            "pyarrow is required for history export (pip install 'home-irrigation-service[analytics]')"
+        ) from e
+    return pyarrow
+
+
+def schema(table: str):
+    """Arrow schema of an exported table."""
+    pa = _pyarrow()
+    types = {
+        "timestamp": pa.timestamp("us"),
+        "started_at": pa.timestamp("us"),
+        "reading_type": pa.dictionary(pa.int8(), pa.string()),
+        "reason": pa.dictionary(pa.int8(), pa.string()),
+        "duration_seconds": pa.int32(),
+    }
+    return pa.schema([(name, types.get(name, pa.float32())) for name in TABLES[table][2]])
+
+
+async def iter_chunks(
+    engine: AsyncEngine,
+    table: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[dict[str, list]]:
+    """Stream rows in timestamp order as column lists of at most ``chunk_size`` rows."""
+    model, ts_name, names = TABLES[table]
+    store = get_sample_store() if table == "readings" else None
+    if store is not None:
+        # store rows are already (timestamp, reading_type, temperature, humidity, moisture)
+        rows = store.rows(since, until)
+        while chunk := await asyncio.to_thread(list, islice(rows, chunk_size)):
+            yield {name: list(column) for name, column in zip(names, zip(*chunk))}
+        return
+    ts = getattr(model, ts_name)
+    stmt = select(*(getattr(model, name) for name in names)).order_by(ts)
+    if since is not None:
+        stmt = stmt.where(ts >= since)
+    if until is not None:
+        stmt = stmt.where(ts < until)
+    async with AsyncSession(engine) as session:
+        result = await session.stream(stmt.execution_options(yield_per=chunk_size))
+        async for rows in result.partitions():
+            yield {name: list(column) for name, column in zip(names, zip(*rows))}
+
+
+async def arrow_stream(
+    engine: AsyncEngine,
+    table: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """Encode a table as a zstd-compressed Arrow IPC stream, one record batch per chunk."""
+    pa = _pyarrow()
+    table_schema = schema(table)
+    sink = io.BytesIO()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_stream(sink, table_schema, options=options) as writer:
+        async for chunk in iter_chunks(engine, table, since, until, chunk_size):
+            writer.write_batch(pa.record_batch(chunk, schema=table_schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+async def export_partitioned(
+    engine: AsyncEngine,
+    out_dir: str,
+    tables: tuple[str, ...] = tuple(TABLES),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    fmt: str = "parquet",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[str]:
+    """Write ``<out_dir>/<table>/day=YYYY-MM-DD/part.<fmt>`` files and return their paths.
+
+    Rows arrive in timestamp order, so only one day's writer is open at a time.
+    """
+    pa = _pyarrow()
+    written: list[str] = []
+    for table in tables:
+        table_schema = schema(table)
+        ts_name = TABLES[table][1]
+        writer = None
+        day: date | None = None
+        try:
+            async for chunk in iter_chunks(engine, table, since, until, chunk_size):
+                batch = pa.record_batch(chunk, schema=table_schema)
+                days = [ts.date() for ts in chunk[ts_name]]
+                start = 0
+                for i in range(len(days) + 1):
+                    if i < len(days) and days[i] == day:
+                        continue
+                    if i > start:
+                        writer.write_batch(batch.slice(start, i - start))
+                    if i == len(days):
+                        break
+                    if writer is not None:
+                        writer.close()
+                    day = days[i]
+                    start = i
+                    path = os.path.join(out_dir, table, f"day={day.isoformat()}", f"part.{fmt}")
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    writer = _open_writer(pa, path, table_schema, fmt)
+                    written.append(path)
+        finally:
+            if writer is not None:
+                writer.close()
+    return written
+
+
+def _open_writer(pa, path: str, table_schema, fmt: str):
+    if fmt == "parquet":
+        return pa.parquet.ParquetWriter(path, table_schema, compression="zstd")
+    if fmt == "arrow":
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        return pa.ipc.new_file(path, table_schema, options=options)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def main():
+    from src.app.database.engine import get_engine, init_db
+
+    p = argparse.ArgumentParser(description="Export history to day-partitioned columnar files")
+    p.add_argument("out_dir")
+    p.add_argument("--db", default="sqlite+aiosqlite:///./irrigation.db", help="database URL")
+    p.add_argument("--table", choices=list(TABLES), action="append", help="default: all")
+    p.add_argument("--since", type=datetime.fromisoformat, help="ISO timestamp")
+    p.add_argument("--until", type=datetime.fromisoformat, help="ISO timestamp")
+    p.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = p.parse_args()
+
+    init_db(args.db)
+
+    async def run():
+        engine = get_engine()
+        try:
+            return await export_partitioned(
+                engine,
+                args.out_dir,
+                tables=tuple(args.table or TABLES),
+                since=args.since,
+                until=args.until,
+                fmt=args.format,
+                chunk_size=args.chunk_size,
+            )
+        finally:
+            await engine.dispose()
+
+    for path in asyncio.run(run()):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
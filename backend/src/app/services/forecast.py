@@ -0,0 +1,159 @@
+
+import math
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+@dataclass
+class WateringPlan:
+    """Precomputed watering cycles for one watering window."""
+
+    window_start: datetime
+    window_end: datetime
+    cross_at: datetime | None   # predicted time moisture drops below the low threshold
+    cycles: int                 # watering cycles to run inside the window
+    cycles_done: int = 0
+
+    def is_due(self, now: datetime) -> bool:
+        return (
+            self.window_start <= now < self.window_end
+            and self.cycles_done < self.cycles
+        )
+
+
+class MoistureForecaster:
+    """Least-squares drying-rate model over a rolling window of soil samples.
+
+    Samples are kept per drying segment: a rise in moisture (watering or rain)
+    starts a new segment, and the size of the rise is used to learn how much a
+    single watering cycle adds.
+    """
+
+    def __init__(
+        self,
+        window_hours: float = 12.0,
+        min_samples: int = 6,
+        rise_reset: float = 0.01,
+        cycle_gain: float = 0.03,
+    ) -> None:
+        self.window_hours = window_hours
+        self.min_samples = min_samples
+        self.rise_reset = rise_reset
+        self.cycle_gain = cycle_gain
+        self._origin: datetime | None = None
+        self._samples: deque[tuple[float, float]] = deque()
+        # running sums for the least-squares fit
+        self._sx = 0.0
+        self._sy = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+
+    def _hours(self, ts: datetime) -> float:
+        assert self._origin is not None
+        return (ts - self._origin).total_seconds() / 3600
+
+    def _reset(self, ts: datetime) -> None:
+        self._origin = ts
+        self._samples.clear()
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+
+    def add_sample(self, ts: datetime, moisture: float) -> None:
+        """Add a soil moisture sample; samples must arrive in time order."""
+        if self._origin is None:
+            self._reset(ts)
+        elif self._samples:
+            last = self._samples[-1][1]
+            if moisture - last > self.rise_reset:
+                # learn the per-cycle gain as a moving average of observed rises
+                self.cycle_gain = 0.7 * self.cycle_gain + 0.3 * (moisture - last)
+                self._reset(ts)
+
+        x = self._hours(ts)
+        self._samples.append((x, moisture))
+        self._sx += x
+        self._sy += moisture
+        self._sxx += x * x
+        self._sxy += x * moisture
+
+        while self._samples and x - self._samples[0][0] > self.window_hours:
+            ox, oy = self._samples.popleft()
+            self._sx -= ox
+            self._sy -= oy
+            self._sxx -= ox * ox
+            self._sxy -= ox * oy
+
+    def _fit(self) -> tuple[float, float] | None:
+        """Return (slope per hour, intercept) or None when there is too little data."""
+        n = len(self._samples)
+        if n < self.min_samples:
+            return None
+        denom = n * self._sxx - self._sx * self._sx
+        if denom <= 1e-12:
+            return None
+        slope = (n * self._sxy - self._sx * self._sy) / denom
+        intercept = (self._sy - slope * self._sx) / n
+        return slope, intercept
+
+    def drying_rate(self) -> float | None:
+        """Fitted moisture change per hour (negative while drying)."""
+        fit = self._fit()
+        return fit[0] if fit else None
+
+    def predict(self, ts: datetime) -> float | None:
+        """Predicted moisture at a given time."""
+        fit = self._fit()
+        if fit is None:
+            return None
+        slope, intercept = fit
+        return intercept + slope * self._hours(ts)
+
+    def predict_crossing(self, threshold: float, now: datetime) -> datetime | None:
+        """Predict when moisture drops below threshold (None if not drying)."""
+        fit = self._fit()
+        if fit is None:
+            return None
+        slope, intercept = fit
+        if intercept + slope * self._hours(now) < threshold:
+            return now
+        if slope >= 0:
+            return None
+        return self._origin + timedelta(hours=(threshold - intercept) / slope)
+
+    def plan(
+        self,
+        now: datetime,
+        low: float,
+        high: float,
+        start_hour: int,
+        end_hour: int,
+        max_cycles: int,
+    ) -> WateringPlan:
+        """Plan the current or next watering window.
+
+        A window gets cycles when moisture is predicted to cross the low
+        threshold before the following window opens.
+        """
+        window_start = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+        window_end = now.replace(hour=end_hour, minute=0, second=0, microsecond=0)
+        if window_end <= window_start:
+            window_end += timedelta(days=1)
+        if now >= window_end:
+            window_start += timedelta(days=1)
+            window_end += timedelta(days=1)
+
+        cross_at = self.predict_crossing(low, now)
+        cycles = 0
+        if cross_at is not None and cross_at < window_start + timedelta(days=1):
+            expected = self.predict(max(now, window_start))
+            if expected is not None and expected < high:
+                gain = max(self.cycle_gain, 1e-3)
+                cycles = math.ceil((high - expected) / gain)
+            cycles = max(1, min(cycles, max_cycles))
+
+        return WateringPlan(
+            window_start=window_start,
+            window_end=window_end,
+            cross_at=cross_at,
+            cycles=cycles,
+        )
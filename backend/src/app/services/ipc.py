@@ -0,0 +1,340 @@
+
+import json
+import os
+import socket
+import socketserver
+import threading
+from datetime import datetime
+from src.app.hardware.valve import ValveInterface
+from src.app.models import AirReading, Forecast, SensorHealth, SoilReading
+from src.app.services.tracing import current_trace_id, tracer
+from src.app.services.valve_gate import GateResult
+
+
+class ControlServer:
+    """Serves the leader's state repository, valve and controller to API workers.
+
+    Only the process holding the ``LeaderLock`` drives the hardware; the other
+    workers use the ``Remote*`` proxies below, which have the same interface
+    as the local singletons. The protocol is one JSON object per line over a
+    Unix socket.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        state_repo,
+        valve,
+        controller,
+        scheduler,
+        valve_gate,
+        diagnostics=None,
+        calibration=None,
+        runtime_config=None,
+    ) -> None:
+        self.path = path
+        self.state_repo = state_repo
+        self.valve = valve
+        self.controller = controller
+        self.scheduler = scheduler
+        self.valve_gate = valve_gate
+        self.diagnostics = diagnostics
+        self.calibration = calibration
+        self.runtime_config = runtime_config
+        self._server: socketserver.ThreadingUnixStreamServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a previous leader
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        response = {"ok": True, "result": server.handle(request)}
+                    except Exception as exc:
+                        response = {"ok": False, "error": str(exc)}
+                    self.wfile.write(json.dumps(response).encode() + b"\n")
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ipc", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def handle(self, request: dict):
+        """Dispatch one request, continuing the caller's trace if it sent one."""
+        op, args = request["op"], request.get("args", {})
+        trace_id = request.get("trace")
+        if trace_id is None or not tracer.enabled:
+            return self.dispatch(op, args)
+        with tracer.start_trace(f"ipc {op}", "ipc", trace_id):
+            return self.dispatch(op, args)
+
+    def dispatch(self, op: str, args: dict):
+        if op == "snapshot":
+            snap = self.state_repo.snapshot()
+            for key in ("air", "soil"):
+                if snap[key] is not None:
+                    snap[key] = snap[key].model_dump(mode="json")
+            if snap["state_until"] is not None:
+                snap["state_until"] = snap["state_until"].isoformat()
+            return snap
+        if op == "set_mode":
+            self.state_repo.set_mode(args["mode"])
+        elif op == "set_valve_open":
+            self.state_repo.set_valve_open(args["is_open"])
+        elif op == "valve_open":
+            self.valve.open()
+        elif op == "valve_open_for":
+            self.valve.open_for(args["seconds"])
+        elif op == "valve_close":
+            self.valve.close()
+        elif op == "valve_is_open":
+            return self.valve.is_open
+        elif op == "wake":
+            self.scheduler.wake()
+        elif op == "forecast":
+            return self.controller.forecast().model_dump(mode="json")
+        elif op == "valve_command":
+            return vars(self.valve_gate.submit(args["client"], args["action"], args.get("seconds")))
+        elif op == "health":
+            return [h.model_dump(mode="json") for h in self.controller.health()]
+        elif op == "profile":
+            return self.diagnostics.profile(args["seconds"], args["interval"], args["include_idle"])
+        elif op == "memory_start":
+            self.diagnostics.memory_start(args["frames"])
+        elif op == "memory_diff":
+            return self.diagnostics.memory_diff(args["top"])
+        elif op == "memory_stop":
+            self.diagnostics.memory_stop()
+        elif op == "calibration_capture":
+            return self.calibration.capture(args["channel"], args["samples"])
+        elif op == "calibration_apply":
+            self.calibration.apply(args["channel"], args["spec"])
+        elif op == "calibration_active":
+            return self.calibration.active(args["channel"])
+        elif op == "config_status":
+            return self.runtime_config.status()
+        elif op == "config_reload":
+            return self.runtime_config.reload()
+        else:
+            raise ValueError(f"Unknown op: {op}")
+        return None
+
+
+class ControlClient:
+    """Sends requests to the leader's ``ControlServer`` over a persistent connection."""
+
+    def __init__(self, path: str, timeout: float = 2.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+            self._local.conn = None
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        self._drop_connection()
+
+    def call(self, op: str, **args):
+        trace_id = current_trace_id()
+        if trace_id is None:
+            return self._send({"op": op, "args": args})
+        with tracer.span(f"ipc {op}", "ipc"):
+            return self._send({"op": op, "args": args, "trace": trace_id})
+
+    def _send(self, request: dict):
+        payload = json.dumps(request).encode() + b"\n"
+        for attempt in range(2):
+            try:
+                sock, reader = self._connection()
+                sock.sendall(payload)
+                break
+            except OSError:
+                # the leader never got the request (a connection left over from a
+                # previous leader fails here with EPIPE), so sending it again is safe
+                self._drop_connection()
+                if attempt:
+                    raise
+        try:
+            line = reader.readline()
+        except OSError:
+            # the request may have run: never resend it, and drop the connection
+            # so a late answer is not read as the reply to the next request
+            self._drop_connection()
+            raise
+        if not line:
+            self._drop_connection()
+            raise ConnectionError("Controller leader closed the connection")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+
+class RemoteStateRepository:
+    """``StateRepository`` proxy for API workers."""
+
+    def __init__(self, client: ControlClient) -> None:
+        self.client = client
+
+    def set_mode(self, mode: str) -> None:
+        self.client.call("set_mode", mode=mode)
+
+    def set_valve_open(self, is_open: bool) -> None:
+        self.client.call("set_valve_open", is_open=is_open)
+
+    def snapshot(self) -> dict:
+        snap = self.client.call("snapshot")
+        if snap["air"] is not None:
+            snap["air"] = AirReading(**snap["air"])
+        if snap["soil"] is not None:
+            snap["soil"] = SoilReading(**snap["soil"])
+        if snap["state_until"] is not None:
+            snap["state_until"] = datetime.fromisoformat(snap["state_until"])
+        return snap
+
+
+class RemoteValve(ValveInterface):
+    """Valve proxy for API workers; commands are executed by the leader."""
+
+    def __init__(self, client: ControlClient) -> None:
+        self.client = client
+
+    def open(self) -> None:
+        self.client.call("valve_open")
+
+    def close(self) -> None:
+        self.client.call("valve_close")
+
+    def open_for(self, seconds: int) -> None:
+        self.client.call("valve_open_for", seconds=seconds)
+
+    @property
+    def is_open(self) -> bool:
+        return self.client.call("valve_is_open")
+
+
+class RemoteValveGate:
+    """Sends manual valve commands to the leader's gate, which owns the rate limits."""
+
+    def __init__(self, client: ControlClient) -> None:
+        self.client = client
+
+    def submit(self, client: str, action: str, seconds: int | None = None) -> GateResult:
+        return GateResult(**self.client.call("valve_command", client=client, action=action, seconds=seconds))
+
+
+class RemoteController:
+    """Read-only controller proxy for API workers."""
+
+    def __init__(self, client: ControlClient) -> None:
+        self.client = client
+
+    def forecast(self) -> Forecast:
+        return Forecast(**self.client.call("forecast"))
+
+    def health(self) -> list[SensorHealth]:
+        return [SensorHealth(**h) for h in self.client.call("health")]
+
+
+class RemoteScheduler:
+    """Forwards wake-ups to the leader's scheduler."""
+
+    def __init__(self, client: ControlClient) -> None:
+        self.client = client
+
+    def wake(self) -> None:
+        self.client.call("wake")
+
+
+class RemoteRuntimeConfig:
+    """The leader's runtime configuration, which is the one the controller uses."""
+
+    def __init__(self, client: ControlClient) -> None:
+        self.client = client
+
+    def status(self) -> dict:
+        return self.client.call("config_status")
+
+    def reload(self) -> bool:
+        return self.client.call("config_reload")
+
+
+class RemoteDiagnostics:
+    """Profiles and memory diffs of the leader, where the controller thread runs."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _call(self, op: str, timeout: float, **args):
+        # profiles outlast the normal IPC timeout, so use a dedicated connection
+        client = ControlClient(self.path, timeout=timeout)
+        try:
+            return client.call(op, **args)
+        finally:
+            client.close()
+
+    def profile(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> str:
+        return self._call(
+            "profile", seconds + 10, seconds=seconds, interval=interval, include_idle=include_idle
+        )
+
+    def memory_start(self, frames: int = 10) -> None:
+        self._call("memory_start", 30, frames=frames)
+
+    def memory_diff(self, top: int = 25) -> dict:
+        return self._call("memory_diff", 60, top=top)
+
+    def memory_stop(self) -> None:
+        self._call("memory_stop", 30)
+
+
+class RemoteCalibration:
+    """Calibration captures and curve updates run on the leader, which owns the probe."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def _call(self, op: str, timeout: float, **args):
+        # oversampled captures and compiling a curve outlast the normal IPC timeout
+        client = ControlClient(self.path, timeout=timeout)
+        try:
+            return client.call(op, **args)
+        finally:
+            client.close()
+
+    def capture(self, channel: int, samples: int = 16) -> dict:
+        return self._call("calibration_capture", 30, channel=channel, samples=samples)
+
+    def apply(self, channel: int, spec: dict | None) -> None:
+        self._call("calibration_apply", 30, channel=channel, spec=spec)
+
+    def active(self, channel: int) -> bool:
+        return self._call("calibration_active", 5, channel=channel)
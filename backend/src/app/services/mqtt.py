@@ -0,0 +1,276 @@
+
+import asyncio
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from pydantic import ValidationError
+from src.app.models import ValveCommand
+from src.app.services.events import ConfigChanged, Event, EventBus, ReadingEvent, ValveChanged
+
+Handler = Callable[[str, bytes], None]
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """MQTT topic filter matching with ``+`` (one level) and ``#`` (the rest)."""
+    parts = topic.split("/")
+    for i, level in enumerate(pattern.split("/")):
+        if level == "#":
+            return True
+        if i >= len(parts) or (level != "+" and level != parts[i]):
+            return False
+    return len(parts) == len(pattern.split("/"))
+
+
+class MqttClientInterface(ABC):
+    @abstractmethod
+    def connect(self, on_connect: Callable[[], None]) -> None:
+        """Connect in the background; ``on_connect`` runs after every (re)connect."""
+
+    @abstractmethod
+    def publish(self, topic: str, payload: str, retain: bool = False) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        ...
+
+    @abstractmethod
+    def disconnect(self) -> None:
+        ...
+
+
+class PahoMqttClient(MqttClientInterface):
+    """paho-mqtt 2.x with a background network thread (``mqtt`` extra)."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 1883,
+        client_id: str = "irrigation",
+        username: str | None = None,
+        password: str | None = None,
+        qos: int = 1,
+        will: tuple[str, str] | None = None,
+    ) -> None:
+        import paho.mqtt.client as mqtt
+
+        self.host = host
+        self.port = port
+        self.qos = qos
+        self._handlers: dict[str, Handler] = {}
+        self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+        if username:
+            self._client.username_pw_set(username, password)
+        if will is not None:
+            self._client.will_set(will[0], will[1], qos=qos, retain=True)
+
+    def connect(self, on_connect: Callable[[], None]) -> None:
+        def connected(client, userdata, flags, reason_code, properties) -> None:
+            if reason_code.is_failure:
+                return
+            # subscriptions do not survive a reconnect with a clean session
+            for topic in self._handlers:
+                client.subscribe(topic, qos=self.qos)
+            on_connect()
+
+        self._client.on_connect = connected
+        self._client.reconnect_delay_set(min_delay=1, max_delay=60)
+        self._client.connect_async(self.host, self.port)
+        self._client.loop_start()
+
+    def publish(self, topic: str, payload: str, retain: bool = False) -> None:
+        self._client.publish(topic, payload, qos=self.qos, retain=retain)
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        self._handlers[topic] = handler
+        self._client.message_callback_add(topic, lambda c, u, msg: handler(msg.topic, msg.payload))
+        if self._client.is_connected():
+            self._client.subscribe(topic, qos=self.qos)
+
+    def disconnect(self) -> None:
+        self._client.disconnect()
+        self._client.loop_stop()
+
+
+class MemoryBroker:
+    """In-process stand-in for an MQTT broker: retained messages and wildcard subscriptions.
+
+    Delivery is synchronous, which keeps tests deterministic.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.retained: dict[str, bytes] = {}
+        self.messages: list[tuple[str, bytes, bool]] = []
+        self._subscriptions: list[tuple[str, Handler]] = []
+
+    def publish(self, topic: str, payload: str | bytes, retain: bool = False) -> None:
+        if isinstance(payload, str):
+            payload = payload.encode()
+        with self._lock:
+            self.messages.append((topic, payload, retain))
+            if retain:
+                if payload:
+                    self.retained[topic] = payload
+                else:
+                    self.retained.pop(topic, None)
+            handlers = [h for pattern, h in self._subscriptions if topic_matches(pattern, topic)]
+        for handler in handlers:
+            handler(topic, payload)
+
+    def subscribe(self, pattern: str, handler: Handler) -> None:
+        with self._lock:
+            self._subscriptions.append((pattern, handler))
+            retained = [(t, p) for t, p in self.retained.items() if topic_matches(pattern, t)]
+        for topic, payload in retained:
+            handler(topic, payload)
+
+    def unsubscribe(self, handler: Handler) -> None:
+        with self._lock:
+            self._subscriptions = [(p, h) for p, h in self._subscriptions if h is not handler]
+
+    def client(self) -> "MemoryMqttClient":
+        return MemoryMqttClient(self)
+
+
+class MemoryMqttClient(MqttClientInterface):
+    def __init__(self, broker: MemoryBroker) -> None:
+        self.broker = broker
+        self._handlers: list[Handler] = []
+
+    def connect(self, on_connect: Callable[[], None]) -> None:
+        on_connect()
+
+    def publish(self, topic: str, payload: str, retain: bool = False) -> None:
+        self.broker.publish(topic, payload, retain)
+
+    def subscribe(self, topic: str, handler: Handler) -> None:
+        self._handlers.append(handler)
+        self.broker.subscribe(topic, handler)
+
+    def disconnect(self) -> None:
+        for handler in self._handlers:
+            self.broker.unsubscribe(handler)
+        self._handlers = []
+
+
+class MqttBridge:
+    """Mirrors bus events to MQTT and accepts commands from it.
+
+    Events are collected for ``batch_interval`` seconds and only the newest
+    one per topic is sent, retained, under ``<prefix>/<topic>`` (e.g.
+    ``irrigation/readings/soil``, ``irrigation/valve``), so a new subscriber
+    immediately gets the last value. ``<prefix>/status`` is ``online`` while
+    connected (the broker's last will sets ``offline``).
+
+    Commands on ``<prefix>/cmd/valve`` (``open``, ``close`` or
+    ``{"action": "open", "seconds": 60}``) go through the same
+    ``ValveCommandGate`` as the HTTP API; ``<prefix>/cmd/mode`` takes ``auto``
+    or ``manual``. The outcome is published to ``<topic>/result``.
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        client: MqttClientInterface,
+        state_repo,
+        valve_gate=None,
+        scheduler=None,
+        prefix: str = "irrigation",
+        batch_interval: float = 1.0,
+    ) -> None:
+        self.bus = bus
+        self.client = client
+        self.state_repo = state_repo
+        self.valve_gate = valve_gate
+        self.scheduler = scheduler
+        self.prefix = prefix
+        self.batch_interval = batch_interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Subscribe to the bus and connect; call from the event loop that should run the bridge."""
+        subscription = self.bus.subscribe()
+        self.client.subscribe(f"{self.prefix}/cmd/valve", self._on_valve_command)
+        self.client.subscribe(f"{self.prefix}/cmd/mode", self._on_mode_command)
+        self.client.connect(self._on_connect)
+        self._task = asyncio.get_running_loop().create_task(self._run(subscription))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.client.publish(f"{self.prefix}/status", "offline", retain=True)
+        self.client.disconnect()
+
+    def _send(self, event: Event) -> None:
+        self.client.publish(f"{self.prefix}/{event.topic}", event.model_dump_json(), retain=True)
+
+    def _on_connect(self) -> None:
+        self.client.publish(f"{self.prefix}/status", "online", retain=True)
+        snap = self.state_repo.snapshot()
+        self._send(ValveChanged(is_open=snap["valve_open"]))
+        self._send(ConfigChanged(section="mode", values={"mode": snap["mode"]}))
+        for kind in ("air", "soil"):
+            if snap[kind] is not None:
+                self._send(ReadingEvent.of(snap[kind]))
+
+    async def _run(self, subscription) -> None:
+        loop = asyncio.get_running_loop()
+        with subscription:
+            while True:
+                event = await subscription.get()
+                batch = {event.topic: event}
+                deadline = loop.time() + self.batch_interval
+                while (remaining := deadline - loop.time()) > 0:
+                    try:
+                        event = await asyncio.wait_for(subscription.get(), remaining)
+                    except TimeoutError:
+                        break
+                    batch[event.topic] = event
+                for event in batch.values():
+                    self._send(event)
+
+    def _result(self, topic: str, **result) -> None:
+        self.client.publish(f"{topic}/result", json.dumps(result))
+
+    def _on_valve_command(self, topic: str, payload: bytes) -> None:
+        try:
+            cmd = json.loads(payload)
+        except ValueError:
+            cmd = payload.decode(errors="replace").strip()
+        if isinstance(cmd, str):
+            cmd = {"action": cmd}
+        action = cmd.get("action") if isinstance(cmd, dict) else None
+        if action not in ("open", "close") or self.valve_gate is None:
+            self._result(topic, ok=False, error="Unknown action")
+            return
+        try:
+            cmd = ValveCommand.model_validate(cmd)
+        except ValidationError:
+            self._result(topic, ok=False, error="seconds must be a positive integer")
+            return
+        result = self.valve_gate.submit("mqtt", cmd.action, cmd.seconds)
+        if result.status == "accepted" and self.scheduler is not None:
+            self.scheduler.wake()
+        self._result(topic, ok=result.status != "rate_limited", **vars(result))
+
+    def _on_mode_command(self, topic: str, payload: bytes) -> None:
+        mode = payload.decode(errors="replace").strip()
+        if mode.startswith("{"):
+            try:
+                mode = json.loads(mode).get("mode")
+            except (ValueError, AttributeError):
+                mode = None
+        if mode not in ("auto", "manual"):
+            self._result(topic, ok=False, error="Unknown mode")
+            return
+        self.state_repo.set_mode(mode)
+        if self.scheduler is not None:
+            self.scheduler.wake()
+        self._result(topic, ok=True, mode=mode)
@@ -1,49 +1,143 @@
 
+import time
 from datetime import datetime
 from threading import RLock
 from src.app.models import AirReading, SoilReading
+from src.app.services.events import ConfigChanged, EventBus, ReadingEvent, ValveChanged
+from src.app.services.state_store import StateStore
 
 
 class StateRepository:
-    def __init__(self) -> None:
+    def __init__(self, store: StateStore | None = None, events: EventBus | None = None) -> None:
         self._lock = RLock()
+        self._store = store
+        self.events = events
         self._last_air: AirReading | None = None
         self._last_soil: SoilReading | None = None
         self._valve_open: bool = False
         self._mode: str = "auto"
         self._controller_state: str = "idle"
+        self._state_until: datetime | None = None
         self._daily_watered_seconds: int = 0
+        self._daily_watered_litres: float = 0.0
+        self._litres_unsaved = False
+        self._flow_lpm: float | None = None
+        self._leak_detected: bool = False
         self._last_reset_date: datetime | None = None
+        # bumped on every change; seeded from the system-wide monotonic clock so
+        # versions keep increasing across restarts of the leader process
+        self._version = time.monotonic_ns()
+        # bumped when thresholds, schedules or recorded history change, so API
+        # workers know when read models built from the database are stale
+        self._data_version = time.monotonic_ns()
+        if store is not None:
+            self._restore(store.load())
+
+    def _restore(self, record: dict | None) -> None:
+        if not record:
+            return
+        self._mode = record.get("mode", self._mode)
+        self._controller_state = record.get("controller_state", self._controller_state)
+        self._state_until = record.get("state_until")
+        self._daily_watered_seconds = record.get("daily_watered_seconds", 0)
+        self._daily_watered_litres = record.get("daily_watered_litres", 0.0)
+        self._last_reset_date = record.get("last_reset_date")
+
+    @property
+    def publishing(self) -> bool:
+        # events are only built when someone listens
+        return self.events is not None and self.events.active
+
+    def _persist(self) -> None:
+        """Write the durable part of the state; called on transitions only."""
+        if self._store is None:
+            return
+        self._store.save(dict(
+            mode=self._mode,
+            controller_state=self._controller_state,
+            state_until=self._state_until,
+            daily_watered_seconds=self._daily_watered_seconds,
+            daily_watered_litres=self._daily_watered_litres,
+            last_reset_date=self._last_reset_date,
+        ))
+        self._litres_unsaved = False
 
     def set_air(self, air: AirReading | None) -> None:
         with self._lock:
-            self._last_air = air
+            if air != self._last_air:
+                self._last_air = air
+                self._version += 1
+                if air is not None and self.publishing:
+                    self.events.publish(ReadingEvent.of(air))
 
     def set_soil(self, soil: SoilReading | None) -> None:
         with self._lock:
-            self._last_soil = soil
+            if soil != self._last_soil:
+                self._last_soil = soil
+                self._version += 1
+                if soil is not None and self.publishing:
+                    self.events.publish(ReadingEvent.of(soil))
 
     def set_valve_open(self, is_open: bool) -> None:
         with self._lock:
-            self._valve_open = is_open
+            if is_open != self._valve_open:
+                self._valve_open = is_open
+                self._version += 1
+                if not is_open and self._litres_unsaved:
+                    self._persist()
+                if self.publishing:
+                    self.events.publish(ValveChanged(is_open=is_open))
 
     def set_mode(self, mode: str) -> None:
         with self._lock:
-            self._mode = mode
+            if mode != self._mode:
+                self._mode = mode
+                self._version += 1
+                self._persist()
+                if self.publishing:
+                    self.events.publish(ConfigChanged(section="mode", values={"mode": mode}))
 
-    def set_controller_state(self, state: str) -> None:
+    def set_controller_state(self, state: str, until: datetime | None = None) -> None:
         with self._lock:
-            self._controller_state = state
+            if state != self._controller_state or until != self._state_until:
+                self._controller_state = state
+                self._state_until = until
+                self._version += 1
+                self._persist()
 
     def add_watered_seconds(self, seconds: int) -> None:
         with self._lock:
             self._daily_watered_seconds += seconds
+            self._version += 1
+            self._persist()
+
+    def add_watered_litres(self, litres: float) -> None:
+        # called every tick while water flows: kept in memory until the next
+        # transition (or the valve closing) writes it
+        with self._lock:
+            self._daily_watered_litres += litres
+            self._litres_unsaved = True
+            self._version += 1
+
+    def set_flow(self, flow_lpm: float | None, leak_detected: bool) -> None:
+        with self._lock:
+            if flow_lpm != self._flow_lpm or leak_detected != self._leak_detected:
+                self._flow_lpm = flow_lpm
+                self._leak_detected = leak_detected
+                self._version += 1
+
+    def touch_data(self) -> None:
+        with self._lock:
+            self._data_version += 1
 
     def reset_daily_if_needed(self, now: datetime) -> None:
         with self._lock:
             if self._last_reset_date is None or self._last_reset_date.date() != now.date():
                 self._last_reset_date = now
                 self._daily_watered_seconds = 0
+                self._daily_watered_litres = 0.0
+                self._version += 1
+                self._persist()
 
     def snapshot(self) -> dict:
         with self._lock:
@@ -53,5 +147,11 @@ class StateRepository:
                 valve_open=self._valve_open,
                 mode=self._mode,
                 controller_state=self._controller_state,
+                state_until=self._state_until,
                 daily_watered_seconds=self._daily_watered_seconds,
+                daily_watered_litres=self._daily_watered_litres,
+                flow_lpm=self._flow_lpm,
+                leak_detected=self._leak_detected,
+                version=self._version,
+                data_version=self._data_version,
             )
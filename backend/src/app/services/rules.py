@@ -0,0 +1,181 @@
+
+import operator
+from datetime import datetime
+from typing import Callable
+
+
+# Facts a rule can test, in the order of the tuple built once per tick.
+FIELDS = (
+    "soil.moisture_rel",
+    "soil.temperature_c",
+    "air.temperature_c",
+    "air.humidity_rel",
+    "flow_lpm",
+    "time",                     # minutes since midnight; values may be "HH:MM"
+    "weekday",                  # 0 = Monday; values may be "mon" ... "sun"
+    "watered_minutes_today",
+    "watered_litres_today",     # None without a flow meter
+    "minutes_since_watering",   # since the last cycle started; None if none yet
+)
+ACTIONS = ("skip", "water")
+
+_INDEX = {name: i for i, name in enumerate(FIELDS)}
+_WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_COMPARE = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+_OPS = (*_COMPARE, "between", "in", "not_in")
+
+Facts = tuple
+Test = Callable[[Facts], bool]
+
+
+def facts(
+    now: datetime,
+    soil,
+    air,
+    flow_lpm: float | None,
+    watered_seconds: float,
+    watered_litres: float | None,
+    last_cycle_at: datetime | None,
+) -> Facts:
+    """The values rules are evaluated against, in ``FIELDS`` order."""
+    since = (now - last_cycle_at).total_seconds() / 60 if last_cycle_at is not None else None
+    return (
+        soil.moisture_rel if soil is not None else None,
+        soil.temperature_c if soil is not None else None,
+        air.temperature_c if air is not None else None,
+        air.humidity_rel if air is not None else None,
+        flow_lpm,
+        now.hour * 60 + now.minute,
+        now.weekday(),
+        watered_seconds / 60,
+        watered_litres,
+        since,
+    )
+
+
+def _value(field: str, value):
+    if field == "time" and isinstance(value, str):
+        hours, _, minutes = value.partition(":")
+        try:
+            value = int(hours) * 60 + int(minutes or 0)
+        except ValueError:
+            raise ValueError(f"time must be HH:MM, got {value!r}") from None
+        if not 0 <= value < 24 * 60:
+            raise ValueError(f"time must be HH:MM, got {value!r}")
+        return value
+    if field == "weekday" and isinstance(value, str):
+        if value.lower()[:3] not in _WEEKDAYS:
+            raise ValueError(f"unknown weekday {value!r}")
+        return _WEEKDAYS.index(value.lower()[:3])
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field} needs a number, got {value!r}")
+    return value
+
+
+def compile_condition(spec: dict) -> Test:
+    """One ``{"field", "op", "value"}`` condition as a closure over the facts tuple.
+
+    A condition on a missing reading (sensor down, no flow meter, no
+    cycle yet) never matches.
+    """
+    field, op, value = spec.get("field"), spec.get("op"), spec.get("value")
+    if field not in _INDEX:
+        raise ValueError(f"unknown field {field!r} (one of {', '.join(FIELDS)})")
+    if op not in _OPS:
+        raise ValueError(f"unknown op {op!r} (one of {', '.join(_OPS)})")
+    i = _INDEX[field]
+
+    if op in _COMPARE:
+        compare, value = _COMPARE[op], _value(field, value)
+
+        def test(facts: Facts) -> bool:
+            x = facts[i]
+            return x is not None and compare(x, value)
+        return test
+
+    if op == "between":
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            raise ValueError("between needs [start, end]")
+        low, high = _value(field, value[0]), _value(field, value[1])
+        if low <= high:
+            def test(facts: Facts) -> bool:
+                x = facts[i]
+                return x is not None and low <= x < high
+        elif field in ("time", "weekday"):
+            # wraps around midnight (or the end of the week)
+            def test(facts: Facts) -> bool:
+                x = facts[i]
+                return x is not None and (x >= low or x < high)
+        else:
+            raise ValueError("between needs start <= end")
+        return test
+
+    if not isinstance(value, (list, tuple)) or not value:
+        raise ValueError(f"{op} needs a non-empty list")
+    members = frozenset(_value(field, v) for v in value)
+    if op == "in":
+        def test(facts: Facts) -> bool:
+            return facts[i] in members
+    else:
+        def test(facts: Facts) -> bool:
+            x = facts[i]
+            return x is not None and x not in members
+    return test
+
+
+def compile_rule(spec: dict) -> Test:
+    """All conditions of a rule ANDed into one closure; no conditions always match."""
+    if spec.get("action") not in ACTIONS:
+        raise ValueError(f"action must be one of {', '.join(ACTIONS)}")
+    conditions = spec.get("conditions") or []
+    if not isinstance(conditions, list):
+        raise ValueError("conditions must be a list")
+    tests = tuple(compile_condition(c) for c in conditions)
+    if not tests:
+        return lambda facts: True
+    if len(tests) == 1:
+        return tests[0]
+
+    def test(facts: Facts) -> bool:
+        for t in tests:
+            if not t(facts):
+                return False
+        return True
+    return test
+
+
+class RuleSet:
+    """Enabled rules compiled once, evaluated on every tick.
+
+    ``skip`` rules keep the controller from starting a cycle, ``water``
+    rules start one like a due schedule (outside the window too, so give
+    them a time condition); the budget and too-wet checks of ``decide``
+    still apply. The first matching rule by priority wins, and a matching
+    skip rule beats any water rule.
+    """
+
+    def __init__(self, specs: list[dict] = ()) -> None:
+        ordered = sorted(specs, key=lambda s: -s.get("priority", 0))
+        self._skip = [(s["name"], compile_rule(s)) for s in ordered if s["action"] == "skip"]
+        self._water = [(s["name"], compile_rule(s)) for s in ordered if s["action"] == "water"]
+        self.count = len(self._skip) + len(self._water)
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+    def evaluate(self, facts: Facts) -> tuple[str | None, str | None]:
+        """(reason a skip rule blocks watering, reason a water rule requests it)."""
+        for name, test in self._skip:
+            if test(facts):
+                return f"skipped by rule {name!r}", None
+        for name, test in self._water:
+            if test(facts):
+                return None, f"rule {name!r}"
+        return None, None
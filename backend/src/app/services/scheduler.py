@@ -0,0 +1,60 @@
+
+import asyncio
+import threading
+from datetime import datetime
+from src.app.services.controller import WateringController
+
+
+class ControllerScheduler:
+    """Runs controller ticks on a background thread, sleeping until the next event.
+
+    The controller reports when it next has something to do (see
+    ``WateringController.next_wakeup``); API changes call ``wake`` to run a
+    tick immediately instead of waiting for the current sleep to expire.
+    """
+
+    def __init__(self, controller: WateringController, min_sleep_sec: float = 0.2) -> None:
+        self.controller = controller
+        self.min_sleep_sec = min_sleep_sec
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.next_wakeup: datetime | None = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="controller", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self) -> None:
+        """Run a tick as soon as possible, reloading cached thresholds and schedules."""
+        self.controller.invalidate_cache()
+        self._wake.set()
+
+    def sleep_seconds(self, now: datetime) -> float:
+        self.next_wakeup = self.controller.next_wakeup(now)
+        return max((self.next_wakeup - now).total_seconds(), self.min_sleep_sec)
+
+    def _run(self) -> None:
+        # the controller's async DB path needs a loop owned by this thread
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            while not self._stop.is_set():
+                self._wake.clear()
+                try:
+                    self.controller.tick()
+                except Exception:
+                    pass
+                self._wake.wait(self.sleep_seconds(datetime.utcnow()))
+        finally:
+            loop.close()
@@ -0,0 +1,39 @@
+
+import json
+import os
+from datetime import datetime
+
+
+class StateStore:
+    """Small controller state record persisted in a JSON file.
+
+    Every save writes a temporary file, fsyncs it and atomically replaces the
+    previous record, so a crash leaves either the old or the new state on
+    disk and a restart restores it with a single read.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def load(self) -> dict | None:
+        try:
+            with open(self.path, "rb") as f:
+                record = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        for key in ("state_until", "last_reset_date"):
+            if record.get(key):
+                record[key] = datetime.fromisoformat(record[key])
+        return record
+
+    def save(self, record: dict) -> None:
+        data = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in record.items()
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(data).encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
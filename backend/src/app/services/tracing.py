@@ -0,0 +1,321 @@
+
+import argparse
+import functools
+import glob
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from starlette.datastructures import Headers, MutableHeaders
+
+TRACE_HEADER = "X-Trace-Id"
+
+# id of the sampled trace the current code runs in; None when not traced
+_trace_id: ContextVar[str | None] = ContextVar("trace_id", default=None)
+
+
+def current_trace_id() -> str | None:
+    return _trace_id.get()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+# returned for everything that is not sampled, so untraced code allocates nothing
+NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "cat", "trace_id", "root", "args", "_ts", "_start", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, trace_id: str, root: bool) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.trace_id = trace_id
+        self.root = root
+        self.args: dict = {}
+
+    def set(self, **args) -> None:
+        self.args.update(args)
+
+    def __enter__(self) -> "Span":
+        if self.root:
+            self._token = _trace_id.set(self.trace_id)
+        self._ts = time.time_ns() // 1000
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = (time.perf_counter_ns() - self._start) // 1000
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.emit(self, self._ts, duration)
+        if self.root:
+            _trace_id.reset(self._token)
+            self.tracer.flush()
+        return False
+
+
+class TraceFile:
+    """Chrome trace-event file (JSON array format), rotated like ``DecisionLog``.
+
+    The closing ``]`` is optional in this format, so events are appended as
+    they finish and a file cut short by a crash still loads in Perfetto or
+    ``chrome://tracing``.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 5_000_000, backups: int = 2) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._named_threads: set[int] = set()
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "ab", buffering=64 * 1024)
+        self._size = self._file.tell()
+        self._named_threads = set()
+        if self._size == 0:
+            self._append(b"[\n")
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.unlink(self.path)
+        self._open()
+
+    def _append(self, data: bytes) -> None:
+        self._file.write(data)
+        self._size += len(data)
+
+    def write(self, event: dict) -> None:
+        pid, tid = event["pid"], event["tid"]
+        with self._lock:
+            if self._file is None:
+                self._open()
+            if tid not in self._named_threads:
+                self._named_threads.add(tid)
+                name = {"name": threading.current_thread().name}
+                meta = {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": name}
+                self._append(json.dumps(meta).encode() + b",\n")
+            self._append(json.dumps(event, separators=(",", ":")).encode() + b",\n")
+            if self._size >= self.max_bytes:
+                self._rotate()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Tracer:
+    """Head-sampled span tracer.
+
+    ``start_trace`` decides once per tick or request whether it is traced;
+    spans below it only check a context variable, and when the trace is not
+    sampled every call returns the shared ``NOOP`` span.
+    """
+
+    def __init__(self) -> None:
+        self.sample_rate = 0.0
+        self._file: TraceFile | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def configure(
+        self,
+        path: str | None,
+        sample_rate: float = 0.0,
+        max_bytes: int = 5_000_000,
+        backups: int = 2,
+    ) -> None:
+        """Write spans to ``path``; ``None`` turns tracing off."""
+        if self._file is not None:
+            self._file.close()
+        self.sample_rate = sample_rate
+        self._file = TraceFile(path, max_bytes, backups) if path else None
+
+    def start_trace(self, name: str, cat: str, trace_id: str | None = None):
+        """Root span; a given ``trace_id`` (from a header or the IPC caller) is always sampled."""
+        if self._file is None:
+            return NOOP
+        if trace_id is None:
+            if random.random() >= self.sample_rate:
+                return NOOP
+            trace_id = os.urandom(8).hex()
+        return Span(self, name, cat, trace_id, root=True)
+
+    def span(self, name: str, cat: str):
+        trace_id = _trace_id.get()
+        if trace_id is None or self._file is None:
+            return NOOP
+        return Span(self, name, cat, trace_id, root=False)
+
+    def emit(self, span: Span, ts: int, duration: int) -> None:
+        trace_file = self._file
+        if trace_file is None:
+            return
+        span.args["trace_id"] = span.trace_id
+        trace_file.write({
+            "name": span.name,
+            "cat": span.cat,
+            "ph": "X",
+            "ts": ts,
+            "dur": duration,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": span.args,
+        })
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+
+tracer = Tracer()
+
+
+def _wrap(fn, name: str, cat: str):
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if _trace_id.get() is None:
+                return await fn(*args, **kwargs)
+            with tracer.span(name, cat):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _trace_id.get() is None:
+            return fn(*args, **kwargs)
+        with tracer.span(name, cat):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def traced(cat: str):
+    """Class decorator: run every public method in a ``Class.method`` span.
+
+    Properties and async generators (streaming queries) are left alone.
+    """
+    def decorate(cls):
+        for attr, fn in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.isfunction(fn) or inspect.isasyncgenfunction(fn):
+                continue
+            setattr(cls, attr, _wrap(fn, f"{cls.__name__}.{attr}", cat))
+        return cls
+    return decorate
+
+
+class TracingMiddleware:
+    """Start a trace per HTTP request (sampled, or forced by an ``X-Trace-Id`` header).
+
+    The trace id is echoed in the response header and travels with any valve
+    or controller command the request sends to the leader.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        trace_id = Headers(scope=scope).get(TRACE_HEADER)
+        span = tracer.start_trace(f"{scope['method']} {scope['path']}", "http", trace_id)
+        if span is NOOP:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_trace(message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[TRACE_HEADER] = span.trace_id
+                span.set(status=message["status"])
+            await send(message)
+
+        with span:
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{scope['method']} {route.path}"
+
+
+def _rotation_order(name: str) -> tuple:
+    # oldest part first: trace.json.2, trace.json.1, trace.json
+    base, _, suffix = name.partition(".json")
+    return base, -int(suffix[1:] or 0)
+
+
+def merge(paths: list[str], out: str) -> int:
+    """Combine per-process trace files (and their rotated parts) into one loadable file."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "trace-*.json*")), key=_rotation_order)
+        else:
+            files.append(path)
+    count = 0
+    with open(out, "w") as f:
+        f.write("[\n")
+        first = True
+        for name in files:
+            with open(name, "rb") as src:
+                for line in src:
+                    line = line.strip().rstrip(b",")
+                    if not line or line in (b"[", b"]"):
+                        continue
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    f.write(("" if first else ",\n") + line.decode())
+                    first = False
+                    count += 1
+        f.write("\n]\n")
+    return count
+
+
+def main():
+    p = argparse.ArgumentParser(description="Merge trace files for Perfetto / chrome://tracing")
+    p.add_argument("paths", nargs="+", help="trace files or directories")
+    p.add_argument("-o", "--out", default="trace.json")
+    args = p.parse_args()
+    print(f"wrote {merge(args.paths, args.out)} events to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from src.app.hardware.valve import ValveInterface
+from src.app.services.repository import StateRepository
+from src.app.services.tracing import traced
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, at most ``burst`` stored."""
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0.0 on success, else seconds until one is available."""
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+@dataclass
+class GateResult:
+    status: str                 # "accepted" / "merged" / "rate_limited"
+    retry_after: float = 0.0
+
+
+@traced("control")
+class ValveCommandGate:
+    """Front door for manual valve commands.
+
+    Every command costs a token from the sender's bucket. A command repeating
+    the last applied action within ``window`` seconds is merged into it
+    (an ``open_for`` only extends the running timer). Opening a closed valve
+    also costs a token from the valve's bucket so the solenoid cannot be
+    cycled rapidly; closing is never limited.
+    """
+
+    def __init__(
+        self,
+        valve: ValveInterface,
+        state_repo: StateRepository,
+        window: float = 1.0,
+        client_rate: float = 2.0,
+        client_burst: float = 5,
+        open_rate: float = 0.1,
+        open_burst: float = 3,
+        max_clients: int = 256,
+        clock=time.monotonic,
+    ) -> None:
+        self.valve = valve
+        self.state_repo = state_repo
+        self.window = window
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._clients: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._opens = TokenBucket(open_rate, open_burst, clock())
+        self._last_action: str | None = None
+        self._last_at = float("-inf")
+        self._last_until: float | None = None
+
+    def _client_bucket(self, client: str, now: float) -> TokenBucket:
+        bucket = self._clients.get(client)
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst, now)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+        return bucket
+
+    def submit(self, client: str, action: str, seconds: int | None = None) -> GateResult:
+        with self._lock:
+            now = self.clock()
+            wait = self._client_bucket(client, now).take(now)
+            if wait:
+                return GateResult("rate_limited", wait)
+
+            until = now + seconds if seconds else None
+            recent = action == self._last_action and now - self._last_at < self.window
+            if action == "close":
+                if recent:
+                    return GateResult("merged")
+                self.valve.close()
+                self.state_repo.set_valve_open(False)
+            else:
+                if recent and self.valve.is_open and (
+                    self._last_until is None or (until is not None and until <= self._last_until)
+                ):
+                    return GateResult("merged")
+                if recent and self.valve.is_open and until is not None:
+                    # overlapping open_for: extend the running timer, nothing to switch
+                    self.valve.open_for(seconds)
+                    self._last_until = until
+                    return GateResult("merged")
+                if not self.valve.is_open:
+                    wait = self._opens.take(now)
+                    if wait:
+                        return GateResult("rate_limited", wait)
+                if seconds and hasattr(self.valve, "open_for"):
+                    self.valve.open_for(seconds)
+                else:
+                    self.valve.open()
+                self.state_repo.set_valve_open(True)
+
+            self._last_action = action
+            self._last_at = now
+            self._last_until = until
+            return GateResult("accepted")
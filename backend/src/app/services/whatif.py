@@ -0,0 +1,306 @@
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.app.database.models import WateringEvent, WateringSchedule
+from src.app.database.repository import RuleRepository, SensorReadingRepository
+from src.app.services.decision import DecisionParams, budget_used, decide
+from src.app.services.rules import RuleSet, facts
+
+
+_DAY = timedelta(days=1)
+
+
+@dataclass
+class Candidate:
+    """One parameter set to replay."""
+
+    params: DecisionParams
+    schedules: list[time] | None = None  # daily times; None replays the stored schedules
+
+
+@dataclass
+class History:
+    """Recorded inputs of a replay, loaded once and shared by every candidate."""
+
+    readings: list[tuple[datetime, float]]              # soil moisture, oldest first
+    events: list[tuple[datetime, int, float | None]] = field(default_factory=list)  # start, seconds, litres
+    schedules: dict[date, list[time]] = field(default_factory=dict)
+    rules: list[dict] = field(default_factory=list)     # enabled rule specs
+    air: list[tuple[datetime, float | None, float | None]] = field(default_factory=list)  # temperature, humidity
+    soil_temperatures: list[float | None] | None = None  # per reading, for rules on soil.temperature_c
+
+    def __post_init__(self) -> None:
+        self.rule_set = RuleSet(self.rules)
+        self.air_times = [ts for ts, _, _ in self.air]
+        self.event_starts = [start for start, _, _ in self.events]
+        # per reading: its hour and the cycles recorded earlier that day, shared by all candidates
+        self.times = [ts for ts, _ in self.readings]
+        self.hours = [ts.hour for ts in self.times]
+        self.recorded_today = []
+        first_of_day, day = 0, None
+        for ts in self.times:
+            if ts.date() != day:
+                day = ts.date()
+                first_of_day = bisect_left(self.event_starts, datetime.combine(day, time()))
+            self.recorded_today.append(bisect_left(self.event_starts, ts) - first_of_day)
+        measured = [(seconds, litres) for _, seconds, litres in self.events if litres is not None and seconds > 0]
+        minutes = sum(seconds for seconds, _ in measured) / 60
+        # flow measured during recorded cycles, to put litres on replayed ones
+        self.litres_per_minute = sum(litres for _, litres in measured) / minutes if minutes else None
+
+    def recorded(self) -> list[dict]:
+        """What actually ran, per day, in the shape of a replay result."""
+        days: dict[date, dict] = {}
+        for start, seconds, litres in self.events:
+            stats = days.setdefault(start.date(), _day(start.date(), self.litres_per_minute))
+            stats["cycles"] += 1
+            stats["watering_seconds"] += seconds
+            if stats["litres"] is not None:
+                stats["litres"] += litres if litres is not None else seconds / 60 * self.litres_per_minute
+        return _finish(days)
+
+
+class _Soil(NamedTuple):
+    moisture_rel: float
+    temperature_c: float | None
+
+
+class _Air(NamedTuple):
+    temperature_c: float | None
+    humidity_rel: float | None
+
+
+def _day(day: date, litres_per_minute: float | None) -> dict:
+    return dict(date=day, cycles=0, watering_seconds=0, budget_hits=0, litres=0.0 if litres_per_minute else None)
+
+
+def _finish(days: dict[date, dict]) -> list[dict]:
+    rows = []
+    for day in sorted(days):
+        stats = days[day]
+        rows.append(dict(
+            date=day,
+            watering_minutes=round(stats["watering_seconds"] / 60, 2),
+            cycles=stats["cycles"],
+            budget_hits=stats["budget_hits"],
+            litres=round(stats["litres"], 2) if stats["litres"] is not None else None,
+        ))
+    return rows
+
+
+class _Replay:
+    """Runs the controller's ``decide`` over recorded readings for one candidate.
+
+    Ticks happen at every recorded reading, plus where the controller would
+    have woken up in between: the end of a watering or soak phase and each
+    scheduled time. A reading already contains the effect of the cycles that
+    really started before it, so every cycle the candidate runs beyond them
+    (or skips) that day moves moisture by ``cycle_gain``. Enabled rules are
+    evaluated on every tick against the shifted moisture and the latest air
+    reading; there is no flow reading, so rules on ``flow_lpm`` never match.
+    The forecaster's planned cycles are not replayed.
+    """
+
+    def __init__(self, history: History, candidate: Candidate, cycle_gain: float) -> None:
+        self.history = history
+        self.candidate = candidate
+        self.params = candidate.params
+        self.cycle_gain = cycle_gain
+        self.state = "idle"
+        self.until: datetime | None = None
+        self.days: dict[date, dict] = {}
+        self.day: date | None = None
+        self.last_cycle_at: datetime | None = None
+
+    def _new_day(self, day: date) -> None:
+        history = self.history
+        self.day = day
+        self.stats = self.days.setdefault(day, _day(day, history.litres_per_minute))
+        self.watered_seconds = 0
+        self.watered_litres = 0.0 if history.litres_per_minute else None
+        self.cycles = 0
+        self.day_start = datetime.combine(day, time())
+        self.recorded_before = bisect_left(history.event_starts, self.day_start)
+        times = self.candidate.schedules if self.candidate.schedules is not None else history.schedules.get(day, ())
+        self.pending = sorted(datetime.combine(day, t.replace(second=0, microsecond=0)) for t in times)
+
+    def _tick(self, now: datetime, moisture: float, scheduled: bool) -> None:
+        p = self.params
+        recorded = bisect_left(self.history.event_starts, now) - self.recorded_before
+        effective = min(max(moisture + self.cycle_gain * (self.cycles - recorded), 0.0), 1.0)
+        budget = budget_used(self.watered_seconds, self.watered_litres, p.daily_budget_minutes, p.daily_budget_litres)
+        blocked = requested = None
+        if self.history.rule_set:
+            blocked, requested = self.history.rule_set.evaluate(self._facts(now, effective))
+        decision = decide(self.state, self.until, now, effective, p, budget, False, scheduled, blocked, requested)
+        if decision.start_cycle:
+            self.last_cycle_at = now
+            self.cycles += 1
+            self.watered_seconds += p.watering_seconds
+            self.stats["cycles"] += 1
+            self.stats["watering_seconds"] += p.watering_seconds
+            if self.watered_litres is not None:
+                litres = p.watering_seconds / 60 * self.history.litres_per_minute
+                self.watered_litres += litres
+                self.stats["litres"] += litres
+        if decision.state == "budget_exceeded" and self.state != "budget_exceeded":
+            self.stats["budget_hits"] += 1
+        self.state, self.until = decision.state, decision.until
+
+    def _facts(self, now: datetime, moisture: float):
+        history = self.history
+        soil_temperature = None
+        if history.soil_temperatures is not None:
+            soil_temperature = history.soil_temperatures[bisect_right(history.times, now) - 1]
+        air = None
+        i = bisect_right(history.air_times, now) - 1
+        if i >= 0:
+            air = _Air(*history.air[i][1:])
+        return facts(
+            now, _Soil(moisture, soil_temperature), air, None,
+            self.watered_seconds, self.watered_litres, self.last_cycle_at,
+        )
+
+    def _skip_idle(self, i: int) -> int:
+        """Index of the next reading at which an idle controller could start a cycle.
+
+        While idle with budget left, a tick only matters once moisture drops
+        below ``low`` inside the window, a schedule is due or the day ends
+        (budgets reset); ``decide`` would leave every reading before that as
+        it is, so those are not replayed. With rules any reading may match a
+        water rule, so nothing is skipped.
+        """
+        p, history = self.params, self.history
+        if history.rule_set or budget_used(self.watered_seconds, self.watered_litres, p.daily_budget_minutes, p.daily_budget_litres):
+            return i
+        times, hours, moisture, recorded = history.times, history.hours, history.readings, history.recorded_today
+        end = bisect_left(times, datetime.combine(self.day, time()) + _DAY, i)
+        if self.pending:
+            end = min(end, bisect_left(times, self.pending[0], i))
+        start_hour, end_hour, gain = p.window_start_hour, p.window_end_hour, self.cycle_gain
+        low = p.low - gain * self.cycles
+        for j in range(i, end):
+            if start_hour <= hours[j] < end_hour and moisture[j][1] - gain * recorded[j] < low:
+                return j
+        return end
+
+    def run(self) -> list[dict]:
+        readings = self.history.readings
+        previous: datetime | None = None
+        last_moisture: float | None = None
+        i = 0
+        while i < len(readings):
+            now, moisture = readings[i]
+            if now.date() != self.day:
+                self._new_day(now.date())
+            while last_moisture is not None:
+                wakeups = []
+                if self.state in ("watering", "soak") and self.until is not None and previous < self.until < now:
+                    wakeups.append((self.until, False))
+                while self.pending and self.pending[0] <= previous:
+                    self.pending.pop(0)  # before any data that day
+                if self.pending and self.pending[0] <= now:
+                    wakeups.append((self.pending[0], True))
+                if not wakeups:
+                    break
+                at, scheduled = min(wakeups)
+                if scheduled:
+                    self.pending.pop(0)
+                self._tick(at, last_moisture, scheduled)
+                previous = at
+            if self.state == "idle":
+                j = self._skip_idle(i)
+                if j > i:
+                    previous, last_moisture = readings[j - 1]
+                    i = j
+                    continue
+            self._tick(now, moisture, False)
+            previous, last_moisture = now, moisture
+            i += 1
+        return _finish(self.days)
+
+
+def replay(history: History, candidates: list[Candidate], cycle_gain: float = 0.03) -> list[dict]:
+    """Predicted watering per day for each candidate, against the same history."""
+    results = []
+    for candidate in candidates:
+        days = _Replay(history, candidate, cycle_gain).run()
+        results.append(dict(days=days, total=_total(days)))
+    return results
+
+
+def _total(days: list[dict]) -> dict:
+    litres = [d["litres"] for d in days if d["litres"] is not None]
+    return dict(
+        watering_minutes=round(sum(d["watering_minutes"] for d in days), 2),
+        cycles=sum(d["cycles"] for d in days),
+        budget_hits=sum(d["budget_hits"] for d in days),
+        litres=round(sum(litres), 2) if litres else None,
+    )
+
+
+async def load_history(session: AsyncSession, since: datetime, until: datetime | None = None) -> History:
+    """Soil readings, watering events, enabled schedules and rules between ``since`` and ``until``.
+
+    Soil temperatures and air readings are only loaded when there are rules
+    to evaluate them.
+    """
+    sensor_readings = SensorReadingRepository(session)
+    rules = await RuleRepository(session).specs()
+    soil_temperatures = None
+    air = []
+    if rules:
+        soil = [row for row in await sensor_readings.series(since, until, "soil") if row[3] is not None]
+        readings = [(ts, moisture) for ts, _, _, moisture in soil]
+        soil_temperatures = [temperature for _, temperature, _, _ in soil]
+        air = [(ts, temperature, humidity) for ts, temperature, humidity, _ in
+               await sensor_readings.series(since, until, "air")]
+    else:
+        readings = await sensor_readings.moisture_series(since, until)
+    stmt = (
+        select(WateringEvent.started_at, WateringEvent.duration_seconds, WateringEvent.litres)
+        .where(WateringEvent.started_at >= since)
+        .order_by(WateringEvent.started_at)
+    )
+    if until is not None:
+        stmt = stmt.where(WateringEvent.started_at < until)
+    events = [tuple(row) for row in (await session.execute(stmt)).all()]
+    result = await session.execute(
+        select(WateringSchedule.schedule_date, WateringSchedule.schedule_time).where(
+            WateringSchedule.enabled == True,
+            WateringSchedule.schedule_date >= since.date(),
+        )
+    )
+    schedules: dict[date, list[time]] = {}
+    for day, at in result.all():
+        schedules.setdefault(day, []).append(at)
+    return History(
+        readings=readings,
+        events=events,
+        schedules=schedules,
+        rules=rules,
+        air=air,
+        soil_temperatures=soil_temperatures,
+    )
+
+
+def summary(history: History, candidates: list[Candidate], cycle_gain: float = 0.03) -> dict:
+    """Replay result for the API and CLI: every candidate next to what really ran."""
+    recorded = history.recorded()
+    return dict(
+        since=history.readings[0][0] if history.readings else None,
+        until=history.readings[-1][0] if history.readings else None,
+        readings=len(history.readings),
+        rules=len(history.rules),
+        cycle_gain=cycle_gain,
+        recorded=dict(days=recorded, total=_total(recorded)),
+        candidates=[
+            dict(params=vars(c.params), schedules=c.schedules, **result)
+            for c, result in zip(candidates, replay(history, candidates, cycle_gain))
+        ],
+    )
+
@@ -1,14 +1,10 @@
 
 import argparse
-import requests
+import os
+from src.client.sdk import DEFAULT_URL, IrrigationClient
 
-BASE_URL = "http://localhost:8000"  # change to your Pi's address if needed
 
-
-def cmd_status(args):
-    r = requests.get(f"{BASE_URL}/status/metrics", timeout=3)
-    r.raise_for_status()
-    data = r.json()
+def print_status(data: dict) -> None:
     print("=== STATUS ===")
     print("Mode:", data["mode"])
     print("State:", data["state"])
@@ -27,32 +23,173 @@ def cmd_status(args):
         )
 
 
-def cmd_valve(args):
-    payload = {"action": args.action}
-    if args.seconds:
-        payload["seconds"] = args.seconds
-    r = requests.post(f"{BASE_URL}/control/valve", json=payload, timeout=3)
-    r.raise_for_status()
-    print("OK:", r.json())
+def cmd_status(client: IrrigationClient, args):
+    print_status(client.status())
+
+
+def cmd_watch(client: IrrigationClient, args):
+    try:
+        for data in client.watch(interval=args.interval):
+            print_status(data)
+    except KeyboardInterrupt:
+        pass
 
 
-def cmd_mode(args):
-    r = requests.post(
-        f"{BASE_URL}/control/mode",
-        json={"mode": args.mode},
-        timeout=3,
+def cmd_fleet(client: IrrigationClient, args):
+    view = client.request("GET", "/fleet")
+    summary = view["summary"]
+    print(
+        f"{summary['online']}/{summary['nodes']} online, {summary['watering']} watering, "
+        f"{summary['daily_watered_litres']:.1f} L today"
     )
-    r.raise_for_status()
-    print("OK:", r.json())
+    for node in view["nodes"]:
+        metrics = node["metrics"] or {}
+        soil = metrics.get("soil")
+        moisture = f"{soil['moisture_rel']*100:.1f} %" if soil else "-"
+        status = f"{node['latency_ms']:.0f} ms" if node["online"] else f"offline ({node['error']})"
+        print(f"{node['name']:<12} {metrics.get('state', '-'):<16} {moisture:>7}  {status}")
+
+
+def cmd_decisions(client: IrrigationClient, args):
+    records = client.decisions(
+        since=args.since,
+        until=args.until,
+        state=args.state,
+        reason=args.reason,
+        limit=args.limit,
+    )
+    for rec in reversed(records):
+        moisture = f"{rec['moisture']*100:.1f} %" if rec["moisture"] is not None else "-"
+        print(f"{rec['ts']}  {rec['from_state']:>15} -> {rec['to_state']:<15} {moisture:>7}  {rec['reason']}")
+
+
+def cmd_valve(client: IrrigationClient, args):
+    print("OK:", client.valve(args.action, args.seconds))
+
+
+def cmd_mode(client: IrrigationClient, args):
+    print("OK:", client.set_mode(args.mode))
+
+
+def cmd_export(client: IrrigationClient, args):
+    path = args.out or f"{args.table}.arrows"
+    size = client.export(path, table=args.table, since=args.since, until=args.until)
+    print(f"wrote {size} bytes to {path}")
+
+
+def _candidate(spec: str) -> dict:
+    """``soil_moisture_low=0.3,watering_seconds=60,schedules=06:00/18:00``"""
+    fields = {}
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        key = key.strip().replace("-", "_")
+        if key == "schedules":
+            fields[key] = [t for t in value.split("/") if t]
+        elif key.endswith("_seconds") or key.endswith("_minutes") or key.endswith("_hour"):
+            fields[key] = int(value)
+        else:
+            fields[key] = float(value)
+    return fields
+
+
+def cmd_whatif(client: IrrigationClient, args):
+    candidates = [_candidate(spec) for spec in args.candidate] or [{}]
+    result = client.whatif(candidates, days=args.days, cycle_gain=args.cycle_gain)
+    print(f"{result['readings']} readings from {result['since']} to {result['until']}")
+    rows = [("recorded", result["recorded"]["total"])]
+    rows += [(spec, c["total"]) for spec, c in zip(args.candidate or ["current"], result["candidates"])]
+    print(f"{'candidate':<44} {'minutes':>8} {'cycles':>7} {'budget':>7} {'litres':>8}")
+    for name, total in rows:
+        litres = f"{total['litres']:.1f}" if total["litres"] is not None else "-"
+        print(
+            f"{name:<44} {total['watering_minutes']:>8.1f} {total['cycles']:>7}"
+            f" {total['budget_hits']:>7} {litres:>8}"
+        )
+
+
+def cmd_profile(client: IrrigationClient, args):
+    path = args.out or "profile.folded"
+    stacks = client.profile(args.seconds, interval_ms=args.interval_ms, idle=args.idle)
+    with open(path, "w") as f:
+        f.write(stacks)
+    print(f"wrote {stacks.count(chr(10))} stacks to {path} (flamegraph.pl {path} > profile.svg)")
+
+
+def cmd_memory(client: IrrigationClient, args):
+    if args.action == "start":
+        client.memory_start(frames=args.frames)
+        print("tracing started")
+    elif args.action == "stop":
+        client.memory_stop()
+        print("tracing stopped")
+    else:
+        diff = client.memory_diff(top=args.top)
+        print(f"traced: {diff['traced_bytes'] / 1024:.1f} KiB, peak: {diff['peak_bytes'] / 1024:.1f} KiB")
+        for stat in diff["stats"]:
+            where = stat["traceback"][-1] if stat["traceback"] else "?"
+            print(f"{stat['size_diff'] / 1024:+10.1f} KiB {stat['count_diff']:+8d} blocks  {where}")
 
 
 def main():
     p = argparse.ArgumentParser()
+    p.add_argument(
+        "--url",
+        default=os.environ.get("IRRIGATION_URL", DEFAULT_URL),
+        help="node address (default: $IRRIGATION_URL or %(default)s)",
+    )
+    p.add_argument("--timeout", type=float, default=3.0)
+    p.add_argument("--retries", type=int, default=3)
     sub = p.add_subparsers(dest="cmd", required=True)
 
     p_status = sub.add_parser("status", help="show current metrics")
     p_status.set_defaults(func=cmd_status)
 
+    p_watch = sub.add_parser("watch", help="follow the streaming status feed")
+    p_watch.add_argument("--interval", type=float, default=1.0)
+    p_watch.set_defaults(func=cmd_watch)
+
+    p_fleet = sub.add_parser("fleet", help="all nodes behind a hub (--url points at the hub)")
+    p_fleet.set_defaults(func=cmd_fleet)
+
+    p_decisions = sub.add_parser("decisions", help="show controller decisions")
+    p_decisions.add_argument("--since", help="ISO timestamp")
+    p_decisions.add_argument("--until", help="ISO timestamp")
+    p_decisions.add_argument("--state", help="only transitions from/to this state")
+    p_decisions.add_argument("--reason", help="substring of the reason")
+    p_decisions.add_argument("--limit", type=int, default=50)
+    p_decisions.set_defaults(func=cmd_decisions)
+
+    p_export = sub.add_parser("export", help="download history as an Arrow IPC stream")
+    p_export.add_argument("table", choices=["readings", "events"])
+    p_export.add_argument("--since", help="ISO timestamp")
+    p_export.add_argument("--until", help="ISO timestamp")
+    p_export.add_argument("--out", help="output file (default: <table>.arrows)")
+    p_export.set_defaults(func=cmd_export)
+
+    p_whatif = sub.add_parser("whatif", help="replay candidate thresholds against recorded history")
+    p_whatif.add_argument(
+        "--candidate",
+        action="append",
+        default=[],
+        help="comma-separated field=value overrides, e.g. soil_moisture_low=0.3,schedules=06:00/18:00 (repeatable)",
+    )
+    p_whatif.add_argument("--days", type=int, default=7)
+    p_whatif.add_argument("--cycle-gain", type=float, default=0.03, help="moisture added by one cycle")
+    p_whatif.set_defaults(func=cmd_whatif)
+
+    p_profile = sub.add_parser("profile", help="sample the controller process into a flame graph file")
+    p_profile.add_argument("--seconds", type=float, default=10.0)
+    p_profile.add_argument("--interval-ms", type=float, default=5.0)
+    p_profile.add_argument("--idle", action="store_true", help="include threads waiting for work")
+    p_profile.add_argument("--out", help="output file (default: profile.folded)")
+    p_profile.set_defaults(func=cmd_profile)
+
+    p_memory = sub.add_parser("memory", help="tracemalloc snapshot diffs")
+    p_memory.add_argument("action", choices=["start", "diff", "stop"])
+    p_memory.add_argument("--frames", type=int, default=10)
+    p_memory.add_argument("--top", type=int, default=25)
+    p_memory.set_defaults(func=cmd_memory)
+
     p_valve = sub.add_parser("valve", help="open/close valve")
     p_valve.add_argument("action", choices=["open", "close"])
     p_valve.add_argument("--seconds", type=int, default=None)
@@ -63,7 +200,8 @@ def main():
     p_mode.set_defaults(func=cmd_mode)
 
     args = p.parse_args()
-    args.func(args)
+    with IrrigationClient(args.url, timeout=args.timeout, retries=args.retries) as client:
+        args.func(client, args)
 
 
 if __name__ == "__main__":
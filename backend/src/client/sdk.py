@@ -0,0 +1,377 @@
+
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator, Iterator
+import httpx
+
+DEFAULT_URL = "http://localhost:8000"
+RETRY_STATUS = {502, 503, 504}
+# DELETE is left out: resent after the first one went through, it answers 404
+RETRIED_METHODS = {"GET", "HEAD", "OPTIONS", "PUT"}
+
+
+class _Attempts:
+    """Retry policy shared by the blocking and asyncio clients.
+
+    Iterating yields the backoff delay to wait after each failed attempt.
+    ``final`` says whether a response is the answer, ``resend`` whether a
+    transport error may be retried.
+    """
+
+    def __init__(self, method: str, retry: bool | None, retries: int, backoff: float) -> None:
+        self.retry = method.upper() in RETRIED_METHODS if retry is None else retry
+        self.retries = retries
+        self.backoff = backoff
+        self.attempt = 0
+
+    def __iter__(self) -> Iterator[float]:
+        for self.attempt in range(self.retries + 1):
+            yield self.backoff * 2 ** self.attempt
+
+    def final(self, r: httpx.Response) -> bool:
+        return r.status_code not in RETRY_STATUS or not self.retry or self.attempt == self.retries
+
+    def resend(self, error: httpx.TransportError) -> bool:
+        if self.attempt == self.retries:
+            return False
+        # a failed connect never reached the server, so even a command is safe to resend
+        return self.retry or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+    @staticmethod
+    def result(r: httpx.Response):
+        r.raise_for_status()
+        return r.json()
+
+
+def command_request(cmd: dict) -> tuple[str, str, dict | None]:
+    """Map a batch command to the (method, path, json) of its single-command endpoint.
+
+    Commands: ``{"type": "valve", "action": "open"|"close", "seconds": int}``,
+    ``{"type": "mode", "mode": "auto"|"manual"}``,
+    ``{"type": "thresholds", **fields}`` and ``{"type": "schedule_toggle", "id": int}``.
+    """
+    kind = cmd["type"]
+    if kind == "valve":
+        payload = {"action": cmd["action"]}
+        if cmd.get("seconds"):
+            payload["seconds"] = cmd["seconds"]
+        return "POST", "/control/valve", payload
+    if kind == "mode":
+        return "POST", "/control/mode", {"mode": cmd["mode"]}
+    if kind == "thresholds":
+        return "POST", "/config/thresholds", {k: v for k, v in cmd.items() if k != "type"}
+    if kind == "schedule_toggle":
+        return "POST", f"/schedule/{cmd['id']}/toggle", None
+    raise ValueError(f"Unknown command type: {kind}")
+
+
+class IrrigationClient:
+    """Blocking client for one irrigation node.
+
+    Requests share a pooled keep-alive connection. Reads and PUTs are
+    retried with exponential backoff on transport and gateway errors; other
+    methods only when the connection could not be made, unless the caller
+    passes ``retry=True``.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_URL,
+        timeout: float = 3.0,
+        retries: int = 3,
+        backoff: float = 0.2,
+        transport: httpx.BaseTransport | None = None,
+    ) -> None:
+        self.retries = retries
+        self.backoff = backoff
+        self._http = httpx.Client(
+            base_url=base_url,
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60),
+        )
+
+    def __enter__(self) -> "IrrigationClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._http.close()
+
+    def request(
+        self, method: str, path: str, json: dict | list | None = None, retry: bool | None = None, **kwargs
+    ):
+        attempts = _Attempts(method, retry, self.retries, self.backoff)
+        for delay in attempts:
+            try:
+                r = self._http.request(method, path, json=json, **kwargs)
+                if attempts.final(r):
+                    return attempts.result(r)
+            except httpx.TransportError as e:
+                if not attempts.resend(e):
+                    raise
+            time.sleep(delay)
+
+    def status(self) -> dict:
+        return self.request("GET", "/status/metrics")
+
+    def forecast(self) -> dict:
+        return self.request("GET", "/status/forecast")
+
+    def set_mode(self, mode: str) -> dict:
+        return self.request("POST", "/control/mode", {"mode": mode}, retry=True)
+
+    def valve(self, action: str, seconds: int | None = None) -> dict:
+        return self.request(*command_request({"type": "valve", "action": action, "seconds": seconds}))
+
+    def thresholds(self) -> dict:
+        return self.request("GET", "/config/thresholds")
+
+    def update_thresholds(self, **fields) -> dict:
+        return self.request("POST", "/config/thresholds", fields, retry=True)
+
+    def schedules(self) -> list[dict]:
+        return self.request("GET", "/schedule/list")
+
+    def rules(self) -> list[dict]:
+        return self.request("GET", "/rules")
+
+    def add_rule(self, name: str, action: str, conditions: list[dict], priority: int = 0) -> dict:
+        """Create a ``skip``/``water`` rule from ``{"field", "op", "value"}`` conditions."""
+        body = {"name": name, "action": action, "conditions": conditions, "priority": priority}
+        return self.request("POST", "/rules", body)
+
+    def delete_rule(self, rule_id: int) -> dict:
+        return self.request("DELETE", f"/rules/{rule_id}")
+
+    def whatif(self, candidates: list[dict], days: int = 7, cycle_gain: float = 0.03) -> dict:
+        """Replay candidate thresholds (``ThresholdUpdate`` fields, plus ``schedules``) over recorded history."""
+        body = {"candidates": candidates, "days": days, "cycle_gain": cycle_gain}
+        return self.request("POST", "/config/whatif", body, timeout=60)
+
+    def decisions(self, **filters) -> list[dict]:
+        """Controller decision log (filters: since, until, state, reason, limit)."""
+        params = {k: v for k, v in filters.items() if v is not None}
+        return self.request("GET", "/audit/decisions", params=params)
+
+    def batch(self, commands: list[dict]) -> list[dict]:
+        """Apply several commands in order in one request, undone on failure (see ``command_request``)."""
+        return self.request("POST", "/control/batch", {"commands": commands})["results"]
+
+    def export(self, path: str, table: str = "readings", **filters) -> int:
+        """Download a history table as an Arrow IPC stream file; returns bytes written."""
+        params = {"table": table, **{k: v for k, v in filters.items() if v is not None}}
+        written = 0
+        with self._http.stream("GET", "/history/export", params=params, timeout=None) as r:
+            r.raise_for_status()
+            with open(path, "wb") as f:
+                for chunk in r.iter_bytes():
+                    written += f.write(chunk)
+        return written
+
+    def profile(self, seconds: float = 10.0, interval_ms: float = 5.0, idle: bool = False) -> str:
+        """Sample the node's controller process; returns collapsed stacks for flame graph tools."""
+        params = {"seconds": seconds, "interval_ms": interval_ms, "idle": idle}
+        r = self._http.post("/admin/profile", params=params, timeout=seconds + 30)
+        r.raise_for_status()
+        return r.text
+
+    def memory_start(self, frames: int = 10) -> dict:
+        return self.request("POST", "/admin/memory/start", params={"frames": frames})
+
+    def memory_diff(self, top: int = 25) -> dict:
+        """Allocation growth since the previous start/diff."""
+        return self.request("POST", "/admin/memory/diff", params={"top": top})
+
+    def memory_stop(self) -> dict:
+        return self.request("POST", "/admin/memory/stop")
+
+    def readings(self, **filters) -> Iterator[dict]:
+        """Stream stored sensor readings (filters: reading_type, since, until)."""
+        yield from self._stream_lines("/history/readings", filters)
+
+    def events(self, **filters) -> Iterator[dict]:
+        """Stream recorded watering cycles (filters: since, until)."""
+        yield from self._stream_lines("/history/events", filters)
+
+    def _stream_lines(self, path: str, filters: dict) -> Iterator[dict]:
+        params = {k: v for k, v in filters.items() if v is not None}
+        with self._http.stream("GET", path, params=params, timeout=None) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def watch(self, interval: float = 1.0) -> Iterator[dict]:
+        """Yield metrics from the streaming status feed, reconnecting on errors."""
+        attempt = 0
+        while True:
+            try:
+                with self._http.stream(
+                    "GET", "/status/stream", params={"interval": interval}, timeout=None
+                ) as r:
+                    r.raise_for_status()
+                    attempt = 0
+                    for line in r.iter_lines():
+                        if line:
+                            yield json.loads(line)
+            except httpx.TransportError:
+                time.sleep(self.backoff * 2 ** min(attempt, 6))
+                attempt += 1
+
+
+class AsyncIrrigationClient:
+    """asyncio variant of ``IrrigationClient``."""
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_URL,
+        timeout: float = 3.0,
+        retries: int = 3,
+        backoff: float = 0.2,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.retries = retries
+        self.backoff = backoff
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60),
+        )
+
+    async def __aenter__(self) -> "AsyncIrrigationClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+    async def request(
+        self, method: str, path: str, json: dict | list | None = None, retry: bool | None = None, **kwargs
+    ):
+        attempts = _Attempts(method, retry, self.retries, self.backoff)
+        for delay in attempts:
+            try:
+                r = await self._http.request(method, path, json=json, **kwargs)
+                if attempts.final(r):
+                    return attempts.result(r)
+            except httpx.TransportError as e:
+                if not attempts.resend(e):
+                    raise
+            await asyncio.sleep(delay)
+
+    async def status(self) -> dict:
+        return await self.request("GET", "/status/metrics")
+
+    async def forecast(self) -> dict:
+        return await self.request("GET", "/status/forecast")
+
+    async def set_mode(self, mode: str) -> dict:
+        return await self.request("POST", "/control/mode", {"mode": mode}, retry=True)
+
+    async def valve(self, action: str, seconds: int | None = None) -> dict:
+        return await self.request(*command_request({"type": "valve", "action": action, "seconds": seconds}))
+
+    async def thresholds(self) -> dict:
+        return await self.request("GET", "/config/thresholds")
+
+    async def update_thresholds(self, **fields) -> dict:
+        return await self.request("POST", "/config/thresholds", fields, retry=True)
+
+    async def schedules(self) -> list[dict]:
+        return await self.request("GET", "/schedule/list")
+
+    async def rules(self) -> list[dict]:
+        return await self.request("GET", "/rules")
+
+    async def add_rule(self, name: str, action: str, conditions: list[dict], priority: int = 0) -> dict:
+        """Create a ``skip``/``water`` rule from ``{"field", "op", "value"}`` conditions."""
+        body = {"name": name, "action": action, "conditions": conditions, "priority": priority}
+        return await self.request("POST", "/rules", body)
+
+    async def delete_rule(self, rule_id: int) -> dict:
+        return await self.request("DELETE", f"/rules/{rule_id}")
+
+    async def whatif(self, candidates: list[dict], days: int = 7, cycle_gain: float = 0.03) -> dict:
+        """Replay candidate thresholds (``ThresholdUpdate`` fields, plus ``schedules``) over recorded history."""
+        body = {"candidates": candidates, "days": days, "cycle_gain": cycle_gain}
+        return await self.request("POST", "/config/whatif", body, timeout=60)
+
+    async def decisions(self, **filters) -> list[dict]:
+        """Controller decision log (filters: since, until, state, reason, limit)."""
+        params = {k: v for k, v in filters.items() if v is not None}
+        return await self.request("GET", "/audit/decisions", params=params)
+
+    async def batch(self, commands: list[dict]) -> list[dict]:
+        """Apply several commands in order in one request, undone on failure (see ``command_request``)."""
+        response = await self.request("POST", "/control/batch", {"commands": commands})
+        return response["results"]
+
+    async def export(self, path: str, table: str = "readings", **filters) -> int:
+        """Download a history table as an Arrow IPC stream file; returns bytes written."""
+        params = {"table": table, **{k: v for k, v in filters.items() if v is not None}}
+        written = 0
+        async with self._http.stream("GET", "/history/export", params=params, timeout=None) as r:
+            r.raise_for_status()
+            with open(path, "wb") as f:
+                async for chunk in r.aiter_bytes():
+                    written += f.write(chunk)
+        return written
+
+    async def profile(self, seconds: float = 10.0, interval_ms: float = 5.0, idle: bool = False) -> str:
+        """Sample the node's controller process; returns collapsed stacks for flame graph tools."""
+        params = {"seconds": seconds, "interval_ms": interval_ms, "idle": idle}
+        r = await self._http.post("/admin/profile", params=params, timeout=seconds + 30)
+        r.raise_for_status()
+        return r.text
+
+    async def memory_start(self, frames: int = 10) -> dict:
+        return await self.request("POST", "/admin/memory/start", params={"frames": frames})
+
+    async def memory_diff(self, top: int = 25) -> dict:
+        """Allocation growth since the previous start/diff."""
+        return await self.request("POST", "/admin/memory/diff", params={"top": top})
+
+    async def memory_stop(self) -> dict:
+        return await self.request("POST", "/admin/memory/stop")
+
+    async def readings(self, **filters) -> AsyncIterator[dict]:
+        """Stream stored sensor readings (filters: reading_type, since, until)."""
+        async for row in self._stream_lines("/history/readings", filters):
+            yield row
+
+    async def events(self, **filters) -> AsyncIterator[dict]:
+        """Stream recorded watering cycles (filters: since, until)."""
+        async for row in self._stream_lines("/history/events", filters):
+            yield row
+
+    async def _stream_lines(self, path: str, filters: dict) -> AsyncIterator[dict]:
+        params = {k: v for k, v in filters.items() if v is not None}
+        async with self._http.stream("GET", path, params=params, timeout=None) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if line:
+                    yield json.loads(line)
+
+    async def watch(self, interval: float = 1.0) -> AsyncIterator[dict]:
+        """Yield metrics from the streaming status feed, reconnecting on errors."""
+        attempt = 0
+        while True:
+            try:
+                async with self._http.stream(
+                    "GET", "/status/stream", params={"interval": interval}, timeout=None
+                ) as r:
+                    r.raise_for_status()
+                    attempt = 0
+                    async for line in r.aiter_lines():
+                        if line:
+                            yield json.loads(line)
+            except httpx.TransportError:
+                await asyncio.sleep(self.backoff * 2 ** min(attempt, 6))
+                attempt += 1
@@ -0,0 +1,265 @@
+
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+import httpx
+from pydantic import BaseModel
+from src.app.services.state_store import StateStore
+from src.client.sdk import AsyncIrrigationClient
+
+
+class NodeStatus(BaseModel):
+    name: str
+    url: str
+    online: bool = False
+    latency_ms: float | None = None
+    last_seen: datetime | None = None   # last successful poll
+    error: str | None = None
+    metrics: dict | None = None         # last known metrics, kept while offline
+
+
+class FleetSummary(BaseModel):
+    nodes: int
+    online: int
+    watering: int
+    valves_open: int
+    leaks: int
+    daily_watered_litres: float
+
+
+class FleetView(BaseModel):
+    version: int
+    polled_at: datetime | None
+    summary: FleetSummary
+    nodes: list[NodeStatus]
+
+
+def _error(exc: BaseException) -> str:
+    if isinstance(exc, TimeoutError):
+        return "timeout"
+    return str(exc) or type(exc).__name__
+
+
+class Fleet:
+    """Registry of irrigation nodes, polled concurrently.
+
+    Every ``poll_interval`` seconds all nodes are asked for their metrics at
+    once, each bounded by ``timeout``, so one node that is slow or off the
+    Wi-Fi costs the poll at most ``timeout`` and never delays the others.
+    The aggregated ``FleetView`` is cached between polls and its ``version``
+    only changes when a node's status does.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 2.0,
+        poll_interval: float = 5.0,
+        history_timeout: float = 30.0,
+        nodes_path: str | None = None,
+        nodes: dict[str, str] | None = None,
+        client_factory=None,
+    ) -> None:
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.history_timeout = history_timeout
+        self._client_factory = client_factory or (
+            lambda url: AsyncIrrigationClient(url, timeout=timeout, retries=0)
+        )
+        self._store = StateStore(nodes_path) if nodes_path else None
+        self._clients: dict[str, AsyncIrrigationClient] = {}
+        self._status: dict[str, NodeStatus] = {}
+        self._view: FleetView | None = None
+        self._version = 0
+        self._polled_at: datetime | None = None
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        stored = (self._store.load() or {}).get("nodes") or {} if self._store is not None else {}
+        for name, url in {**stored, **(nodes or {})}.items():
+            self._add(name, url)
+        if nodes:
+            self._save()
+
+    @property
+    def nodes(self) -> dict[str, str]:
+        return {name: status.url for name, status in self._status.items()}
+
+    def _add(self, name: str, url: str) -> None:
+        self._clients[name] = self._client_factory(url)
+        self._status[name] = NodeStatus(name=name, url=url)
+
+    def _save(self) -> None:
+        if self._store is not None:
+            self._store.save({"nodes": self.nodes})
+
+    async def register(self, name: str, url: str) -> None:
+        if name in self._clients:
+            if self._status[name].url == url:
+                return
+            await self._clients.pop(name).close()
+        self._add(name, url)
+        self._save()
+        self._changed()
+        self.wake()
+
+    async def unregister(self, name: str) -> bool:
+        client = self._clients.pop(name, None)
+        if client is None:
+            return False
+        del self._status[name]
+        await client.close()
+        self._save()
+        self._changed()
+        return True
+
+    def _changed(self) -> None:
+        self._version += 1
+        self._view = None
+
+    async def _poll_node(self, name: str, client) -> None:
+        status = self._status[name]
+        started = time.perf_counter()
+        try:
+            metrics = await asyncio.wait_for(client.status(), self.timeout)
+        except (TimeoutError, httpx.HTTPError, ValueError) as exc:
+            update = dict(online=False, latency_ms=None, error=_error(exc))
+        else:
+            latency = round((time.perf_counter() - started) * 1000, 1)
+            update = dict(online=True, latency_ms=latency, error=None, metrics=metrics, last_seen=datetime.utcnow())
+        if self._status.get(name) is not status:
+            return  # removed or re-registered while the request was in flight
+        # latency alone does not make a new version, or every poll would
+        changed = any(getattr(status, k) != v for k, v in update.items() if k not in ("latency_ms", "last_seen"))
+        self._status[name] = status.model_copy(update=update)
+        if changed:
+            self._changed()
+
+    async def poll(self, names: list[str] | None = None) -> FleetView:
+        """Poll the given nodes (all by default) concurrently and return the fresh view."""
+        targets = [(n, c) for n, c in self._clients.items() if names is None or n in names]
+        await asyncio.gather(*(self._poll_node(name, client) for name, client in targets))
+        self._polled_at = datetime.utcnow()
+        self._view = None
+        return self.view()
+
+    def view(self) -> FleetView:
+        if self._view is None:
+            nodes = sorted(self._status.values(), key=lambda s: s.name)
+            live = [s.metrics for s in nodes if s.online and s.metrics]
+            self._view = FleetView(
+                version=self._version,
+                polled_at=self._polled_at,
+                summary=FleetSummary(
+                    nodes=len(nodes),
+                    online=sum(s.online for s in nodes),
+                    watering=sum(m.get("state") == "watering" for m in live),
+                    valves_open=sum(bool(m.get("valve_open")) for m in live),
+                    leaks=sum(bool(m.get("leak_detected")) for m in live),
+                    daily_watered_litres=round(sum(m.get("daily_watered_litres") or 0.0 for m in live), 2),
+                ),
+                nodes=nodes,
+            )
+        return self._view
+
+    async def batch(self, commands: list[dict], names: list[str] | None = None) -> dict[str, dict]:
+        """Send one ``/control/batch`` to each node concurrently; results are per node."""
+        targets = [(n, c) for n, c in self._clients.items() if names is None or n in names]
+
+        async def send(client) -> dict:
+            try:
+                results = await asyncio.wait_for(client.batch(commands), self.timeout)
+            except httpx.HTTPStatusError as exc:
+                try:
+                    detail = exc.response.json().get("detail")
+                except ValueError:
+                    detail = None
+                return {"ok": False, "status_code": exc.response.status_code, "error": detail or str(exc)}
+            except (TimeoutError, httpx.HTTPError) as exc:
+                return {"ok": False, "error": _error(exc)}
+            return {"ok": True, "results": results}
+
+        outcomes = await asyncio.gather(*(send(client) for _, client in targets))
+        # refresh the view of the nodes that changed without waiting for the next poll
+        await self.poll([name for (name, _), out in zip(targets, outcomes) if out["ok"]])
+        return {name: out for (name, _), out in zip(targets, outcomes)}
+
+    async def history(
+        self,
+        reading_type: str = "soil",
+        field: str = "moisture_rel",
+        since: datetime | None = None,
+        until: datetime | None = None,
+        bucket_minutes: int = 60,
+    ) -> dict:
+        """Readings of all nodes averaged into shared time buckets, ready to chart as one series per node."""
+        bucket = timedelta(minutes=bucket_minutes)
+        filters = dict(
+            reading_type=reading_type,
+            since=since.isoformat() if since else None,
+            until=until.isoformat() if until else None,
+        )
+
+        async def collect(client) -> dict[datetime, float]:
+            sums: dict[datetime, list[float]] = defaultdict(lambda: [0.0, 0])
+            async for row in client.readings(**filters):
+                value = row.get(field)
+                if value is None:
+                    continue
+                ts = datetime.fromisoformat(row["timestamp"])
+                start = datetime.min + ((ts - datetime.min) // bucket) * bucket
+                sums[start][0] += value
+                sums[start][1] += 1
+            return {start: total / count for start, (total, count) in sums.items()}
+
+        names = sorted(self._clients)
+        outcomes = await asyncio.gather(
+            *(asyncio.wait_for(collect(self._clients[n]), self.history_timeout) for n in names),
+            return_exceptions=True,
+        )
+        series: dict[str, dict[datetime, float]] = {}
+        errors: dict[str, str] = {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BaseException):
+                if not isinstance(outcome, (TimeoutError, httpx.HTTPError, ValueError)):
+                    raise outcome
+                errors[name] = _error(outcome)
+            else:
+                series[name] = outcome
+        timestamps = sorted({ts for values in series.values() for ts in values})
+        return dict(
+            field=field,
+            bucket_minutes=bucket_minutes,
+            nodes=list(series),
+            points=[
+                dict(timestamp=ts, values={n: round(v[ts], 4) if ts in v else None for n, v in series.items()})
+                for ts in timestamps
+            ],
+            errors=errors,
+        )
+
+    def wake(self) -> None:
+        """Poll as soon as possible."""
+        self._wake.set()
+
+    async def run(self) -> None:
+        while True:
+            self._wake.clear()
+            await self.poll()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except TimeoutError:
+                pass
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for client in self._clients.values():
+            await client.close()
@@ -0,0 +1,139 @@
+
+import argparse
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from src.app.api.encoding import FastJSONResponse
+from src.hub.fleet import Fleet, FleetView
+
+router = APIRouter(prefix="/fleet", tags=["fleet"])
+
+_fleet: Fleet | None = None
+
+
+def get_fleet() -> Fleet:
+    assert _fleet is not None
+    return _fleet
+
+
+class NodeRegistration(BaseModel):
+    """Schema for adding or moving a node."""
+    url: str
+
+
+class FleetBatchRequest(BaseModel):
+    """Schema for commands sent to several nodes at once."""
+    commands: list[dict] = Field(min_length=1)
+    nodes: list[str] | None = None  # all nodes when omitted
+
+
+@router.get("", response_model=FleetView)
+async def fleet_view(
+    if_none_match: str | None = Header(None),
+    fleet = Depends(get_fleet),
+):
+    """Aggregated status of all nodes from the last poll; never waits for a node."""
+    view = fleet.view()
+    etag = f'W/"{view.version}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return FastJSONResponse(view.model_dump(mode="json"), headers={"ETag": etag})
+
+
+@router.post("/poll", response_model=FleetView)
+async def poll_now(fleet = Depends(get_fleet)):
+    """Poll every node now instead of waiting for the next interval."""
+    return await fleet.poll()
+
+
+@router.get("/nodes")
+async def list_nodes(fleet = Depends(get_fleet)) -> dict[str, str]:
+    return fleet.nodes
+
+
+@router.put("/nodes/{name}")
+async def register_node(name: str, node: NodeRegistration, fleet = Depends(get_fleet)):
+    await fleet.register(name, node.url.rstrip("/"))
+    return {"ok": True, "name": name}
+
+
+@router.delete("/nodes/{name}")
+async def unregister_node(name: str, fleet = Depends(get_fleet)):
+    if not await fleet.unregister(name):
+        raise HTTPException(status_code=404, detail="Node not found")
+    return {"ok": True}
+
+
+@router.post("/batch")
+async def fleet_batch(batch: FleetBatchRequest, fleet = Depends(get_fleet)):
+    """Send a ``/control/batch`` to each selected node concurrently."""
+    unknown = set(batch.nodes or ()) - set(fleet.nodes)
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown nodes: {', '.join(sorted(unknown))}")
+    results = await fleet.batch(batch.commands, batch.nodes)
+    return {"ok": all(r["ok"] for r in results.values()), "nodes": results}
+
+
+@router.get("/history")
+async def fleet_history(
+    reading_type: str = "soil",
+    field: str = Query("moisture_rel", pattern="^(moisture_rel|temperature_c|humidity_rel)$"),
+    since: datetime | None = None,
+    until: datetime | None = None,
+    bucket_minutes: int = Query(60, ge=1, le=24 * 60),
+    fleet = Depends(get_fleet),
+):
+    """Readings of every node averaged into common time buckets, one series per node."""
+    return await fleet.history(reading_type, field, since, until, bucket_minutes)
+
+
+def create_app(fleet: Fleet) -> FastAPI:
+    """Hub application; polling runs while the app is up."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        global _fleet
+        _fleet = fleet
+        fleet.start()
+        yield
+        await fleet.stop()
+
+    app = FastAPI(title="Irrigation Hub", lifespan=lifespan, default_response_class=FastJSONResponse)
+    app.include_router(router)
+    return app
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Aggregate several irrigation nodes behind one API")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8100)
+    p.add_argument(
+        "--node", action="append", default=[], metavar="NAME=URL",
+        help="node to manage, e.g. front=http://pi-front.local:8000 (repeatable)",
+    )
+    p.add_argument("--nodes-file", default="./hub_nodes.json", help="registered nodes are kept here")
+    p.add_argument("--timeout", type=float, default=2.0, help="per-node request timeout")
+    p.add_argument("--poll-interval", type=float, default=5.0)
+    args = p.parse_args()
+
+    nodes = {}
+    for spec in args.node:
+        name, _, url = spec.partition("=")
+        if not name or not url:
+            p.error(f"--node expects NAME=URL, got {spec!r}")
+        nodes[name] = url.rstrip("/")
+    fleet = Fleet(
+        timeout=args.timeout,
+        poll_interval=args.poll_interval,
+        nodes_path=args.nodes_file,
+        nodes=nodes,
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(fleet), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
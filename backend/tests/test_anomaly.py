@@ -0,0 +1,62 @@
+
+from datetime import datetime, timedelta
+from app.models import SoilReading
+from app.services.anomaly import ChannelMonitor, SensorHealthMonitor
+
+T0 = datetime(2024, 6, 1, 4, 0)
+
+
+def _moisture(**kwargs) -> ChannelMonitor:
+    return ChannelMonitor("soil_moisture", 0.0, 1.0, max_rate_per_min=0.2, min_scale=0.005, **kwargs)
+
+
+def _feed(monitor: ChannelMonitor, values, start: int = 0) -> list[bool]:
+    return [monitor.check(T0 + timedelta(seconds=5 * (start + i)), v) for i, v in enumerate(values)]
+
+
+def test_spike_is_rejected_but_step_is_accepted():
+    monitor = _moisture()
+    noise = [0.40, 0.41, 0.39, 0.405, 0.395] * 4
+    assert all(_feed(monitor, noise))
+
+    assert _feed(monitor, [0.1, 0.4], start=20) == [False, True]
+    assert monitor.last_flag in ("spike", "rate")
+
+    # a sustained jump (watering) is accepted after three samples
+    assert _feed(monitor, [0.6, 0.6, 0.6, 0.61], start=22) == [False, False, True, True]
+    assert monitor.status == "ok"
+
+
+def test_flatline_range_and_missing():
+    monitor = _moisture(flat_samples=5)
+    assert _feed(monitor, [0.4] * 6) == [True] * 4 + [False] * 2
+    assert monitor.status == "flatline"
+
+    monitor = _moisture()
+    assert _feed(monitor, [1.7, None]) == [False, False]
+    assert monitor.last_flag == "missing"
+    assert monitor.flagged_total == 2
+
+
+def test_flagged_soil_falls_back_to_last_good_reading():
+    monitor = SensorHealthMonitor(hold_seconds=60)
+    good = None
+    for i in range(10):
+        good = SoilReading(temperature_c=15.0, moisture_rel=0.45 + (i % 2) * 0.01, timestamp=T0)
+        assert monitor.filter_soil(T0 + timedelta(seconds=5 * i), good) is good
+
+    spike = SoilReading(temperature_c=15.0, moisture_rel=0.05, timestamp=T0)
+    assert monitor.filter_soil(T0 + timedelta(seconds=50), spike) is good
+    assert monitor.filter_soil(T0 + timedelta(seconds=200), None) is None
+    assert {h.channel: h.status for h in monitor.health()}["soil_moisture"] == "missing"
+
+
+def test_clamped_moisture_is_not_a_flatline():
+    # soil drier than the dry calibration point reads 0.0 for as long as it stays dry
+    monitor = SensorHealthMonitor().channels["soil_moisture"]
+    assert all(_feed(monitor, [0.0] * 60))
+    assert monitor.status == "ok"
+    assert all(_feed(monitor, [1.0] * 60, start=60)[2:])  # a confirmed step, then saturated
+
+    assert _feed(monitor, [0.8] * 31, start=120)[-1] is False
+    assert monitor.status == "flatline"
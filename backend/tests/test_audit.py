@@ -0,0 +1,50 @@
+
+from datetime import datetime, timedelta
+from app.services.audit import DecisionLog
+from app.services.controller import WateringController
+from app.services.repository import StateRepository
+from app.hardware.valve import MockValve
+from app.hardware.sensors import MockSensorReader
+from app.models import SoilReading
+
+
+def test_query_filters_and_orders_newest_first(tmp_path):
+    log = DecisionLog(str(tmp_path / "decisions.log"))
+    t0 = datetime(2024, 6, 1, 3, 0)
+    log.record(t0, "idle", "watering", "moisture below low threshold", moisture=0.3)
+    log.record(t0 + timedelta(seconds=90), "watering", "soak", "watering time elapsed", moisture=0.33)
+    log.record(t0 + timedelta(minutes=10), "soak", "idle", "moisture recovered after soak", moisture=0.4)
+
+    assert [r["to"] for r in log.query()] == ["idle", "soak", "watering"]
+    assert [r["to"] for r in log.query(state="soak")] == ["idle", "soak"]
+    assert [r["to"] for r in log.query(since=t0 + timedelta(minutes=1), reason="soak")] == ["idle"]
+
+
+def test_rotation_keeps_backups(tmp_path):
+    path = tmp_path / "decisions.log"
+    log = DecisionLog(str(path), max_bytes=300, backups=2)
+    for i in range(20):
+        log.record(datetime(2024, 6, 1, 3, 0, i), "idle", "watering", "scheduled")
+    log.close()
+
+    assert (tmp_path / "decisions.log.1").exists()
+    assert (tmp_path / "decisions.log.2").exists()
+    assert not (tmp_path / "decisions.log.3").exists()
+    assert 0 < len(DecisionLog(str(path), backups=2).query()) < 20
+
+
+def test_controller_records_transitions_only(tmp_path):
+    log = DecisionLog(str(tmp_path / "decisions.log"))
+    ctrl = WateringController(MockSensorReader(), MockValve(), StateRepository(), log)
+    now = datetime(2024, 6, 1, 4, 0)
+    dry = SoilReading(temperature_c=20.0, moisture_rel=0.2, timestamp=now)
+
+    ctrl._auto_tick(now, dry)
+    ctrl._auto_tick(now + timedelta(seconds=5), dry)
+
+    records = log.query()
+    assert len(records) == 1
+    assert records[0]["to"] == "watering"
+    assert records[0]["reason"] == "moisture below low threshold"
+    assert records[0]["thresholds_version"] == "config"
+    assert records[0]["ts"] == now.isoformat()  # the tick's time, not the wall clock
@@ -1,4 +1,8 @@
 
+import asyncio
+import pytest
+
+
 def to_moisture_percent(raw: int, dry_raw: int, wet_raw: int) -> float:
     raw = max(min(raw, dry_raw), wet_raw)
     return (dry_raw - raw) / (dry_raw - wet_raw)
@@ -14,3 +18,151 @@ def test_calibration_mapping():
     mid = (dry_raw + wet_raw) // 2
     mid_pct = to_moisture_percent(mid, dry_raw, wet_raw)
     assert 0.45 < mid_pct < 0.55
+
+
+def test_linear_table_matches_two_point_conversion():
+    from app.hardware.calibration import CalibrationCurve
+    from app.hardware.pi import moisture_from_raw
+
+    table = CalibrationCurve([(21000, 0.0), (11000, 1.0)]).compile()
+    for raw in (-32768, 0, 11000, 13500, 16000, 20999, 21000, 32767):
+        assert table.convert(raw) == pytest.approx(moisture_from_raw(raw, 21000, 11000), abs=1e-6)
+
+
+def test_spline_passes_through_points_without_overshoot():
+    from app.hardware.calibration import CalibrationCurve
+
+    points = [(21000, 0.0), (17000, 0.2), (14000, 0.45), (13000, 0.45), (11000, 1.0)]
+    table = CalibrationCurve(points, method="spline").compile()
+    for raw, moisture in points:
+        assert table.convert(raw) == pytest.approx(moisture, abs=1e-6)
+    values = table.convert_many(range(11000, 21001))
+    assert all(a >= b for a, b in zip(values, values[1:]))  # drier as the code rises
+    assert all(table.convert(raw) == pytest.approx(0.45, abs=1e-6) for raw in (13200, 13500, 13800))
+
+
+def test_temperature_compensation_shifts_the_lookup():
+    from app.hardware.calibration import CalibrationCurve
+
+    # this probe reads 20 codes higher per °C colder than the 20 °C reference
+    curve = CalibrationCurve(
+        [(21200, 0.0, 10.0), (11000, 1.0, 20.0)], temp_coeff=-20.0, reference_temp_c=20.0
+    )
+    assert curve.xs == [11000, 21000]
+    table = curve.compile()
+    assert table.convert(16200, 10.0) == table.convert(16000, 20.0) == table.convert(16000)
+    assert table.convert(16000, 30.0) == pytest.approx(0.48, abs=1e-6)
+
+
+def test_batches_convert_like_scalars():
+    from app.hardware.calibration import CalibrationCurve
+
+    table = CalibrationCurve([(21000, 0.0), (15000, 0.4), (11000, 1.0)], method="spline").compile()
+    raws = [-32768, 9000, 11000, 14321, 18000, 32767, 40000]
+    assert list(table.convert_many(raws, 12.5)) == [table.convert(r, 12.5) for r in raws]
+    assert table.mean(raws) == pytest.approx(sum(table.convert(r) for r in raws) / len(raws))
+
+
+def test_invalid_curves_are_rejected():
+    from app.hardware.calibration import CalibrationCurve
+
+    with pytest.raises(ValueError):
+        CalibrationCurve([(15000, 0.3), (15000, 0.4)])
+    with pytest.raises(ValueError):
+        CalibrationCurve([(21000, 0.0), (11000, 1.2)])
+    with pytest.raises(ValueError):
+        CalibrationCurve([(21000, 0.0), (11000, 1.0)], method="cubic")
+
+
+def test_sim_reader_uses_the_calibration_table(tmp_path):
+    pytest.importorskip("adafruit_sht31d")
+    pytest.importorskip("adafruit_ads1x15")
+    pytest.importorskip("gpiozero")
+    from app.config import HardwareConfig
+    from app.hardware.sim import SimHardware
+    from app.services.calibration import CalibrationService
+
+    sim = SimHardware(w1_root=str(tmp_path / "w1"))
+    sim.w1.set_temperature(sim.soil_sensor_id, 20.0)
+    hw = HardwareConfig(kind="sim", moisture_oversample=8)
+    reader = sim.sensor_reader(hw)
+    service = CalibrationService(reader)
+    sim.ads.set_raw(hw.moisture_channel, 15000)
+
+    captured = service.capture(hw.moisture_channel, samples=4)
+    assert captured == {"raw": 15000, "temperature_c": 20.0}
+    assert reader.read_soil().moisture_rel == pytest.approx(0.6)  # two-point 21000..11000
+
+    service.apply(hw.moisture_channel, {"points": [[19000, 0.0], [15000, 0.5], [12000, 1.0]]})
+    assert service.active(hw.moisture_channel)
+    assert reader.read_soil().moisture_rel == pytest.approx(0.5)
+    with pytest.raises(RuntimeError):
+        service.apply(hw.moisture_channel + 1, None)
+
+    service.apply(hw.moisture_channel, None)
+    assert not service.active(hw.moisture_channel)
+    assert reader.read_soil().moisture_rel == pytest.approx(0.6)
+
+
+class FakeProbe:
+    moisture_channel = 0
+    calibration = None
+
+    def read_moisture_raw(self, samples: int = 1):
+        return 16000.0, 18.5
+
+    def set_calibration(self, table) -> None:
+        self.calibration = table
+
+
+def test_calibration_api_captures_points_and_recompiles(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.api import routes_calibration
+    from app.database.models import Base
+    from app.services.calibration import CalibrationService
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cal.db'}")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def session():
+        async with AsyncSession(engine, expire_on_commit=False) as s:
+            yield s
+
+    asyncio.run(setup())
+    probe = FakeProbe()
+    app = FastAPI()
+    app.include_router(routes_calibration.router)
+    app.dependency_overrides.update({
+        routes_calibration.get_session: session,
+        routes_calibration.get_calibration: lambda: CalibrationService(probe),
+    })
+    client = TestClient(app)
+
+    assert client.post("/calibration/0/points", json={"raw": 21000, "moisture_rel": 0.0}).status_code == 200
+    assert probe.calibration is None  # one point is not a curve yet
+    captured = client.post("/calibration/0/capture", json={"moisture_rel": 0.5, "samples": 32}).json()
+    assert (captured["raw"], captured["temperature_c"]) == (16000.0, 18.5)
+    assert probe.calibration.convert(16000) == pytest.approx(0.5)
+
+    # readings at the same raw code are averaged into one curve point
+    duplicate = client.post("/calibration/0/points", json={"raw": 21000, "moisture_rel": 0.1}).json()
+    assert probe.calibration.convert(21000) == pytest.approx(0.05)
+    assert client.put("/calibration/0", json={"method": "cubic"}).status_code == 422
+
+    body = client.put("/calibration/0", json={"method": "spline", "temp_coeff": -10}).json()
+    assert body["method"] == "spline" and body["active"]
+    assert [p["raw"] for p in body["points"]] == [16000.0, 21000.0, 21000.0]
+
+    assert client.post("/calibration/1/capture", json={"moisture_rel": 0.5}).status_code == 409
+    # without the capture only one raw code is left, which is no curve
+    assert client.delete(f"/calibration/0/points/{captured['id']}").status_code == 422
+    assert client.delete(f"/calibration/0/points/{duplicate['id']}").status_code == 200
+    assert client.delete(f"/calibration/0/points/{captured['id']}").status_code == 200
+    assert client.get("/calibration/0").json()["active"] is False
+    assert probe.calibration is None
+    assert client.delete("/calibration/0/points/999").status_code == 404
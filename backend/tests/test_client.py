@@ -0,0 +1,91 @@
+
+import asyncio
+import json
+import httpx
+import pytest
+from client.sdk import AsyncIrrigationClient, IrrigationClient, command_request
+
+
+def test_command_request_mapping():
+    assert command_request({"type": "valve", "action": "open", "seconds": 30}) == (
+        "POST", "/control/valve", {"action": "open", "seconds": 30}
+    )
+    assert command_request({"type": "schedule_toggle", "id": 3}) == ("POST", "/schedule/3/toggle", None)
+
+
+def test_retries_gateway_errors_with_backoff():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"mode": "auto"})
+
+    with IrrigationClient(transport=httpx.MockTransport(handler), backoff=0) as client:
+        assert client.status() == {"mode": "auto"}
+    assert calls == ["/status/metrics"] * 3
+
+
+def test_commands_are_not_resent_after_they_may_have_arrived():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/control/batch" and len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path == "/control/valve":
+            raise httpx.ReadTimeout("no answer", request=request)
+        return httpx.Response(503)
+
+    with IrrigationClient(transport=httpx.MockTransport(handler), backoff=0) as client:
+        # nothing was sent on a refused connection, so the batch is retried
+        with pytest.raises(httpx.HTTPStatusError):
+            client.batch([{"type": "valve", "action": "close"}])
+        assert calls == ["/control/batch"] * 2
+
+        calls.clear()
+        with pytest.raises(httpx.ReadTimeout):
+            client.valve("open", 30)
+        assert calls == ["/control/valve"]
+
+        calls.clear()
+        with pytest.raises(httpx.HTTPStatusError):
+            client.request("POST", "/control/batch", {"commands": []}, retry=True)
+        assert calls == ["/control/batch"] * 4
+
+        calls.clear()
+        with pytest.raises(httpx.HTTPStatusError):
+            client.delete_rule(1)  # the gateway may have passed it on
+        assert calls == ["/rules/1"]
+
+
+def test_async_batch_and_watch():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/status/stream":
+            return httpx.Response(200, content=b'{"state": "idle"}\n{"state": "watering"}\n')
+        seen.append(json.loads(request.content))
+        return httpx.Response(200, json={"ok": True, "results": [{"index": 0}, {"index": 1}]})
+
+    async def run():
+        async with AsyncIrrigationClient(transport=httpx.MockTransport(handler)) as client:
+            results = await client.batch([
+                {"type": "mode", "mode": "manual"},
+                {"type": "valve", "action": "close"},
+            ])
+            states = []
+            async for data in client.watch():
+                states.append(data["state"])
+                if len(states) == 2:
+                    break
+            return results, states
+
+    results, states = asyncio.run(run())
+    assert results == [{"index": 0}, {"index": 1}]
+    assert seen == [{"commands": [
+        {"type": "mode", "mode": "manual"},
+        {"type": "valve", "action": "close"},
+    ]}]
+    assert states == ["idle", "watering"]
@@ -0,0 +1,78 @@
+
+import json
+from datetime import datetime
+import pytest
+from app.config import RuntimeConfig, load_config
+from app.hardware.sensors import MockSensorReader
+from app.hardware.valve import MockValve
+from app.services.controller import WateringController
+from app.services.repository import StateRepository
+# the controller reads ``get_config()`` from ``src.app.config``
+from src.app import config as src_config
+
+
+def _write(path, data: dict) -> None:
+    path.write_text(json.dumps(data))
+
+
+def test_file_and_environment_override_defaults(tmp_path):
+    path = tmp_path / "irrigation.json"
+    _write(path, {"tick_interval_sec": 10, "controller": {"window": {"start_hour": 4, "end_hour": 7}}})
+    cfg = load_config(str(path), environ={
+        "IRRIGATION__TICK_INTERVAL_SEC": "15",
+        "IRRIGATION__CONTROLLER__THRESHOLD_LOW": "0.3",
+        "IRRIGATION_HARDWARE": "pi",  # single underscore: not an override
+    })
+    assert cfg.tick_interval_sec == 15
+    assert cfg.controller.window.start_hour == 4 and cfg.controller.window.end_hour == 7
+    assert cfg.controller.threshold_low == 0.3 and cfg.controller.threshold_high == 0.45
+
+    with pytest.raises(ValueError):
+        load_config(str(path), environ={"IRRIGATION__CONTROLLER__THRESHOLD_LOW": "0.5"})
+    assert load_config(str(tmp_path / "missing.json"), environ={}).tick_interval_sec == 5
+
+
+def test_reload_swaps_validated_config_and_keeps_restart_only_settings(tmp_path):
+    path = tmp_path / "irrigation.json"
+    _write(path, {"idle_sample_interval_sec": 60})
+    runtime = RuntimeConfig(str(path))
+    seen = []
+    runtime.subscribe(seen.append)
+    before = runtime.current
+
+    assert not runtime.check()  # unchanged file
+    _write(path, {"idle_sample_interval_sec": 30, "hardware": {"kind": "pi", "moisture_oversample": 8}})
+    assert runtime.reload()
+    assert runtime.version == 2 and seen == [runtime.current]
+    assert runtime.current.idle_sample_interval_sec == 30
+    assert runtime.current.hardware.moisture_oversample == 8
+    assert runtime.current.hardware.kind == before.hardware.kind  # pins and drivers need a restart
+    assert runtime.restart_required == ["hardware.kind"]
+    assert before.idle_sample_interval_sec == 60  # the old object is never mutated
+
+    path.write_text('{"controller": {"window": {"start_hour": 6, "end_hour": 5}}}')
+    assert not runtime.reload()
+    assert "start_hour must be before end_hour" in runtime.last_error
+    assert runtime.version == 2 and runtime.current.idle_sample_interval_sec == 30
+
+    status = runtime.status()
+    assert status["version"] == 2 and "controller" in status["config"]
+    assert "ipc_socket_path" not in status["config"]
+
+
+def test_controller_picks_up_reloaded_config_between_ticks(tmp_path, monkeypatch):
+    path = tmp_path / "irrigation.json"
+    _write(path, {})
+    runtime = RuntimeConfig(str(path))
+    monkeypatch.setattr(src_config, "runtime", runtime)
+    ctrl = WateringController(MockSensorReader(), MockValve(), StateRepository())
+    ctrl.tick()
+    now = datetime(2024, 6, 1, 12, 0)
+    assert (ctrl.next_wakeup(now) - now).total_seconds() == 60
+
+    _write(path, {"idle_sample_interval_sec": 20, "sensor_hold_sec": 30})
+    assert runtime.reload()
+    assert (ctrl.next_wakeup(now) - now).total_seconds() == 20
+    assert ctrl.health_monitor.hold_seconds == 180  # copies are refreshed by the next tick
+    ctrl.tick()
+    assert ctrl.health_monitor.hold_seconds == 30
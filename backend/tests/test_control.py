@@ -0,0 +1,153 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.api import routes_control
+from app.database.models import Base
+from app.database.repository import ThresholdRepository
+from app.hardware.valve import MockValve
+from app.services.repository import StateRepository
+from app.services.valve_gate import ValveCommandGate
+
+
+class Clock:
+    now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RecordingValve(MockValve):
+    def __init__(self, log: list) -> None:
+        super().__init__()
+        self.log = log
+
+    def open(self) -> None:
+        self.log.append("open")
+        super().open()
+
+    def close(self) -> None:
+        self.log.append("close")
+        super().close()
+
+
+class RecordingStateRepository(StateRepository):
+    def __init__(self, log: list) -> None:
+        super().__init__()
+        self.log = log
+
+    def set_mode(self, mode: str) -> None:
+        self.log.append(mode)
+        super().set_mode(mode)
+
+
+def _app(tmp_path, **gate_options):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'control.db'}")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def session():
+        async with AsyncSession(engine, expire_on_commit=False) as s:
+            yield s
+
+    class Scheduler:
+        def wake(self):
+            pass
+
+    asyncio.run(setup())
+    log = []
+    valve = RecordingValve(log)
+    repo = RecordingStateRepository(log)
+    gate = ValveCommandGate(valve, repo, clock=Clock(), **gate_options)
+    app = FastAPI()
+    app.include_router(routes_control.router)
+    app.dependency_overrides.update({
+        routes_control.get_session: session,
+        routes_control.get_valve: lambda: valve,
+        routes_control.get_state_repo: lambda: repo,
+        routes_control.get_scheduler: Scheduler,
+        routes_control.get_valve_gate: lambda: gate,
+    })
+
+    async def low():
+        async with AsyncSession(engine) as s:
+            return (await ThresholdRepository(s).get_current()).soil_moisture_low
+
+    return TestClient(app), log, valve, repo, lambda: asyncio.run(low())
+
+
+def test_batch_applies_commands_in_list_order(tmp_path):
+    client, log, valve, repo, low = _app(tmp_path)
+    response = client.post("/control/batch", json={"commands": [
+        {"type": "valve", "action": "open"},
+        {"type": "mode", "mode": "manual"},
+        {"type": "thresholds", "soil_moisture_low": 0.2},
+        {"type": "valve", "action": "close"},
+        {"type": "mode", "mode": "auto"},
+    ]})
+
+    assert response.status_code == 200
+    assert log == ["open", "manual", "close", "auto"]
+    assert [r["status"] for r in response.json()["results"]] == ["accepted", None, None, "accepted", None]
+    assert low() == 0.2 and not valve.is_open
+
+
+def test_invalid_or_unknown_commands_apply_nothing(tmp_path):
+    client, log, valve, repo, low = _app(tmp_path)
+    before = low()
+
+    invalid = client.post("/control/batch", json={"commands": [
+        {"type": "mode", "mode": "manual"},
+        {"type": "thresholds", "soil_moisture_low": 1.5},
+    ]})
+    assert invalid.status_code == 422
+
+    missing = client.post("/control/batch", json={"commands": [
+        {"type": "thresholds", "soil_moisture_low": 0.2},
+        {"type": "valve", "action": "open"},
+        {"type": "schedule_toggle", "id": 999},
+    ]})
+    assert missing.status_code == 404
+    assert missing.json()["detail"]["index"] == 2
+
+    assert log == [] and repo.snapshot()["mode"] == "auto"
+    assert low() == before
+
+
+def test_failing_command_undoes_the_earlier_ones(tmp_path):
+    client, log, valve, repo, low = _app(tmp_path, client_burst=1)
+    before = low()
+    response = client.post("/control/batch", json={"commands": [
+        {"type": "thresholds", "soil_moisture_low": 0.2},
+        {"type": "mode", "mode": "manual"},
+        {"type": "valve", "action": "open"},
+        {"type": "valve", "action": "open", "seconds": 60},     # the sender's bucket is empty
+    ]})
+
+    assert response.status_code == 429
+    assert response.json()["detail"]["index"] == 3
+    assert log == ["manual", "open", "auto", "close"]
+    assert repo.snapshot()["mode"] == "auto" and not valve.is_open
+    assert low() == before
+
+
+def test_undo_keeps_a_mode_changed_by_another_client(tmp_path):
+    client, log, valve, repo, low = _app(tmp_path, client_burst=1)
+    open_valve = valve.open
+
+    def open_then_switch():
+        open_valve()
+        repo.set_mode("auto")       # a concurrent /control/mode lands mid-batch
+
+    valve.open = open_then_switch
+    response = client.post("/control/batch", json={"commands": [
+        {"type": "mode", "mode": "manual"},
+        {"type": "valve", "action": "open"},
+        {"type": "valve", "action": "open", "seconds": 60},     # the sender's bucket is empty
+    ]})
+
+    assert response.status_code == 429
+    assert log == ["manual", "open", "auto", "close"]
+    assert repo.snapshot()["mode"] == "auto" and not valve.is_open
@@ -1,5 +1,5 @@
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.services.controller import WateringController
 from app.services.repository import StateRepository
 from app.hardware.valve import MockValve
@@ -47,3 +47,56 @@ def test_controller_closes_valve_when_wet():
     ctrl.tick()
     snap = repo.snapshot()
     assert snap["valve_open"] is False
+
+
+def test_next_wakeup_sleeps_until_watering_ends():
+    repo = StateRepository()
+    valve = MockValve()
+    ctrl = WateringController(FakeSensors(moisture=0.2), valve, repo)
+    now = datetime(2024, 6, 1, 4, 0)
+    ctrl._auto_tick(now, SoilReading(temperature_c=20.0, moisture_rel=0.2, timestamp=now))
+
+    assert ctrl.state == "watering"
+    assert ctrl.next_wakeup(now) == now + timedelta(seconds=5)
+    assert ctrl.next_wakeup(now + timedelta(seconds=88)) == ctrl._state_until
+
+
+def test_next_wakeup_idles_until_window_when_closed():
+    repo = StateRepository()
+    ctrl = WateringController(FakeSensors(moisture=0.5), MockValve(), repo)
+    now = datetime(2024, 6, 1, 2, 59, 30)
+
+    assert ctrl.next_wakeup(now) == datetime(2024, 6, 1, 3, 0)
+    assert ctrl.next_wakeup(datetime(2024, 6, 1, 12, 0)) == datetime(2024, 6, 1, 12, 1)
+
+
+def test_stored_history_is_seeded_before_live_samples(tmp_path):
+    import asyncio
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.database.models import Base, SensorReading
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'history.db'}")
+    now = datetime.utcnow()
+    repo = StateRepository()
+    ctrl = WateringController(FakeSensors(moisture=0.4), MockValve(), repo)
+
+    async def seed():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            # drying by 0.01 per hour over the last ten hours
+            session.add_all(
+                SensorReading(reading_type="soil", moisture_rel=0.5 - 0.01 * h,
+                              timestamp=now - timedelta(hours=10 - h))
+                for h in range(10)
+            )
+            await session.commit()
+            await ctrl.seed_history(session)
+        await engine.dispose()
+
+    asyncio.run(seed())
+    repo.set_mode("manual")
+    ctrl.tick()
+
+    assert ctrl.forecaster.cycle_gain == 0.03
+    assert abs(ctrl.forecaster.drying_rate() + 0.01) < 1e-3
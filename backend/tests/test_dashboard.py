@@ -0,0 +1,83 @@
+
+import asyncio
+from datetime import datetime, time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.api import routes_dashboard
+from app.database.models import Base, WateringSchedule
+from app.services.repository import StateRepository
+
+
+def _client(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'dash.db'}")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(setup())
+    loads = []
+    load = routes_dashboard.DashboardReadModel._load
+
+    async def counting_load(self, hour):
+        loads.append(hour)
+        return await load(self, hour)
+
+    monkeypatch.setattr(routes_dashboard, "get_engine", lambda: engine)
+    monkeypatch.setattr(routes_dashboard.DashboardReadModel, "_load", counting_load)
+    monkeypatch.setattr(routes_dashboard, "_read_model", routes_dashboard.DashboardReadModel())
+
+    repo = StateRepository()
+    app = FastAPI()
+    app.include_router(routes_dashboard.router)
+    app.dependency_overrides[routes_dashboard.get_state_repo] = lambda: repo
+    return TestClient(app), repo, engine, loads
+
+
+def test_dashboard_is_rebuilt_only_when_inputs_change(tmp_path, monkeypatch):
+    client, repo, engine, loads = _client(tmp_path, monkeypatch)
+
+    first = client.get("/dashboard")
+    assert first.status_code == 200
+    body = first.json()
+    assert body["thresholds"]["soil_moisture_low"] == 0.38
+    assert body["schedules"] == []
+    assert body["usage"]["budget_seconds"] == 20 * 60
+    etag = first.headers["etag"]
+
+    assert client.get("/dashboard", headers={"If-None-Match": etag}).status_code == 304
+    assert len(loads) == 1
+
+    # live state changes the version without touching the database
+    repo.set_mode("manual")
+    second = client.get("/dashboard", headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.json()["metrics"]["mode"] == "manual"
+    assert len(loads) == 1
+
+    async def add_schedule():
+        async with AsyncSession(engine) as session:
+            session.add(WateringSchedule(
+                name="evening",
+                schedule_date=datetime.utcnow().date(),
+                schedule_time=time(20, 0),
+                duration_seconds=60,
+            ))
+            await session.commit()
+
+    asyncio.run(add_schedule())
+    repo.touch_data()
+    third = client.get("/dashboard")
+    assert [s["name"] for s in third.json()["schedules"]] == ["evening"]
+    assert third.headers["etag"] != second.headers["etag"]
+    assert len(loads) == 2
+
+
+def test_browsers_can_read_the_etag():
+    from src.app.main import create_app
+
+    client = TestClient(create_app())   # no lifespan: only the middleware stack is exercised
+    r = client.get("/dashboard/missing", headers={"Origin": "http://localhost:3000"})
+    exposed = {h.strip().lower() for h in r.headers["access-control-expose-headers"].split(",")}
+    assert "etag" in exposed
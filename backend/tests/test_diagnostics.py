@@ -0,0 +1,87 @@
+
+import threading
+import pytest
+from app.services.diagnostics import Diagnostics, ProfilerBusy, sample_stacks
+
+
+def _spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_reports_busy_threads_as_collapsed_stacks():
+    stop = threading.Event()
+    busy = threading.Thread(target=_spin, args=(stop,), name="busy")
+    idle = threading.Thread(target=stop.wait, name="idle")
+    busy.start()
+    idle.start()
+    try:
+        stacks = Diagnostics().profile(0.3, interval=0.002)
+    finally:
+        stop.set()
+        busy.join()
+        idle.join()
+
+    lines = stacks.splitlines()
+    spinning = [line for line in lines if line.startswith("busy;")]
+    assert spinning
+    stack, count = spinning[0].rsplit(" ", 1)
+    assert stack.endswith("test_diagnostics:_spin")
+    assert int(count) > 10
+    assert not any(line.startswith("idle;") for line in lines)
+
+
+def test_only_one_profile_runs_at_a_time():
+    started = threading.Event()
+    errors = []
+
+    def second():
+        started.wait()
+        try:
+            sample_stacks(0.01)
+        except ProfilerBusy as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    started.set()
+    sample_stacks(0.2)
+    thread.join()
+    assert len(errors) == 1
+
+
+def test_memory_diff_points_at_the_allocation():
+    diagnostics = Diagnostics()
+    with pytest.raises(RuntimeError):
+        diagnostics.memory_diff()
+    diagnostics.memory_start(frames=5)
+    try:
+        leak = [bytearray(1024) for _ in range(500)]
+        diff = diagnostics.memory_diff(top=5)
+    finally:
+        diagnostics.memory_stop()
+
+    top = diff["stats"][0]
+    assert top["size_diff"] >= 500 * 1024
+    assert any("test_diagnostics.py" in frame for frame in top["traceback"])
+    assert len(leak) == 500
+
+
+def test_memory_diff_endpoint_is_a_post():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import routes_admin
+
+    diagnostics = Diagnostics()
+    app = FastAPI()
+    app.include_router(routes_admin.router)
+    app.dependency_overrides[routes_admin.get_diagnostics] = lambda: diagnostics
+    client = TestClient(app)
+
+    assert client.post("/admin/memory/diff").status_code == 409  # not started
+    client.post("/admin/memory/start")
+    try:
+        assert client.get("/admin/memory/diff").status_code == 405  # it moves the baseline
+        assert client.post("/admin/memory/diff", params={"top": 3}).status_code == 200
+    finally:
+        client.post("/admin/memory/stop")
@@ -0,0 +1,137 @@
+
+import asyncio
+import gzip
+import json
+from datetime import datetime
+from pydantic import BaseModel
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.encoding import CompressionMiddleware, EncodedCache, compress, encode_rows, negotiate_encoding
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+
+
+async def _rows(count: int):
+    for i in range(count):
+        yield Row(id=i, name=f"row-{i}")
+
+
+async def _collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("br, gzip;q=0.8") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") is None
+
+
+def test_encode_rows_ndjson_and_json():
+    lines = asyncio.run(_collect(encode_rows(_rows(3)))).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [0, 1, 2]
+
+    assert json.loads(asyncio.run(_collect(encode_rows(_rows(0), "json")))) == []
+    body = asyncio.run(_collect(encode_rows(_rows(5000), "json")))
+    assert [r["id"] for r in json.loads(body)] == list(range(5000))
+
+
+def test_gzip_stream_roundtrip():
+    body = asyncio.run(_collect(compress(encode_rows(_rows(5000)), "gzip")))
+    assert len(gzip.decompress(body).splitlines()) == 5000
+
+
+def test_encoded_cache_rebuilds_on_new_version():
+    cache = EncodedCache()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return b"x" * 1000
+
+    assert cache.get(1, build) == b"x" * 1000
+    assert gzip.decompress(cache.get(1, build, "gzip")) == b"x" * 1000
+    cache.get(1, build, "gzip")
+    assert len(builds) == 1
+    cache.get(2, build)
+    assert len(builds) == 2
+
+
+def test_compression_middleware_threshold():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/small")
+    def small():
+        return {"a": 1}
+
+    @app.get("/large")
+    def large():
+        return {"a": "x" * 1000}
+
+    client = TestClient(app)
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    r = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.json() == {"a": "x" * 1000}
+
+
+def test_small_metrics_are_not_compressed(monkeypatch):
+    from app.api import routes_status
+    from app.hardware.valve import MockValve
+    from app.services.repository import StateRepository
+
+    repo = StateRepository()
+    app = FastAPI()
+    app.include_router(routes_status.router)
+    app.dependency_overrides.update({
+        routes_status.get_state_repo: lambda: repo,
+        routes_status.get_controller: lambda: None,
+        routes_status.get_valve: MockValve,
+    })
+    client = TestClient(app)
+
+    r = client.get("/status/metrics", headers={"Accept-Encoding": "gzip"})
+    assert len(r.content) < routes_status.config.compress_min_bytes
+    assert "content-encoding" not in r.headers and r.json()["mode"] == "auto"
+
+    monkeypatch.setattr(routes_status.config, "compress_min_bytes", 100)
+    r = client.get("/status/metrics", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip" and r.json()["mode"] == "auto"
+
+
+def test_history_streams_litres_on_events_only(tmp_path, monkeypatch):
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.api import routes_history
+    from app.database.models import Base, SensorReading, WateringEvent
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'history.db'}")
+    started = datetime(2024, 6, 1, 4, 0)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            session.add(SensorReading(reading_type="soil", temperature_c=15.0, moisture_rel=0.3, timestamp=started))
+            session.add(WateringEvent(
+                started_at=started, duration_seconds=90, reason="scheduled", moisture_rel=0.3, litres=6.0,
+            ))
+            await session.commit()
+
+    asyncio.run(setup())
+    monkeypatch.setattr(routes_history, "get_engine", lambda: engine)
+    app = FastAPI()
+    app.include_router(routes_history.router)
+    client = TestClient(app)
+
+    readings = client.get("/history/readings", params={"format": "json"})
+    assert readings.status_code == 200
+    (reading,) = readings.json()
+    assert reading["moisture_rel"] == 0.3 and "litres" not in reading
+
+    events = client.get("/history/events", params={"format": "json"})
+    assert events.status_code == 200
+    (event,) = events.json()
+    assert event["litres"] == 6.0 and event["reason"] == "scheduled"
@@ -0,0 +1,124 @@
+
+import asyncio
+import json
+import threading
+from datetime import datetime
+from app.hardware.valve import MockValve, TimedValveWrapper
+from app.models import SoilReading
+from app.services.controller import WateringController
+from app.services.events import EventBus, ValveChanged
+from app.services.mqtt import MemoryBroker, MqttBridge, topic_matches
+from app.services.repository import StateRepository
+from app.services.valve_gate import ValveCommandGate
+
+
+def _soil(moisture: float) -> SoilReading:
+    return SoilReading(temperature_c=20.0, moisture_rel=moisture, timestamp=datetime(2024, 6, 1, 4, 0))
+
+
+def test_bus_delivers_across_threads_and_drops_oldest():
+    async def main():
+        bus = EventBus()
+        with bus.subscribe("valve", maxsize=2) as valve_events, bus.subscribe("readings") as readings:
+            publisher = threading.Thread(
+                target=lambda: [bus.publish(ValveChanged(is_open=i % 2 == 0)) for i in range(3)]
+            )
+            publisher.start()
+            publisher.join()
+            await asyncio.sleep(0)
+            got = [valve_events.get_nowait().is_open for _ in range(2)]
+            assert got == [False, True]
+            assert valve_events.dropped == 1
+            assert readings._queue.empty()
+        assert not bus.active
+
+    asyncio.run(main())
+
+
+def test_state_changes_become_events():
+    async def main():
+        bus = EventBus()
+        repo = StateRepository(events=bus)
+        ctrl = WateringController(None, MockValve(), repo)
+        with bus.subscribe() as events:
+            repo.set_soil(_soil(0.2))
+            repo.set_valve_open(True)
+            repo.set_valve_open(True)  # no change, no event
+            repo.set_mode("manual")
+            ctrl._auto_tick(datetime(2024, 6, 1, 4, 0), _soil(0.2))
+            await asyncio.sleep(0)
+            got = []
+            while not events._queue.empty():
+                got.append(events.get_nowait())
+
+        assert [e.topic for e in got] == ["readings/soil", "valve", "config/mode", "state"]
+        assert got[-1].state == "watering" and got[-1].previous == "idle"
+        assert got[-1].reason == "moisture below low threshold"
+
+    asyncio.run(main())
+
+
+def test_topic_filters():
+    assert topic_matches("irrigation/#", "irrigation/readings/soil")
+    assert topic_matches("irrigation/+/soil", "irrigation/readings/soil")
+    assert not topic_matches("irrigation/+", "irrigation/readings/soil")
+    assert not topic_matches("irrigation/valve", "irrigation/valve/result")
+
+
+def _bridge(broker: MemoryBroker, batch_interval: float = 0.05):
+    bus = EventBus()
+    repo = StateRepository(events=bus)
+    valve = TimedValveWrapper(MockValve())
+    gate = ValveCommandGate(valve, repo)
+    return MqttBridge(bus, broker.client(), repo, gate, batch_interval=batch_interval), repo, valve
+
+
+def test_bridge_sends_newest_value_per_topic_retained():
+    broker = MemoryBroker()
+
+    async def main():
+        bridge, repo, _ = _bridge(broker)
+        bridge.start()
+        for moisture in (0.30, 0.31, 0.32):
+            repo.set_soil(_soil(moisture))
+        repo.set_valve_open(True)
+        await asyncio.sleep(0.15)
+        await bridge.stop()
+
+    asyncio.run(main())
+    soil = [json.loads(p) for t, p, retain in broker.messages if t == "irrigation/readings/soil"]
+    assert [s["moisture_rel"] for s in soil] == [0.32]
+    assert json.loads(broker.retained["irrigation/valve"])["is_open"] is True
+    assert json.loads(broker.retained["irrigation/config/mode"])["values"] == {"mode": "auto"}
+    assert broker.retained["irrigation/status"] == b"offline"
+
+    # a late subscriber gets the last values straight away
+    seen = {}
+    broker.subscribe("irrigation/readings/#", lambda topic, payload: seen.setdefault(topic, payload))
+    assert set(seen) == {"irrigation/readings/soil"}
+
+
+def test_bridge_commands_go_through_the_valve_gate():
+    broker = MemoryBroker()
+    results = []
+    broker.subscribe("irrigation/cmd/+/result", lambda topic, payload: results.append(json.loads(payload)))
+
+    async def main():
+        bridge, repo, valve = _bridge(broker)
+        bridge.start()
+        broker.publish("irrigation/cmd/valve", json.dumps({"action": "open", "seconds": 30}))
+        assert valve.is_open and valve.deadline is not None
+        broker.publish("irrigation/cmd/valve", "close")
+        assert not valve.is_open
+        broker.publish("irrigation/cmd/valve", "explode")
+        broker.publish("irrigation/cmd/valve", json.dumps({"action": "open", "seconds": "x"}))
+        broker.publish("irrigation/cmd/valve", json.dumps({"action": "open", "seconds": -5}))
+        assert not valve.is_open and not repo.snapshot()["valve_open"]
+        broker.publish("irrigation/cmd/mode", "manual")
+        assert repo.snapshot()["mode"] == "manual"
+        await bridge.stop()
+
+    asyncio.run(main())
+    assert [r["ok"] for r in results] == [True, True, False, False, False, True]
+    assert results[3]["error"] == "seconds must be a positive integer"
+    assert results[0]["status"] == "accepted"
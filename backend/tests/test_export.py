@@ -0,0 +1,63 @@
+
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.database.models import Base, SensorReading
+from app.services import export
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc
+import pyarrow.parquet
+
+
+async def _seed(engine, t0: datetime, count: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add_all(
+            SensorReading(
+                reading_type="soil",
+                temperature_c=15.0,
+                moisture_rel=0.3 + i / 1000,
+                timestamp=t0 + timedelta(hours=i),
+            )
+            for i in range(count)
+        )
+        await session.commit()
+
+
+def test_export_partitions_by_day(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+    t0 = datetime(2024, 6, 1, 20, 0)
+
+    async def run():
+        await _seed(engine, t0, 30)
+        paths = await export.export_partitioned(engine, str(tmp_path / "out"), chunk_size=7)
+        await engine.dispose()
+        return paths
+
+    paths = asyncio.run(run())
+    assert [p.split("/")[-2] for p in paths] == ["day=2024-06-01", "day=2024-06-02", "day=2024-06-03"]
+    tables = [pyarrow.parquet.read_table(p) for p in paths]
+    assert [t.num_rows for t in tables] == [4, 24, 2]
+    assert tables[1].column("timestamp")[0].as_py() == datetime(2024, 6, 2, 0, 0)
+
+
+def test_arrow_stream_roundtrip(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite'}")
+    t0 = datetime(2024, 6, 1)
+
+    async def run():
+        await _seed(engine, t0, 10)
+        data = b"".join([
+            chunk async for chunk in export.arrow_stream(
+                engine, "readings", since=t0 + timedelta(hours=2), chunk_size=3
+            )
+        ])
+        await engine.dispose()
+        return data
+
+    table = pyarrow.ipc.open_stream(asyncio.run(run())).read_all()
+    assert table.num_rows == 8
+    assert table.column("reading_type").to_pylist() == ["soil"] * 8
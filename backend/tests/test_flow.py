@@ -0,0 +1,141 @@
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import inspect, text
+from app.config import HardwareConfig, config
+from app.database import engine as db
+from app.hardware.flow import FlowMeterInterface
+from app.hardware.sensors import SensorReaderInterface
+from app.hardware.valve import MockValve
+from app.models import SoilReading
+from app.services.controller import WateringController
+from app.services.repository import StateRepository
+
+
+class FakeSensors(SensorReaderInterface):
+    def read_air(self):
+        return None
+
+    def read_soil(self):
+        return SoilReading(temperature_c=20.0, moisture_rel=0.4, timestamp=datetime.utcnow())
+
+
+class FakeFlowMeter(FlowMeterInterface):
+    def __init__(self) -> None:
+        self.pulses_per_litre = 100.0
+        self.count = 0
+
+    @property
+    def pulses(self) -> int:
+        return self.count
+
+
+def _controller():
+    repo = StateRepository()
+    valve = MockValve()
+    meter = FakeFlowMeter()
+    ctrl = WateringController(FakeSensors(), valve, repo, flow_meter=meter)
+    return ctrl, repo, valve, meter
+
+
+def test_gpio_flow_meter_counts_every_edge():
+    pytest.importorskip("gpiozero")
+    from app.hardware.sim import SimHardware
+
+    hw = HardwareConfig(kind="sim", flow_pulses_per_litre=450.0)
+    sim = SimHardware()
+    meter = sim.flow_meter(hw)
+    seen = []
+
+    def reader():
+        while len(seen) < 200:
+            seen.append(meter.pulses)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    for _ in range(10):
+        sim.pulse(hw, 4500)
+    thread.join()
+
+    assert meter.pulses == 45000
+    assert meter.litres == pytest.approx(100.0)
+    assert seen == sorted(seen)
+    meter.close()
+
+
+def test_open_valve_flow_is_counted_per_event():
+    ctrl, repo, valve, meter = _controller()
+    now = datetime(2024, 6, 1, 4, 0)
+    ctrl._account_flow(now)
+
+    ctrl._state, ctrl._state_until, ctrl._reason = "watering", now + timedelta(seconds=90), "scheduled"
+    ctrl._publish_state(now)
+    valve.open()
+    meter.count += 600
+    ctrl._account_flow(now + timedelta(minutes=1))
+
+    snap = repo.snapshot()
+    assert snap["daily_watered_litres"] == pytest.approx(6.0)
+    assert snap["flow_lpm"] == pytest.approx(6.0)
+    assert snap["leak_detected"] is False
+
+    valve.close()
+    ctrl._state = "soak"
+    ctrl._publish_state(now + timedelta(minutes=1))
+    (event,) = ctrl._pending_events
+    assert event["litres"] == pytest.approx(6.0)
+    assert event["reason"] == "scheduled"
+    assert event["started_at"] == now and event["duration_seconds"] == 90
+
+
+def test_flow_with_valve_closed_is_a_leak():
+    ctrl, repo, valve, meter = _controller()
+    now = datetime(2024, 6, 1, 12, 0)
+    ctrl._account_flow(now)
+    for i in range(1, config.leak_confirm_ticks + 1):
+        assert repo.snapshot()["leak_detected"] is False
+        meter.count += 100
+        ctrl._account_flow(now + timedelta(minutes=i))
+
+    snap = repo.snapshot()
+    assert snap["leak_detected"] is True
+    assert snap["daily_watered_litres"] == 0.0
+
+    ctrl._account_flow(now + timedelta(minutes=10))
+    assert repo.snapshot()["leak_detected"] is False
+
+
+def test_litre_budget_stops_watering():
+    ctrl, repo, valve, meter = _controller()
+    repo.add_watered_litres(50.0)
+
+    assert ctrl._budget_used(repo.snapshot(), 20, None) is None
+    assert ctrl._budget_used(repo.snapshot(), 20, 40.0) == "daily litre budget used"
+    ctrl.flow_meter = None
+    assert ctrl._budget_used(repo.snapshot(), 20, 40.0) is None
+
+
+def test_create_tables_adds_new_columns(tmp_path, monkeypatch):
+    # keep the module-level engine of other tests untouched
+    monkeypatch.setattr(db, "_engine", None)
+    monkeypatch.setattr(db, "_session_maker", None)
+    url = f"sqlite+aiosqlite:///{tmp_path / 'old.db'}"
+
+    async def run():
+        db.init_db(url)
+        async with db.get_engine().begin() as conn:
+            await conn.execute(text(
+                "CREATE TABLE watering_events (id INTEGER PRIMARY KEY, started_at DATETIME NOT NULL,"
+                " duration_seconds INTEGER NOT NULL, reason VARCHAR(50) NOT NULL, moisture_rel FLOAT)"
+            ))
+        await db.create_tables()
+        async with db.get_engine().connect() as conn:
+            columns = await conn.run_sync(
+                lambda sync: [c["name"] for c in inspect(sync).get_columns("watering_events")]
+            )
+        await db.get_engine().dispose()
+        return columns
+
+    assert "litres" in asyncio.run(run())
@@ -0,0 +1,50 @@
+
+from datetime import datetime, timedelta
+from app.services.forecast import MoistureForecaster
+
+
+def _drying(forecaster: MoistureForecaster, start: datetime, hours: int, m0: float, rate: float):
+    for h in range(hours):
+        forecaster.add_sample(start + timedelta(hours=h), m0 + rate * h)
+
+
+def test_drying_rate_and_crossing():
+    f = MoistureForecaster(window_hours=24)
+    start = datetime(2024, 6, 1, 8, 0)
+    _drying(f, start, 10, 0.50, -0.01)
+
+    assert abs(f.drying_rate() - (-0.01)) < 1e-9
+    cross = f.predict_crossing(0.38, start + timedelta(hours=9))
+    assert cross == start + timedelta(hours=12)
+
+
+def test_rise_starts_new_segment_and_learns_gain():
+    f = MoistureForecaster(min_samples=3)
+    start = datetime(2024, 6, 1, 8, 0)
+    _drying(f, start, 5, 0.40, -0.01)
+    f.add_sample(start + timedelta(hours=5), 0.46)
+
+    assert f.drying_rate() is None
+    assert f.cycle_gain > 0.03
+
+
+def test_plan_schedules_cycles_when_dry_before_next_window():
+    f = MoistureForecaster()
+    start = datetime(2024, 6, 1, 8, 0)
+    _drying(f, start, 10, 0.45, -0.005)
+    now = start + timedelta(hours=9)
+
+    plan = f.plan(now, low=0.38, high=0.45, start_hour=3, end_hour=6, max_cycles=13)
+    assert plan.window_start == datetime(2024, 6, 2, 3, 0)
+    assert plan.cycles >= 1
+    assert plan.is_due(datetime(2024, 6, 2, 3, 30))
+    assert not plan.is_due(datetime(2024, 6, 2, 6, 0))
+
+
+def test_plan_skips_window_when_moist_enough():
+    f = MoistureForecaster()
+    start = datetime(2024, 6, 1, 8, 0)
+    _drying(f, start, 10, 0.60, -0.001)
+
+    plan = f.plan(start + timedelta(hours=9), low=0.38, high=0.45, start_hour=3, end_hour=6, max_cycles=13)
+    assert plan.cycles == 0
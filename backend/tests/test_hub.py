@@ -0,0 +1,165 @@
+
+import asyncio
+import json
+import time
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.api import routes_control, routes_status
+from app.hardware.valve import MockValve
+from app.services.repository import StateRepository
+from app.services.valve_gate import ValveCommandGate
+from client.sdk import AsyncIrrigationClient
+from hub.fleet import Fleet
+from hub.main import create_app
+# the routes validate readings against ``src.app.models``
+from src.app.models import SoilReading
+
+
+class IdleScheduler:
+    def wake(self) -> None:
+        pass
+
+
+def _node(moisture: float, history: list[tuple[str, float]] = ()) -> tuple[FastAPI, StateRepository]:
+    """One node: the real status and control routes over its own state, valve and DB."""
+    repo = StateRepository()
+    repo.set_soil(SoilReading(temperature_c=18.0, moisture_rel=moisture, timestamp="2024-06-01T04:00:00"))
+    valve = MockValve()
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    async def session():
+        async with AsyncSession(engine) as s:
+            yield s
+
+    app = FastAPI()
+    app.include_router(routes_status.router)
+    app.include_router(routes_control.router)
+    app.dependency_overrides.update({
+        routes_status.get_state_repo: lambda: repo,
+        routes_status.get_controller: lambda: None,
+        routes_status.get_valve: lambda: valve,
+        routes_control.get_session: session,
+        routes_control.get_valve: lambda: valve,
+        routes_control.get_state_repo: lambda: repo,
+        routes_control.get_scheduler: IdleScheduler,
+        routes_control.get_valve_gate: lambda: ValveCommandGate(valve, repo),
+    })
+
+    @app.get("/history/readings")
+    def readings():
+        rows = [{"timestamp": ts, "reading_type": "soil", "moisture_rel": m} for ts, m in history]
+        return Response("".join(json.dumps(r) + "\n" for r in rows), media_type="application/x-ndjson")
+
+    return app, repo
+
+
+def _slow_node() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/status/metrics")
+    async def metrics():
+        await asyncio.sleep(5)
+
+    return app
+
+
+def _fleet(apps: dict[str, FastAPI], timeout: float = 0.5) -> Fleet:
+    def client(url: str) -> AsyncIrrigationClient:
+        app = apps.get(url)
+        if app is None:
+            def refuse(request):
+                raise httpx.ConnectError("connection refused", request=request)
+            return AsyncIrrigationClient(url, retries=0, transport=httpx.MockTransport(refuse))
+        return AsyncIrrigationClient(url, retries=0, transport=httpx.ASGITransport(app))
+
+    nodes = {url.removeprefix("http://"): url for url in [*apps, "http://down"]}
+    return Fleet(timeout=timeout, nodes=nodes, client_factory=client)
+
+
+def test_fleet_polls_nodes_concurrently_with_per_node_timeouts():
+    front, _ = _node(0.30)
+    back, _ = _node(0.42)
+    fleet = _fleet({"http://front": front, "http://back": back, "http://slow": _slow_node()})
+
+    async def main():
+        started = time.perf_counter()
+        view = await fleet.poll()
+        elapsed = time.perf_counter() - started
+        await fleet.stop()
+        return view, elapsed
+
+    view, elapsed = asyncio.run(main())
+    assert elapsed < 1.5  # one timeout, not the sum of them
+    nodes = {n.name: n for n in view.nodes}
+    assert nodes["front"].online and nodes["front"].metrics["soil"]["moisture_rel"] == 0.30
+    assert nodes["back"].online
+    assert not nodes["slow"].online and nodes["slow"].error == "timeout"
+    assert not nodes["down"].online and "refused" in nodes["down"].error
+    assert view.summary.nodes == 4 and view.summary.online == 2
+    assert fleet.view() is view
+
+
+def test_fleet_batch_fans_out_and_refreshes_the_view():
+    front, front_repo = _node(0.30)
+    back, back_repo = _node(0.42)
+    fleet = _fleet({"http://front": front, "http://back": back})
+
+    async def main():
+        await fleet.poll()
+        results = await fleet.batch([{"type": "mode", "mode": "manual"}, {"type": "valve", "action": "open"}])
+        view = fleet.view()
+        await fleet.stop()
+        return results, view
+
+    results, view = asyncio.run(main())
+    assert results["front"]["ok"] and results["back"]["ok"]
+    assert results["front"]["results"][1]["detail"] == {"action": "open", "seconds": None}
+    assert not results["down"]["ok"]
+    assert front_repo.snapshot()["mode"] == back_repo.snapshot()["mode"] == "manual"
+    assert view.summary.valves_open == 2
+
+
+def test_fleet_history_aligns_nodes_into_buckets():
+    front, _ = _node(0.3, [("2024-06-01T04:10:00", 0.30), ("2024-06-01T04:50:00", 0.34)])
+    back, _ = _node(0.4, [("2024-06-01T05:20:00", 0.40)])
+    fleet = _fleet({"http://front": front, "http://back": back})
+
+    async def main():
+        history = await fleet.history(bucket_minutes=60)
+        await fleet.stop()
+        return history
+
+    history = asyncio.run(main())
+    assert [p["values"] for p in history["points"]] == [
+        {"front": 0.32, "back": None},
+        {"front": None, "back": 0.4},
+    ]
+    assert [p["timestamp"].hour for p in history["points"]] == [4, 5]
+    assert set(history["errors"]) == {"down"}
+
+
+def test_hub_api():
+    front, _ = _node(0.30)
+    fleet = _fleet({"http://front": front})
+
+    async def main():
+        app = create_app(fleet)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://hub") as hub:
+                await fleet.poll()
+                first = await hub.get("/fleet")
+                cached = await hub.get("/fleet", headers={"If-None-Match": first.headers["etag"]})
+                batch = await hub.post(
+                    "/fleet/batch", json={"commands": [{"type": "mode", "mode": "auto"}], "nodes": ["nope"]}
+                )
+                removed = await hub.delete("/fleet/nodes/down")
+                return first, cached, batch, removed, await hub.get("/fleet/nodes")
+
+    first, cached, batch, removed, nodes = asyncio.run(main())
+    assert first.json()["summary"]["online"] == 1
+    assert cached.status_code == 304
+    assert batch.status_code == 404
+    assert removed.status_code == 200
+    assert nodes.json() == {"front": "http://front"}
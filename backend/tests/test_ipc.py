@@ -0,0 +1,216 @@
+import asyncio
+import subprocess
+import sys
+from datetime import datetime
+import pytest
+from app.hardware.valve import MockValve
+from app.models import SoilReading
+from app.services.ipc import (
+    ControlClient,
+    ControlServer,
+    RemoteScheduler,
+    RemoteStateRepository,
+    RemoteValve,
+    RemoteValveGate,
+)
+from app.services.leader import LeaderLock
+from app.services.repository import StateRepository
+from app.services.valve_gate import ValveCommandGate
+
+
+class Scheduler:
+    wakes = 0
+
+    def wake(self) -> None:
+        self.wakes += 1
+
+
+def _leader(path: str):
+    repo = StateRepository()
+    valve = MockValve()
+    scheduler = Scheduler()
+    server = ControlServer(path, repo, valve, None, scheduler, ValveCommandGate(valve, repo))
+    server.start()
+    return server, repo, valve, scheduler
+
+
+def test_only_one_process_holds_the_lock(tmp_path):
+    path = str(tmp_path / "controller.lock")
+    leader, follower = LeaderLock(path), LeaderLock(path)
+    assert leader.try_acquire() and leader.is_leader
+    assert not follower.try_acquire() and not follower.is_leader
+    leader.release()
+    assert follower.try_acquire()
+    follower.release()
+
+
+def test_lock_is_dropped_when_the_leader_dies(tmp_path):
+    path = str(tmp_path / "controller.lock")
+    leader = subprocess.Popen(
+        [sys.executable, "-c", (
+            "import sys, time\n"
+            "from app.services.leader import LeaderLock\n"
+            f"assert LeaderLock({path!r}).try_acquire()\n"
+            "print('leading', flush=True)\n"
+            "time.sleep(60)\n"
+        )],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        assert leader.stdout.readline() == b"leading\n"
+        follower = LeaderLock(path)
+        assert not follower.try_acquire()
+    finally:
+        leader.kill()
+        leader.wait()
+    assert follower.try_acquire()
+    follower.release()
+
+
+def test_remote_proxies_round_trip(tmp_path):
+    path = str(tmp_path / "controller.sock")
+    server, repo, valve, scheduler = _leader(path)
+    client = ControlClient(path)
+    try:
+        repo.set_soil(SoilReading(temperature_c=18.0, moisture_rel=0.31, timestamp=datetime(2024, 6, 1, 4, 0)))
+        remote_repo = RemoteStateRepository(client)
+        remote_repo.set_mode("manual")
+        snap = remote_repo.snapshot()
+        assert snap["mode"] == "manual" == repo.snapshot()["mode"]
+        assert snap["soil"].moisture_rel == 0.31
+
+        remote_valve = RemoteValve(client)
+        remote_valve.open()
+        assert valve.is_open and remote_valve.is_open
+        remote_valve.close()
+        assert not remote_valve.is_open
+
+        gate = RemoteValveGate(client)
+        assert gate.submit("tab-1", "open").status == "accepted"
+        assert gate.submit("tab-2", "open").status == "merged"
+        RemoteScheduler(client).wake()
+        assert scheduler.wakes == 1
+
+        with pytest.raises(RuntimeError, match="Unknown op"):
+            client.call("nope")
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_followers_reconnect_to_a_new_leader(tmp_path):
+    path = str(tmp_path / "controller.sock")
+    old = subprocess.Popen(
+        [sys.executable, "-c", (
+            "import time\n"
+            "from app.hardware.valve import MockValve\n"
+            "from app.services.ipc import ControlServer\n"
+            "from app.services.repository import StateRepository\n"
+            f"ControlServer({path!r}, StateRepository(), MockValve(), None, None, None).start()\n"
+            "print('serving', flush=True)\n"
+            "time.sleep(60)\n"
+        )],
+        stdout=subprocess.PIPE,
+    )
+    client = ControlClient(path)
+    remote_repo = RemoteStateRepository(client)
+    server = None
+    try:
+        assert old.stdout.readline() == b"serving\n"
+        remote_repo.set_mode("manual")
+        assert remote_repo.snapshot()["mode"] == "manual"
+        old.kill()  # the leader dies
+        old.wait()
+        with pytest.raises(OSError):
+            remote_repo.snapshot()
+
+        server, repo, _, _ = _leader(path)  # a promoted follower takes over the socket
+        assert remote_repo.snapshot()["mode"] == "auto"
+        remote_repo.set_mode("manual")
+        assert repo.snapshot()["mode"] == "manual"
+    finally:
+        old.kill()
+        client.close()
+        if server is not None:
+            server.stop()
+
+
+def test_follower_is_promoted_once_it_gets_the_lock(tmp_path, monkeypatch):
+    from app import main
+
+    path = str(tmp_path / "controller.lock")
+    leader, follower = LeaderLock(path), LeaderLock(path)
+    assert leader.try_acquire()
+    started = []
+
+    async def lead():
+        started.append(follower.is_leader)
+        return "stop"
+
+    monkeypatch.setattr(main, "_lead", lead)
+    monkeypatch.setattr(main.config, "leader_poll_sec", 0.01)
+
+    async def run():
+        promoted = []
+        task = asyncio.create_task(main._follow(follower, promoted))
+        await asyncio.sleep(0.05)
+        assert not task.done() and started == []
+        leader.release()
+        await asyncio.wait_for(task, 1)
+        return promoted
+
+    assert asyncio.run(run()) == ["stop"]
+    assert started == [True]
+    follower.release()
+
+
+def _one_shot_server(path: str, reply):
+    """Accepts connections and records each request line; ``reply(conn)`` decides the answer."""
+    import socket
+    import threading
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    received = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn, conn.makefile("rb") as lines:
+                received.append(lines.readline())
+                reply(conn)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server, received
+
+
+def test_requests_that_reached_the_leader_are_not_resent(tmp_path):
+    import time
+
+    path = str(tmp_path / "slow.sock")
+    server, received = _one_shot_server(path, lambda conn: time.sleep(0.3))
+    client = ControlClient(path, timeout=0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            client.call("valve_open_for", seconds=30)
+        time.sleep(0.3)
+        assert len(received) == 1
+    finally:
+        client.close()
+        server.close()
+
+    path = str(tmp_path / "closing.sock")
+    server, received = _one_shot_server(path, lambda conn: None)  # reads, then hangs up
+    client = ControlClient(path)
+    try:
+        with pytest.raises(ConnectionError):
+            client.call("set_mode", mode="manual")
+        time.sleep(0.1)
+        assert len(received) == 1
+    finally:
+        client.close()
+        server.close()
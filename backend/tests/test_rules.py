@@ -0,0 +1,162 @@
+
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from app.hardware.sensors import MockSensorReader
+from app.hardware.valve import MockValve
+from app.models import AirReading, SoilReading
+from app.services.controller import WateringController
+from app.services.decision import DecisionParams, decide
+from app.services.repository import StateRepository
+from app.services.rules import RuleSet, compile_condition, compile_rule, facts
+
+
+def _facts(now: datetime, moisture=0.3, air_c=None, last_cycle_at=None, watered_seconds=0):
+    soil = SoilReading(temperature_c=15.0, moisture_rel=moisture, timestamp=now)
+    air = AirReading(temperature_c=air_c, humidity_rel=60.0, timestamp=now) if air_c is not None else None
+    return facts(now, soil, air, None, watered_seconds, None, last_cycle_at)
+
+
+def test_conditions_compile_to_predicates():
+    sunday_night = datetime(2024, 6, 2, 23, 30)
+    monday_noon = datetime(2024, 6, 3, 12, 0)
+    frost = compile_condition({"field": "air.temperature_c", "op": "<", "value": 4})
+    assert frost(_facts(monday_noon, air_c=2.5)) and not frost(_facts(monday_noon, air_c=8.0))
+    assert not frost(_facts(monday_noon))  # no air reading never matches
+
+    night = compile_condition({"field": "time", "op": "between", "value": ["22:00", "02:00"]})
+    assert night(_facts(sunday_night)) and not night(_facts(monday_noon))
+    weekend = compile_condition({"field": "weekday", "op": "in", "value": ["sat", "Sunday"]})
+    assert weekend(_facts(sunday_night)) and not weekend(_facts(monday_noon))
+
+    recent = compile_condition({"field": "minutes_since_watering", "op": "<", "value": 60})
+    assert recent(_facts(monday_noon, last_cycle_at=monday_noon - timedelta(minutes=30)))
+    assert not recent(_facts(monday_noon))
+
+    for bad in (
+        {"field": "soil.ph", "op": "<", "value": 7},
+        {"field": "time", "op": "~", "value": 1},
+        {"field": "time", "op": ">", "value": "25:00"},
+        {"field": "weekday", "op": "in", "value": []},
+        {"field": "air.temperature_c", "op": "between", "value": [10, 0]},
+        {"field": "air.temperature_c", "op": "<", "value": "cold"},
+    ):
+        with pytest.raises(ValueError):
+            compile_condition(bad)
+    with pytest.raises(ValueError):
+        compile_rule({"action": "flood", "conditions": []})
+
+
+def test_skip_rules_win_and_priority_orders_matches():
+    rules = RuleSet([
+        {"name": "evening top-up", "action": "water", "priority": 0, "conditions": [
+            {"field": "time", "op": "between", "value": ["18:00", "19:00"]},
+            {"field": "soil.moisture_rel", "op": "<", "value": 0.42},
+        ]},
+        {"name": "frost guard", "action": "skip", "priority": 10, "conditions": [
+            {"field": "air.temperature_c", "op": "<", "value": 4},
+        ]},
+        {"name": "late", "action": "skip", "conditions": [{"field": "time", "op": ">=", "value": "18:30"}]},
+    ])
+    evening = datetime(2024, 6, 3, 18, 10)
+    assert rules.evaluate(_facts(evening)) == (None, "rule 'evening top-up'")
+    assert rules.evaluate(_facts(evening, air_c=1.0)) == ("skipped by rule 'frost guard'", None)
+    assert rules.evaluate(_facts(evening + timedelta(minutes=30), air_c=1.0))[0] == "skipped by rule 'frost guard'"
+    assert rules.evaluate(_facts(evening, moisture=0.5)) == (None, None)
+    assert not RuleSet() and rules.count == 3
+
+
+def test_decide_applies_rule_verdicts():
+    params = DecisionParams(0.38, 0.45, 90, 8, 20, None, 3, 6)
+    at = datetime(2024, 6, 1, 4, 0)
+    blocked = decide("idle", None, at, 0.30, params, blocked="skipped by rule 'frost guard'")
+    assert (blocked.state, blocked.reason, blocked.start_cycle) == ("idle", "skipped by rule 'frost guard'", False)
+    assert decide("idle", None, at, 0.40, params, blocked="skipped").reason is None  # nothing to skip
+    assert decide("soak", at, at, 0.30, params, blocked="skipped").state == "idle"
+    evening = decide("idle", None, at.replace(hour=18), 0.40, params, requested="rule 'top-up'")
+    assert evening.start_cycle and evening.reason == "rule 'top-up'"
+    assert decide("idle", None, at.replace(hour=18), 0.50, params, requested="rule 'top-up'").state == "idle"
+
+
+def test_controller_skips_watering_on_frost():
+    repo = StateRepository()
+    valve = MockValve()
+    ctrl = WateringController(MockSensorReader(), valve, repo)
+    ctrl._rules = RuleSet([{"name": "frost guard", "action": "skip", "conditions": [
+        {"field": "air.temperature_c", "op": "<", "value": 4},
+    ]}])
+    now = datetime(2024, 6, 1, 4, 0)
+    dry = SoilReading(temperature_c=5.0, moisture_rel=0.2, timestamp=now)
+
+    repo.set_air(AirReading(temperature_c=1.5, humidity_rel=90.0, timestamp=now))
+    ctrl._auto_tick(now, dry)
+    assert ctrl.state == "idle" and not valve.is_open
+    assert ctrl._reason == "skipped by rule 'frost guard'"
+
+    repo.set_air(AirReading(temperature_c=6.0, humidity_rel=80.0, timestamp=now))
+    ctrl._auto_tick(now + timedelta(minutes=1), dry)
+    assert ctrl.state == "watering" and valve.is_open
+    assert ctrl._last_cycle_at == now + timedelta(minutes=1)
+
+
+def test_rules_api_validates_and_wakes_the_controller(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.api import routes_rules
+    from app.database.models import Base
+    from app.database.repository import RuleRepository
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rules.db'}")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def session():
+        async with AsyncSession(engine, expire_on_commit=False) as s:
+            yield s
+
+    class Scheduler:
+        wakes = 0
+
+        def wake(self):
+            self.wakes += 1
+
+    asyncio.run(setup())
+    scheduler = Scheduler()
+    app = FastAPI()
+    app.include_router(routes_rules.router)
+    app.dependency_overrides.update({
+        routes_rules.get_session: session,
+        routes_rules.get_scheduler: lambda: scheduler,
+    })
+    client = TestClient(app)
+
+    frost = {"name": "frost guard", "action": "skip", "priority": 5, "conditions": [
+        {"field": "air.temperature_c", "op": "<", "value": 4},
+    ]}
+    created = client.post("/rules", json=frost)
+    assert created.status_code == 201
+    rule_id = created.json()["id"]
+    bad = dict(frost, conditions=[{"field": "air.temperature_c", "op": "<", "value": "cold"}])
+    assert client.post("/rules", json=bad).status_code == 422
+    assert client.put(f"/rules/{rule_id}", json={"conditions": bad["conditions"]}).status_code == 422
+    assert client.put(f"/rules/{rule_id}", json={"action": "nope"}).status_code == 422
+
+    updated = client.put(f"/rules/{rule_id}", json={"enabled": False}).json()
+    assert updated["enabled"] is False and updated["conditions"] == frost["conditions"]
+    client.post("/rules", json={"name": "weekend", "action": "water", "conditions": [
+        {"field": "weekday", "op": "in", "value": ["sat", "sun"]},
+    ]})
+    assert [r["name"] for r in client.get("/rules").json()] == ["frost guard", "weekend"]
+
+    async def specs():
+        async with AsyncSession(engine) as s:
+            return await RuleRepository(s).specs()
+    assert [s["name"] for s in asyncio.run(specs())] == ["weekend"]  # only enabled rules are compiled
+    assert RuleSet(asyncio.run(specs())).count == 1
+
+    assert client.delete(f"/rules/{rule_id}").status_code == 200
+    assert client.delete(f"/rules/{rule_id}").status_code == 404
+    assert scheduler.wakes == 4
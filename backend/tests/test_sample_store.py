@@ -0,0 +1,141 @@
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+import pytest
+from app.database.repository import SensorReadingRepository
+from app.database.sample_store import HEADER, RECORD, SampleStore
+
+
+T0 = datetime(2024, 6, 1, 23, 50)
+
+
+def _fill(store: SampleStore, n: int, step=timedelta(seconds=1)) -> None:
+    store.append_many(
+        (T0 + i * step, "soil" if i % 4 else "air", 20.0 + i % 7, 55.0 if i % 4 == 0 else None, 0.3 + i % 10 / 100)
+        for i in range(n)
+    )
+
+
+def test_appends_roll_over_into_daily_segments_and_read_back(tmp_path):
+    store = SampleStore(str(tmp_path), flush_interval=60)
+    _fill(store, 1800)  # 23:50 to 00:20
+    assert store.days() == [T0.date(), T0.date() + timedelta(days=1)]
+    assert os.path.getsize(tmp_path / "2024-06-01.seg") == HEADER.size + 600 * RECORD.size
+
+    rows = list(store.rows(T0 + timedelta(seconds=598), T0 + timedelta(seconds=602)))
+    assert [r[0] for r in rows] == [T0 + timedelta(seconds=s) for s in range(598, 602)]
+    assert rows[2] == (datetime(2024, 6, 2), "air", 25.0, 55.0, 0.3)
+    assert rows[1][3] is None and rows[1][4] == 0.39  # float32 shown with its own digits
+    soil = list(store.rows(reading_type="soil", newest_first=True))
+    assert len(soil) == 1350 and soil[0][0] == T0 + timedelta(seconds=1799)
+
+    # an older sample arriving late keeps its segment ordered
+    store.append("soil", moisture_rel=0.5, timestamp=T0 + timedelta(minutes=5))
+    assert list(store.rows(T0 + timedelta(seconds=599), T0 + timedelta(seconds=600)))[-1][4] == 0.5
+    store.close()
+
+
+def test_numpy_views_and_hourly_means(tmp_path):
+    np = pytest.importorskip("numpy")
+    store = SampleStore(str(tmp_path))
+    _fill(store, 1800)
+    day = store.read(T0, T0 + timedelta(minutes=10))
+    assert len(day) == 600 and not day.flags.owndata  # a view of the mapped file
+    assert day["ts"][0] == np.datetime64(T0)
+    assert np.isnan(day["humidity_rel"][1])
+    both = store.read(T0 + timedelta(minutes=9), T0 + timedelta(minutes=11))
+    assert len(both) == 120 and both["ts"][-1] == np.datetime64(T0 + timedelta(seconds=659))
+
+    trend = store.hourly_mean(T0)
+    assert [hour for hour, _ in trend] == [datetime(2024, 6, 1, 23), datetime(2024, 6, 2, 0)]
+    soil = [r[4] for r in store.rows(T0, datetime(2024, 6, 2), "soil")]
+    assert trend[0][1] == pytest.approx(sum(soil) / len(soil), abs=1e-6)
+    store.close()
+
+
+def test_torn_tail_is_recovered_on_the_next_append(tmp_path):
+    store = SampleStore(str(tmp_path))
+    _fill(store, 100)
+    store.close()
+    path = tmp_path / "2024-06-01.seg"
+    with open(path, "ab") as f:
+        f.write(b"\0" * RECORD.size * 2)  # zero-filled pages left by a crash
+        f.write(b"\x01\x02\x03")          # and half a record
+    reader = SampleStore(str(tmp_path))
+    assert len(list(reader.rows())) == 102  # readers only see whole records
+
+    store = SampleStore(str(tmp_path))
+    store.append("soil", moisture_rel=0.4, timestamp=T0 + timedelta(seconds=100))
+    store.flush()
+    assert os.path.getsize(path) == HEADER.size + 101 * RECORD.size
+    rows = list(reader.rows())
+    assert len(rows) == 101 and rows[-1][0] == T0 + timedelta(seconds=100)
+    store.close()
+
+
+def test_the_last_buffered_sample_is_flushed_on_a_timer(tmp_path):
+    store = SampleStore(str(tmp_path), flush_interval=0.05)
+    reader = SampleStore(str(tmp_path))
+    store.append("soil", moisture_rel=0.4, timestamp=T0)
+    store.append("soil", moisture_rel=0.41, timestamp=T0 + timedelta(seconds=5))
+    assert list(reader.rows()) == []  # both buffered, and no more samples arrive
+
+    deadline = time.monotonic() + 2
+    while len(list(reader.rows())) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [r[4] for r in reader.rows()] == pytest.approx([0.4, 0.41])
+    store.close()
+
+
+def test_repository_uses_the_store_as_backend(tmp_path):
+    store = SampleStore(str(tmp_path), flush_interval=60)
+    repo = SensorReadingRepository(session=None, store=store)
+
+    async def run():
+        created = await repo.create("soil", temperature_c=18.5, moisture_rel=0.41)
+        await repo.create("air", temperature_c=21.0, humidity_rel=60.0)
+        recent = await repo.get_recent("soil", limit=5)
+        streamed = [r async for r in repo.stream("air")]
+        series = await repo.moisture_series(created.timestamp - timedelta(minutes=1))
+        trend = await repo.hourly_moisture(created.timestamp - timedelta(hours=1))
+        return created, recent, streamed, series, trend
+
+    created, recent, streamed, series, trend = asyncio.run(run())
+    assert [(r.timestamp, r.moisture_rel) for r in recent] == [(created.timestamp, 0.41)]
+    assert streamed[0].humidity_rel == 60.0 and streamed[0].moisture_rel is None
+    assert series == [(created.timestamp, 0.41)]
+    assert len(trend) == 1 and trend[0][1] == pytest.approx(0.41)
+    store.close()
+
+
+def test_raw_samples_do_not_invalidate_read_models_every_tick(tmp_path, monkeypatch):
+    from app.hardware.valve import MockValve
+    from app.models import SoilReading
+    from app.services.controller import WateringController
+    from app.services.repository import StateRepository
+    # the controller imports these through ``src.app``
+    from src.app.database import engine as db, sample_store
+
+    monkeypatch.setattr(db, "_engine", None)
+    monkeypatch.setattr(db, "_session_maker", None)
+    db.init_db(f"sqlite+aiosqlite:///{tmp_path / 'history.db'}")
+    store = SampleStore(str(tmp_path / "samples"), flush_interval=60)
+    monkeypatch.setattr(sample_store, "_store", store)
+    repo = StateRepository()
+    ctrl = WateringController(None, MockValve(), repo)
+
+    async def run():
+        versions = []
+        for i in range(121):  # ten minutes of 5 s ticks
+            now = T0 + timedelta(seconds=5 * i)
+            await ctrl._record_history(now, SoilReading(temperature_c=18.0, moisture_rel=0.4, timestamp=now))
+            versions.append(repo.snapshot()["data_version"])
+        await db.get_engine().dispose()
+        return versions
+
+    versions = asyncio.run(run())
+    assert len(list(store.rows())) == 121  # every sample is stored
+    assert len(set(versions)) == 3  # but read models go stale once per history interval
+    store.close()
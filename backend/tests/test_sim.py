@@ -0,0 +1,58 @@
+
+import pytest
+from app.config import HardwareConfig
+
+pytest.importorskip("adafruit_sht31d")
+pytest.importorskip("adafruit_ads1x15")
+pytest.importorskip("gpiozero")
+
+from app.hardware.sim import SimHardware, sht31_crc
+
+
+@pytest.fixture
+def sim(tmp_path):
+    hardware = SimHardware(w1_root=str(tmp_path / "w1"))
+    hardware.sht31.temperature_c = 24.5
+    hardware.sht31.humidity_rel = 61.0
+    hardware.w1.set_temperature(hardware.soil_sensor_id, 17.25)
+    return hardware
+
+
+def test_sht31_crc_matches_datasheet_example():
+    assert sht31_crc(b"\xbe\xef") == 0x92
+
+
+def test_real_drivers_read_simulated_chips(sim):
+    hw = HardwareConfig(kind="sim")
+    sim.set_moisture(0.25, hw)
+    reader = sim.sensor_reader(hw)
+
+    air = reader.read_air()
+    assert air.temperature_c == pytest.approx(24.5, abs=0.01)
+    assert air.humidity_rel == pytest.approx(61.0, abs=0.01)
+    soil = reader.read_soil()
+    assert soil.temperature_c == pytest.approx(17.25)
+    assert soil.moisture_rel == pytest.approx(0.25, abs=0.001)
+
+    valve = sim.valve(hw)
+    valve.open()
+    assert sim.valve_pin_state(hw) is True
+    valve.close()
+    assert sim.valve_pin_state(hw) is False
+
+
+def test_injected_faults_surface_as_missing_readings(sim):
+    hw = HardwareConfig(kind="sim")
+    reader = sim.sensor_reader(hw)
+
+    sim.sht31.corrupt_crc = True
+    assert reader.read_air() is None
+    sim.bus.fail_next()
+    assert reader.read_air() is None
+    assert reader.read_air() is not None
+
+    sim.w1.set_fault(sim.soil_sensor_id, "reset")
+    assert reader.read_soil() is None
+    sim.w1.set_fault(sim.soil_sensor_id, None)
+    sim.bus.detach(sim.ads.address)
+    assert reader.read_soil() is None
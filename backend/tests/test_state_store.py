@@ -0,0 +1,67 @@
+
+from datetime import datetime, timedelta
+from app.services.controller import WateringController
+from app.services.repository import StateRepository
+from app.services.state_store import StateStore
+from app.hardware.valve import MockValve
+from app.hardware.sensors import MockSensorReader
+
+
+def test_state_survives_restart(tmp_path):
+    store = StateStore(str(tmp_path / "state.json"))
+    now = datetime.utcnow()
+    until = now + timedelta(seconds=60)
+
+    repo = StateRepository(store=store)
+    repo.reset_daily_if_needed(now)
+    repo.set_mode("auto")
+    repo.add_watered_seconds(90)
+    repo.set_controller_state("watering", until)
+
+    snap = StateRepository(store=store).snapshot()
+    assert snap["controller_state"] == "watering"
+    assert snap["state_until"] == until
+    assert snap["daily_watered_seconds"] == 90
+
+
+def test_corrupt_state_file_is_ignored(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json")
+
+    snap = StateRepository(store=StateStore(str(path))).snapshot()
+    assert snap["mode"] == "auto"
+    assert snap["controller_state"] == "idle"
+
+
+def test_controller_resumes_watering(tmp_path):
+    store = StateStore(str(tmp_path / "state.json"))
+    StateRepository(store=store).set_controller_state(
+        "watering", datetime.utcnow() + timedelta(seconds=30)
+    )
+
+    valve = MockValve()
+    ctrl = WateringController(MockSensorReader(), valve, StateRepository(store=store))
+    assert ctrl.state == "watering"
+    assert valve.is_open
+
+
+class CountingStore(StateStore):
+    saves = 0
+
+    def save(self, record: dict) -> None:
+        self.saves += 1
+        super().save(record)
+
+
+def test_litres_are_saved_on_transitions_not_every_tick(tmp_path):
+    store = CountingStore(str(tmp_path / "state.json"))
+    repo = StateRepository(store=store)
+    repo.set_valve_open(True)
+    for _ in range(10):
+        repo.add_watered_litres(0.5)
+    assert store.saves == 0
+    assert repo.snapshot()["daily_watered_litres"] == 5.0
+
+    repo.set_valve_open(False)
+    assert store.saves == 1
+    assert StateRepository(store=store).snapshot()["daily_watered_litres"] == 5.0
@@ -0,0 +1,109 @@
+
+import json
+from datetime import datetime
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.hardware.sensors import SensorReaderInterface
+from app.hardware.valve import MockValve
+from app.models import SoilReading
+from app.services.controller import WateringController
+from app.services.ipc import ControlClient, ControlServer
+from app.services.repository import StateRepository
+# the instrumented modules import the tracer as ``src.app...``, so configure that one
+from src.app.services.tracing import NOOP, TraceFile, Tracer, TracingMiddleware, merge, tracer
+
+
+class WetSensors(SensorReaderInterface):
+    def read_air(self):
+        return None
+
+    def read_soil(self):
+        return SoilReading(temperature_c=20.0, moisture_rel=0.8, timestamp=datetime.utcnow())
+
+
+def _events(path) -> list[dict]:
+    text = path.read_text()
+    return [e for e in json.loads(text.rstrip().rstrip(",") + "]") if e["ph"] == "X"]
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = tmp_path / "trace.json"
+    tracer.configure(str(path), sample_rate=1.0)
+    yield path
+    tracer.configure(None)
+
+
+def test_untraced_code_gets_the_shared_noop_span(tmp_path):
+    off = Tracer()
+    assert off.start_trace("tick", "controller") is NOOP
+    assert off.span("read", "controller") is NOOP
+
+    never = Tracer()
+    never.configure(str(tmp_path / "t.json"), sample_rate=0.0)
+    assert never.start_trace("tick", "controller") is NOOP
+    assert never.span("read", "controller") is NOOP
+    # an explicit trace id is always followed
+    assert never.start_trace("GET /status", "http", "abc") is not NOOP
+    assert not (tmp_path / "t.json").exists()
+
+
+def test_tick_spans_share_one_trace(trace_path):
+    valve = MockValve()
+    valve.open()
+    ctrl = WateringController(WetSensors(), valve, StateRepository())
+    ctrl.state_repo.set_mode("auto")
+    ctrl.tick()
+
+    events = _events(trace_path)
+    names = {e["name"] for e in events}
+    assert {"tick", "read_sensors", "sensor_health", "sync_valve", "MockValve.close"} <= names
+    assert len({e["args"]["trace_id"] for e in events}) == 1
+    tick = next(e for e in events if e["name"] == "tick")
+    close = next(e for e in events if e["name"] == "MockValve.close")
+    assert tick["ts"] <= close["ts"] and close["ts"] + close["dur"] <= tick["ts"] + tick["dur"]
+
+
+def test_request_trace_id_reaches_the_valve(trace_path, tmp_path):
+    valve = MockValve()
+    repo = StateRepository()
+    server = ControlServer(str(tmp_path / "ctl.sock"), repo, valve, None, None, None)
+    server.start()
+    client = ControlClient(server.path)
+
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.post("/valve/{action}")
+    def command(action: str):
+        client.call("valve_open" if action == "open" else "valve_close")
+        return {"ok": True}
+
+    try:
+        response = TestClient(app).post("/valve/open", headers={"X-Trace-Id": "feedc0de"})
+    finally:
+        client.close()
+        server.stop()
+
+    assert response.headers["X-Trace-Id"] == "feedc0de"
+    assert valve.is_open
+    events = {e["name"]: e for e in _events(trace_path)}
+    assert {"POST /valve/{action}", "ipc valve_open", "MockValve.open"} <= set(events)
+    assert all(e["args"]["trace_id"] == "feedc0de" for e in events.values())
+    assert events["POST /valve/{action}"]["args"]["status"] == 200
+
+
+def test_trace_file_rotates_and_merges(tmp_path):
+    trace_file = TraceFile(str(tmp_path / "trace-1.json"), max_bytes=2_000, backups=1)
+    for i in range(100):
+        trace_file.write({"name": f"s{i}", "ph": "X", "ts": i, "dur": 1, "pid": 1, "tid": 1, "args": {}})
+    trace_file.close()
+
+    assert (tmp_path / "trace-1.json.1").exists()
+    assert not (tmp_path / "trace-1.json.2").exists()
+    out = tmp_path / "merged.json"
+    count = merge([str(tmp_path)], str(out))
+    merged = json.loads(out.read_text())
+    assert len(merged) == count
+    assert merged[-1]["name"] == "s99"
@@ -0,0 +1,112 @@
+
+import threading
+import time
+from app.hardware.valve import MockValve, TimedValveWrapper
+from app.services.repository import StateRepository
+from app.services.valve_gate import ValveCommandGate
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingValve(MockValve):
+    def __init__(self) -> None:
+        super().__init__()
+        self.opens = 0
+
+    def open(self) -> None:
+        self.opens += 1
+        super().open()
+
+
+def test_repeated_commands_are_merged():
+    clock = Clock()
+    valve = CountingValve()
+    gate = ValveCommandGate(valve, StateRepository(), clock=clock)
+
+    assert gate.submit("tab-1", "open").status == "accepted"
+    clock.now += 0.2
+    assert gate.submit("tab-2", "open").status == "merged"
+    assert valve.opens == 1
+    assert gate.submit("tab-2", "close").status == "accepted"
+    assert gate.submit("tab-1", "close").status == "merged"
+    assert not valve.is_open
+
+
+def test_client_and_valve_rate_limits():
+    clock = Clock()
+    valve = CountingValve()
+    gate = ValveCommandGate(valve, StateRepository(), client_rate=1, client_burst=2, open_rate=0.1, open_burst=2, clock=clock)
+
+    assert [gate.submit("script", "open").status for _ in range(3)] == ["accepted", "merged", "rate_limited"]
+
+    # opening a closed valve is limited per valve, closing never is
+    for client in ("a", "b"):
+        clock.now += 2
+        assert gate.submit(client, "close").status == "accepted"
+        clock.now += 2
+        result = gate.submit(client, "open")
+    assert result.status == "rate_limited"
+    assert result.retry_after > 0
+    assert valve.opens == 2
+
+
+def test_open_for_uses_one_resettable_timer():
+    valve = TimedValveWrapper(MockValve())
+    threads = threading.active_count()
+    for _ in range(20):
+        valve.open_for(60)
+    assert threading.active_count() <= threads + 1
+
+    valve.open_for(0.05)
+    time.sleep(0.2)
+    assert not valve.is_open
+    valve.open_for(0.05)
+    valve.close()
+    assert valve.deadline is None
+
+
+def test_batch_valve_commands_go_through_the_gate():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.api import routes_control
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    async def session():
+        async with AsyncSession(engine) as s:
+            yield s
+
+    class Scheduler:
+        def wake(self):
+            pass
+
+    valve = CountingValve()
+    repo = StateRepository()
+    gate = ValveCommandGate(valve, repo, open_burst=1, clock=Clock())
+    app = FastAPI()
+    app.include_router(routes_control.router)
+    app.dependency_overrides.update({
+        routes_control.get_session: session,
+        routes_control.get_valve: lambda: valve,
+        routes_control.get_state_repo: lambda: repo,
+        routes_control.get_scheduler: Scheduler,
+        routes_control.get_valve_gate: lambda: gate,
+    })
+    client = TestClient(app)
+    open_, close = {"type": "valve", "action": "open"}, {"type": "valve", "action": "close"}
+
+    response = client.post("/control/batch", json={"commands": [open_, open_]})
+    assert [r["status"] for r in response.json()["results"]] == ["accepted", "merged"]
+    assert valve.opens == 1
+
+    # the valve's open bucket holds one token and the first batch used it
+    response = client.post("/control/batch", json={"commands": [close, open_]})
+    assert response.status_code == 429
+    assert valve.opens == 1
@@ -0,0 +1,156 @@
+
+import asyncio
+import random
+from dataclasses import replace
+from datetime import datetime, time, timedelta
+from app.services import whatif
+from app.services.decision import DecisionParams, decide
+from app.services.whatif import Candidate, History, replay
+
+
+PARAMS = DecisionParams(
+    low=0.38, high=0.45, watering_seconds=90, soak_minutes=8,
+    daily_budget_minutes=20, daily_budget_litres=None, window_start_hour=3, window_end_hour=6,
+)
+
+
+def _readings(day: datetime, moisture) -> list[tuple[datetime, float]]:
+    return [(day + timedelta(minutes=5 * i), moisture(i)) for i in range(288)]
+
+
+def test_decide_follows_the_controller_rules():
+    at = datetime(2024, 6, 1, 4, 0)
+    start = decide("idle", None, at, 0.30, PARAMS)
+    assert (start.state, start.valve, start.start_cycle) == ("watering", True, True)
+    assert start.until == at + timedelta(seconds=90)
+    assert decide("idle", None, at.replace(hour=12), 0.30, PARAMS).state == "idle"  # outside the window
+    assert decide("idle", None, at.replace(hour=12), 0.30, PARAMS, scheduled=True).start_cycle
+    assert decide("soak", at, at, 0.30, PARAMS).reason == "still dry after soak"
+    assert decide("idle", None, at, 0.30, PARAMS, budget="daily budget used").state == "budget_exceeded"
+    wet = decide("watering", at + timedelta(minutes=1), at, 0.50, PARAMS)
+    assert (wet.state, wet.valve) == ("idle", False)
+
+
+def test_replay_stops_at_the_daily_budget():
+    day = datetime(2024, 6, 1)
+    history = History(_readings(day, lambda i: 0.30))
+    dry, = replay(history, [Candidate(PARAMS)], cycle_gain=0.0)
+    # 90 s cycles every 9.5 minutes from 03:00 until 20 minutes are used up
+    assert dry["total"] == dict(watering_minutes=21.0, cycles=14, budget_hits=1, litres=None)
+
+    # with a response to watering, two cycles bring it above ``low``
+    wet, scheduled = replay(history, [Candidate(PARAMS), Candidate(PARAMS, [time(20, 0)])], cycle_gain=0.05)
+    assert wet["total"]["cycles"] == 2 and wet["total"]["budget_hits"] == 0
+    assert scheduled["total"]["cycles"] == 3  # plus the evening one, outside the window
+
+
+def test_replay_offsets_readings_by_cycles_that_really_ran():
+    day = datetime(2024, 6, 1)
+    # the real controller watered at 03:00 and 03:10, and the probe saw each one afterwards
+    readings = _readings(day, lambda i: 0.30 if i <= 36 else 0.35 if i <= 38 else 0.40)
+    events = [(day + timedelta(hours=3), 90, 1.5), (day + timedelta(hours=3, minutes=10), 90, 1.5)]
+    history = History(readings, events)
+    same, never, more = replay(
+        history,
+        [Candidate(PARAMS), Candidate(replace(PARAMS, low=0.30)), Candidate(replace(PARAMS, low=0.42))],
+        cycle_gain=0.05,
+    )
+    assert same["days"] == history.recorded()  # the same thresholds reproduce what ran
+    assert same["total"]["cycles"] == 2
+    assert never["total"]["cycles"] == 0  # without the recorded cycles it would have stayed at 0.30
+    assert more["total"]["cycles"] == 3
+    assert more["total"]["litres"] == 4.5  # flow of the recorded cycles
+
+
+def test_idle_fast_forward_matches_ticking_every_reading(monkeypatch):
+    rng = random.Random(7)
+    day = datetime(2024, 6, 1)
+    readings = [
+        (day + timedelta(minutes=5 * i, seconds=rng.randint(0, 40)), 0.37 + 0.05 * rng.uniform(-1, 1))
+        for i in range(288 * 6)
+    ]
+    events = [(day + timedelta(days=d, hours=4), 90, 2.0) for d in range(0, 6, 2)]
+    history = History(readings, events, {day.date() + timedelta(days=1): [time(19, 30)]})
+    candidates = [Candidate(replace(PARAMS, low=low)) for low in (0.33, 0.36, 0.39, 0.42)]
+    candidates.append(Candidate(replace(PARAMS, daily_budget_minutes=3), [time(6, 0), time(18, 0)]))
+    fast = replay(history, candidates)
+    monkeypatch.setattr(whatif._Replay, "_skip_idle", lambda self, i: i)
+    assert replay(history, candidates) == fast
+    assert any(r["total"]["budget_hits"] for r in fast)
+
+
+def test_replay_applies_rules():
+    day = datetime(2024, 6, 1)
+    readings = _readings(day, lambda i: 0.30)
+    frost = [(day + timedelta(hours=h), 2.0 if h < 5 else 10.0, 80.0) for h in range(24)]
+    rules = [
+        {"name": "frost guard", "action": "skip", "conditions": [
+            {"field": "air.temperature_c", "op": "<", "value": 4}]},
+        {"name": "evening", "action": "water", "conditions": [
+            {"field": "time", "op": "between", "value": ["20:00", "20:05"]},
+            {"field": "minutes_since_watering", "op": ">", "value": 60}]},
+    ]
+    plain, = replay(History(readings), [Candidate(PARAMS)], cycle_gain=0.05)
+    ruled, = replay(History(readings, rules=rules, air=frost), [Candidate(PARAMS)], cycle_gain=0.05)
+    assert plain["total"]["cycles"] == 2
+    # nothing before 05:00 (frost), two cycles from then on and one more at 20:00
+    assert ruled["total"]["cycles"] == 3
+
+
+def test_whatif_endpoint_replays_stored_history(tmp_path):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from app.api import routes_config
+    from app.database.models import Base, SensorReading, WateringEvent
+    from app.database.repository import RuleRepository
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'whatif.db'}")
+    today = datetime.combine(datetime.utcnow().date(), time())
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as s:
+            for ts, moisture in _readings(today, lambda i: 0.30):
+                s.add(SensorReading(reading_type="soil", moisture_rel=moisture, timestamp=ts))
+                s.add(SensorReading(reading_type="air", temperature_c=20.0, timestamp=ts))
+            s.add(WateringEvent(started_at=today + timedelta(hours=3), duration_seconds=90, reason="dry"))
+            await s.commit()
+
+    async def session():
+        async with AsyncSession(engine, expire_on_commit=False) as s:
+            yield s
+
+    asyncio.run(setup())
+    app = FastAPI()
+    app.include_router(routes_config.router)
+    app.dependency_overrides[routes_config.get_session] = session
+    client = TestClient(app)
+
+    r = client.post("/config/whatif", json={"days": 1, "cycle_gain": 0.0, "candidates": [
+        {}, {"soil_moisture_low": 0.25}, {"schedules": ["06:30"], "window_start_hour": 7, "window_end_hour": 8},
+    ]})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["readings"] == 288 and body["rules"] == 0
+    assert body["recorded"]["total"]["cycles"] == 1
+    current, drier, scheduled = (c["total"] for c in body["candidates"])
+    assert current["cycles"] == 14 and current["budget_hits"] == 1
+    assert drier["cycles"] == 0
+    assert scheduled["cycles"] == 14  # the 06:30 schedule, then "still dry after soak" until the budget
+    assert body["candidates"][1]["params"]["low"] == 0.25
+
+    async def add_rule():
+        async with AsyncSession(engine) as s:
+            await RuleRepository(s).create("too cold", "skip", [
+                {"field": "air.temperature_c", "op": "<", "value": 25}])
+
+    asyncio.run(add_rule())
+    r = client.post("/config/whatif", json={"days": 1, "cycle_gain": 0.0, "candidates": [{}]})
+    assert r.json()["rules"] == 1
+    assert r.json()["candidates"][0]["total"]["cycles"] == 0  # the stored air readings are 20 °C
+
+    bad = client.post("/config/whatif", json={"candidates": [{"soil_moisture_low": 0.5}]})
+    assert bad.status_code == 422
+    assert client.post("/config/whatif", json={"candidates": []}).status_code == 422
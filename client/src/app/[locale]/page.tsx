@@ -2,7 +2,7 @@
 
 import { useState, useEffect } from "react";
 import { useTranslations } from 'next-intl';
-import { api, Metrics } from "@/lib/api";
+import { api, Dashboard } from "@/lib/api";
 import MetricsCard from "@/components/MetricsCard";
 import ControlPanel from "@/components/ControlPanel";
 import ThresholdConfig from "@/components/ThresholdConfig";
@@ -11,13 +11,14 @@ import LanguageSwitcher from "@/components/LanguageSwitcher";
 
 export default function Home() {
   const t = useTranslations();
-  const [metrics, setMetrics] = useState<Metrics | null>(null);
+  const [dashboard, setDashboard] = useState<Dashboard | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const metrics = dashboard?.metrics ?? null;
 
   const loadMetrics = async () => {
     try {
-      const data = await api.getMetrics();
-      setMetrics(data);
+      const data = await api.getDashboard();
+      setDashboard(data);
       setError(null);
     } catch (err) {
       setError(t('errors.connectionFailed'));
@@ -67,7 +68,7 @@ export default function Home() {
               currentMode={metrics?.mode || "auto"}
               onRefresh={loadMetrics}
             />
-            <ThresholdConfig onUpdate={loadMetrics} />
+            <ThresholdConfig thresholds={dashboard?.thresholds ?? null} onUpdate={loadMetrics} />
           </div>
 
           <ScheduleList />
@@ -5,10 +5,11 @@ import { useTranslations } from 'next-intl';
 import { api, ThresholdConfig as ThresholdConfigType } from "@/lib/api";
 
 interface ThresholdConfigProps {
+  thresholds: ThresholdConfigType | null;
   onUpdate: () => void;
 }
 
-export default function ThresholdConfig({ onUpdate }: ThresholdConfigProps) {
+export default function ThresholdConfig({ thresholds, onUpdate }: ThresholdConfigProps) {
   const t = useTranslations('config');
   const tCommon = useTranslations('common');
   const [config, setConfig] = useState<ThresholdConfigType | null>(null);
@@ -16,26 +17,20 @@ export default function ThresholdConfig({ onUpdate }: ThresholdConfigProps) {
   const [loading, setLoading] = useState(false);
   const [formData, setFormData] = useState<Partial<ThresholdConfigType>>({});
 
+  // thresholds come with the dashboard; keep the form untouched while editing
   useEffect(() => {
-    loadConfig();
-  }, []);
-
-  const loadConfig = async () => {
-    try {
-      const data = await api.getThresholds();
-      setConfig(data);
-      setFormData(data);
-    } catch (error) {
-      console.error('Failed to load thresholds:', error);
+    if (thresholds && !editing) {
+      setConfig(thresholds);
+      setFormData(thresholds);
     }
-  };
+  }, [thresholds, editing]);
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     setLoading(true);
     try {
-      await api.updateThresholds(formData);
-      await loadConfig();
+      const data = await api.updateThresholds(formData);
+      setConfig(data);
       setEditing(false);
       onUpdate();
     } catch (error) {
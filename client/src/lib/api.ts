@@ -18,6 +18,9 @@ export interface Metrics {
   valve_open: boolean;
   mode: string;
   state: string;
+  flow_lpm: number | null;
+  daily_watered_litres: number;
+  leak_detected: boolean;
 }
 
 export interface ThresholdConfig {
@@ -31,6 +34,7 @@ export interface ThresholdConfig {
   watering_seconds: number;
   soak_minutes: number;
   daily_budget_minutes: number;
+  daily_budget_litres: number | null;
   window_start_hour: number;
   window_end_hour: number;
 }
@@ -52,7 +56,44 @@ export interface ScheduleCreate {
   enabled: boolean;
 }
 
+export interface WateringEvent {
+  started_at: string;
+  duration_seconds: number;
+  reason: string;
+  moisture_rel: number | null;
+  litres: number | null;
+}
+
+export interface Dashboard {
+  version: string;
+  metrics: Metrics;
+  thresholds: ThresholdConfig;
+  schedules: Schedule[];
+  usage: {
+    watered_seconds: number;
+    budget_seconds: number;
+    watered_litres: number;
+    budget_litres: number | null;
+  };
+  moisture_trend: { hour: string; moisture_rel: number }[];
+  recent_events: WateringEvent[];
+}
+
+let lastDashboard: { etag: string; data: Dashboard } | null = null;
+
 export const api = {
+  // one request for the whole page; unchanged data comes back as 304
+  async getDashboard(): Promise<Dashboard> {
+    const headers: HeadersInit = lastDashboard ? { 'If-None-Match': lastDashboard.etag } : {};
+    const res = await fetch(`${API_URL}/dashboard`, { headers, cache: 'no-store' });
+    if (res.status === 304 && lastDashboard) return lastDashboard.data;
+    if (!res.ok) throw new Error('Failed to fetch dashboard');
+    const data: Dashboard = await res.json();
+    const etag = res.headers.get('ETag');
+    lastDashboard = etag ? { etag, data } : null;
+    return data;
+  },
+
   async getMetrics(): Promise<Metrics> {
     const res = await fetch(`${API_URL}/status/metrics`);
     if (!res.ok) throw new Error('Failed to fetch metrics');